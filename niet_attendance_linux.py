@@ -1,5 +1,6 @@
 import json
 import pandas as pd
+import numpy as np
 import requests
 from datetime import datetime, timedelta, date
 import math
@@ -11,9 +12,38 @@ import traceback # For detailed error printing
 import platform
 import os  # Added os import
 import sys  # Added sys import for sys.exit()
+import random
+import hashlib
+import asyncio
+import codecs
+import re
+import struct
+import zlib
+import base64
+import http.cookiejar
+import queue
+import socket
+import socketserver
+import hmac
+import secrets
+import shutil
+import subprocess
+import functools
+import io
+import contextlib
+import tracemalloc
+import bisect
+import csv
+import sqlite3
+from array import array
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, urljoin, parse_qs
+from html.parser import HTMLParser
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from typing import List, Tuple, Dict, Any # Added typing imports
+from typing import Tuple, Dict, Any, Optional # Added typing imports
+from dataclasses import dataclass, asdict
 
 # === Animation Constants and Utilities ===
 SPINNERS = {
@@ -130,7 +160,14 @@ except ImportError:
     class Text: pass # Dummy class
     class Panel: pass # Dummy class
     class Align: pass # Dummy class
-    print("⚠️ Optional 'rich' library not found. Tables will have basic formatting. (pip install rich)")
+    print("⚠️ Optional 'rich' library not found. Tables will have basic formatting. (pip install rich)", file=sys.stderr)
+
+# --- Zstandard for Fast Snapshot Compression ---
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
 
 # --- Tabulate for Fallback Table Display ---
 try:
@@ -189,7 +226,7 @@ try:
     C_LOW=C_BRIGHT+colorama.Fore.RED; C_MID=C_BRIGHT+colorama.Fore.YELLOW; C_HIGH=C_BRIGHT+colorama.Fore.GREEN
     C_SUBJECT=C_BRIGHT+colorama.Fore.MAGENTA
 except ImportError:
-    print("⚠️ Warning: 'colorama' not installed. Colored text disabled. (pip install colorama)")
+    print("⚠️ Warning: 'colorama' not installed. Colored text disabled. (pip install colorama)", file=sys.stderr)
     C_RESET=C_BRIGHT=C_DIM=C_RED=C_GREEN=C_YELLOW=C_BLUE=""
     C_MAGENTA=C_CYAN=C_WHITE=C_BLACK=C_HEADER=C_TITLE=""
     C_PROMPT=C_ERROR=C_WARNING=C_SUCCESS=C_INFO=C_BOLD=""
@@ -206,7 +243,7 @@ try:
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
-    print(f"{C_WARNING}⚠️ Warning: Selenium missing. Browser login disabled. (pip install selenium beautifulsoup4 webdriver-manager)")
+    print(f"{C_WARNING}⚠️ Warning: Selenium missing. Browser login disabled. (pip install selenium beautifulsoup4 webdriver-manager){C_RESET}", file=sys.stderr)
     class WebDriverException(Exception): pass
     class TimeoutException(Exception): pass
 
@@ -214,10 +251,52 @@ except ImportError:
 # --- Configuration ---
 CREDENTIALS_FILE = "credentials.json"
 KEY_FILE = "secret.key" # File to store the encryption key
+SESSION_CACHE_FILE = "sessions.json" # Per-user JSESSIONIDs reused across runs
+SESSION_MAX_AGE = 12 * 60 * 60 # Seconds after which a cached session is not even probed
+BROWSER_DAEMON_FILE = "browser_daemon.json" # Port and access token of a running --browser-daemon
+BROWSER_DAEMON_DRIVERS = 2 # Warm headless drivers kept by the daemon
+BROWSER_DAEMON_MAX_JOBS = 25 # Logins served by one driver before it is restarted
+BROWSER_DAEMON_TIMEOUT = 90 # Seconds a login job waits for a free driver
+WEBDRIVER_REGISTRY_FILE = "webdrivers.json" # Resolved driver path/version per browser
+WEBDRIVER_OFFLINE = False # Never download drivers; use the registry or a driver on PATH (--offline-drivers)
 ATTENDANCE_FILE = "attendance.json" # Corrected spelling
+ATTENDANCE_SNAPSHOT_FILE = "attendance.snap" # Compressed, checksummed snapshot (see write_snapshot)
+ATTENDANCE_STORE_FORMAT = 'json' # 'json' or 'snapshot' (--snapshot) for fresh fetches
+ACADEMIC_CALENDAR_FILE = "academic_calendar.csv" # Loaded automatically when present (or pass --calendar=FILE, .csv or .ics)
+CALENDAR_CACHE_FILE = "academic_calendar.snap" # Compiled calendar, keyed by the SHA-256 of the source file
+HEATMAP_CACHE_FILE = "attendance_heatmap.snap" # Weekday x time-slot counts, keyed by a digest of the data they came from
+HISTORY_DB_FILE = "attendance_history.db" # Every fetched class, deduplicated across fetches (see HistoryStore)
+HISTORY_ENABLED = True # Record fresh fetches in HISTORY_DB_FILE
 SELENIUM_OUTPUT_FILE = "output_login_page.html"
 NIET_LOGIN_URL = "https://nietcloud.niet.co.in/login.htm"
+HTTP_LOGIN_ENABLED = True # Try a plain requests form login before starting a browser
 NIET_ATTENDANCE_URL = 'https://nietcloud.niet.co.in/getSubjectOnChangeWithSemId1.json'
+NIET_API_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.0.0 Safari/537.36', 'Accept': 'application/json, text/javascript, */*; q=0.01', 'X-Requested-With': 'XMLHttpRequest', 'Referer': 'https://nietcloud.niet.co.in/studentCourseFileNew.htm'}
+STREAM_CHUNK_SIZE = 64 * 1024 # Bytes read per chunk in streaming mode
+GITHUB_CONTRIBUTORS_URL = "https://api.github.com/repos/iamawanishmaurya/NIET-Attendance-Tracker/contributors"
+
+# --- HTTP Session Settings ---
+HTTP_POOL_CONNECTIONS = 4 # Number of per-host pools kept alive
+HTTP_POOL_MAXSIZE = 16 # Max keep-alive connections per host pool
+HTTP_MAX_RETRIES = 3 # Retries on 5xx / connection resets
+HTTP_BACKOFF_FACTOR = 0.5 # Exponential backoff base (seconds)
+HTTP_BACKOFF_JITTER = 0.3 # Random extra seconds added to each backoff
+HTTP_RETRY_STATUSES = (500, 502, 503, 504)
+
+# --- Response Cache Settings ---
+RESPONSE_CACHE_DIR = "response_cache" # Cached attendance payloads + validators
+RESPONSE_CACHE_TTL = 30 * 60 # Seconds a cached payload is served without asking the server
+
+# --- Term Settings ---
+DEFAULT_TERM_ID = '2' # Term fetched when no term list is requested
+TERM_PROBE_IDS = [str(i) for i in range(1, 11)] # Candidate termIds probed by term discovery
+MAX_TERM_FETCH_WORKERS = 10 # Concurrent term downloads (enough to probe all ids in one round)
+
+# --- Batch Settings ---
+BATCH_MAX_CONCURRENCY = 16 # Accounts processed at once
+BATCH_RATE_PER_HOST = 8.0 # Max requests/second sent to any one host
+BATCH_ACCOUNT_TIMEOUT = 60 # Seconds allowed per account (login + fetch)
+BATCH_RESULTS_FILE = "batch_results.json"
 
 
 # --- Emojis ---
@@ -230,6 +309,234 @@ E_PRESENT="👍"; E_ABSENT="👎"; E_OTHER_STATUS="❓"
 # === Utility ===
 def clear_screen(): os.system('cls' if os.name == 'nt' else 'clear')
 
+# === HTTP Session Layer ===
+class _JitteredRetry(Retry):
+    """Retry policy that adds random jitter to urllib3's exponential backoff."""
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return backoff + random.uniform(0, HTTP_BACKOFF_JITTER) if backoff > 0 else backoff
+
+def _build_retry(max_retries=HTTP_MAX_RETRIES):
+    """Bounded retry on 5xx responses and connection resets/read errors."""
+    return _JitteredRetry(
+        total=max_retries, connect=max_retries, read=max_retries, status=max_retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR, status_forcelist=HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        raise_on_status=False # Hand back the last response so raise_for_status() reports it
+    )
+
+class HttpSessionManager:
+    """Pooled keep-alive sessions shared by every NIET Cloud and GitHub request, with per-call latency stats."""
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=HTTP_MAX_RETRIES):
+        self.pool_connections = pool_connections; self.pool_maxsize = pool_maxsize; self.max_retries = max_retries
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=_build_retry(max_retries))
+        self._session = self.new_session(keep_cookies=False)
+        self._stats = {}; self._lock = threading.Lock()
+        self.rate_limiter = None # Optional HostRateLimiter applied before every request
+
+    def new_session(self, keep_cookies=True):
+        """Returns a requests.Session mounted on the shared connection pool."""
+        session = requests.Session()
+        session.mount('https://', self._adapter); session.mount('http://', self._adapter)
+        if not keep_cookies: # Shared session must never carry one user's cookies into another's request
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def request(self, method, url, label='http', session=None, **kwargs):
+        """Performs a request on the pooled session and records its latency under `label`."""
+        if self.rate_limiter: self.rate_limiter.acquire(urlparse(url).hostname)
+        start = time.perf_counter(); ok = False
+        try:
+            response = (session or self._session).request(method, url, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally: self._record(label, time.perf_counter() - start, ok)
+
+    def get(self, url, label='http', **kwargs): return self.request('GET', url, label=label, **kwargs)
+
+    def _record(self, label, elapsed, ok):
+        with self._lock:
+            st = self._stats.setdefault(label, {'count': 0, 'errors': 0, 'total': 0.0, 'min': float('inf'), 'max': 0.0, 'samples': deque(maxlen=1000)})
+            st['count'] += 1; st['total'] += elapsed; st['samples'].append(elapsed)
+            st['min'] = min(st['min'], elapsed); st['max'] = max(st['max'], elapsed)
+            if not ok: st['errors'] += 1
+
+    def stats(self):
+        """Returns {label: {count, errors, avg, min, max, p50, p95}} with times in seconds."""
+        with self._lock:
+            out = {}
+            for label, st in self._stats.items():
+                samples = sorted(st['samples'])
+                out[label] = {
+                    'count': st['count'], 'errors': st['errors'], 'avg': st['total'] / st['count'] if st['count'] else 0.0,
+                    'min': st['min'] if st['count'] else 0.0, 'max': st['max'],
+                    'p50': _percentile(samples, 50), 'p95': _percentile(samples, 95)
+                }
+            return out
+
+    def reset_stats(self):
+        with self._lock: self._stats.clear()
+
+    def close(self):
+        self._session.close(); self._adapter.close()
+
+class HostRateLimiter:
+    """Token bucket per host: at most `rate` requests/second, bursting up to `burst`."""
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate); self.burst = float(burst or max(1.0, self.rate))
+        if not self.rate > 0: raise ValueError(f"rate must be greater than 0 (got {rate})")
+        self._buckets = {}; self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """Blocks until a request to `host` is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1: self._buckets[host] = (tokens - 1, now); return
+                self._buckets[host] = (tokens, now); wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0.0 if empty)."""
+    if not sorted_values: return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+_http_manager = None
+_http_manager_lock = threading.Lock()
+
+def get_http_manager():
+    """Returns the process-wide HttpSessionManager, creating it on first use."""
+    global _http_manager
+    with _http_manager_lock:
+        if _http_manager is None: _http_manager = HttpSessionManager()
+        return _http_manager
+
+def configure_http_session(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=HTTP_MAX_RETRIES):
+    """Rebuilds the shared session manager with new pool sizes / retry budget."""
+    global _http_manager
+    with _http_manager_lock:
+        if _http_manager is not None: _http_manager.close()
+        _http_manager = HttpSessionManager(pool_connections, pool_maxsize, max_retries)
+        return _http_manager
+
+def print_http_stats():
+    """Prints per-label request latency stats collected by the session manager."""
+    stats = get_http_manager().stats()
+    if not stats: return
+    print(f"\n{C_DIM}--- HTTP Stats ---{C_RESET}")
+    for label, st in stats.items():
+        print(f"{C_DIM}{label:<12} n={st['count']} err={st['errors']} avg={st['avg']*1000:.0f}ms p50={st['p50']*1000:.0f}ms p95={st['p95']*1000:.0f}ms max={st['max']*1000:.0f}ms{C_RESET}")
+
+
+# === Response Cache ===
+class ResponseCache:
+    """On-disk cache of API bodies keyed by (user, termId, endpoint), with TTL and ETag/Last-Modified revalidation."""
+    def __init__(self, cache_dir=RESPONSE_CACHE_DIR, ttl=RESPONSE_CACHE_TTL):
+        self.cache_dir = cache_dir; self.ttl = ttl
+        self._counters = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stores': 0, 'bytes_saved': 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(user, term_id, endpoint):
+        return hashlib.sha256(f"{user}|{term_id}|{endpoint}".encode('utf-8')).hexdigest()[:32]
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".meta.json", base + ".body"
+
+    def get(self, key):
+        """Returns the cached entry (metadata + 'body' bytes) or None if absent/corrupt."""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f: entry = json.load(f)
+            with open(body_path, 'rb') as f: body = f.read()
+        except (IOError, OSError, json.JSONDecodeError): return None
+        if hashlib.sha256(body).hexdigest() != entry.get('sha256'): return None # Torn or tampered write
+        entry['body'] = body
+        return entry
+
+    def put(self, key, body, response_headers, **meta):
+        """Stores a body with its fetch time, content hash and any validators."""
+        entry = dict(meta, fetched_at=time.time(), sha256=hashlib.sha256(body).hexdigest(), size=len(body),
+                     etag=response_headers.get('ETag'), last_modified=response_headers.get('Last-Modified'))
+        meta_path, body_path = self._paths(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _atomic_write(body_path, body) # Body first so the meta hash never points at a missing body
+            _atomic_write(meta_path, json.dumps(entry).encode('utf-8'))
+            self.count('stores')
+        except (IOError, OSError) as e:
+            if DEBUG_MODE: print(f"{C_WARNING}{E_WARNING} Could not write response cache: {e}{C_RESET}")
+
+    def touch(self, key, entry):
+        """Marks a cached entry as freshly validated (after a 304)."""
+        body = entry['body']; meta = {k: v for k, v in entry.items() if k != 'body'}
+        meta['fetched_at'] = time.time()
+        try: _atomic_write(self._paths(key)[0], json.dumps(meta).encode('utf-8'))
+        except (IOError, OSError): pass
+        entry['fetched_at'] = meta['fetched_at']; entry['body'] = body
+
+    def age(self, entry): return time.time() - entry.get('fetched_at', 0)
+
+    def is_fresh(self, entry): return self.age(entry) < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'): headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    @staticmethod
+    def load_json(entry):
+        try: return json.loads(entry['body'].decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError): return None
+
+    def count(self, counter, saved_bytes=0):
+        with self._lock:
+            self._counters[counter] += 1; self._counters['bytes_saved'] += saved_bytes
+
+    def stats(self):
+        """Returns hit/revalidate/miss counters and the upstream bytes they saved."""
+        with self._lock:
+            out = dict(self._counters)
+        lookups = out['hits'] + out['revalidated'] + out['misses']
+        out['hit_ratio'] = (out['hits'] + out['revalidated']) / lookups if lookups else 0.0
+        return out
+
+def _atomic_write(path, payload, mode=0o666):
+    """Writes bytes to a temp file next to `path`, then renames it into place.
+    The temp file is created with `mode` (less the umask), so e.g. 0o600 secrets are never readable by others."""
+    tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), mode)
+        with os.fdopen(fd, 'wb') as f: f.write(payload); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+
+def _session_user_key(jsessionid):
+    """Cache user key for fetches where only a JSESSIONID (no username) is known."""
+    return "sid-" + hashlib.sha256(jsessionid.encode('utf-8')).hexdigest()[:16]
+
+_response_cache = None
+
+def get_response_cache():
+    """Returns the process-wide ResponseCache, creating it on first use."""
+    global _response_cache
+    with _http_manager_lock:
+        if _response_cache is None: _response_cache = ResponseCache()
+        return _response_cache
+
+def print_response_cache_stats():
+    """Prints how much upstream traffic the response cache saved."""
+    st = get_response_cache().stats()
+    print(f"{C_DIM}Response cache: hits={st['hits']} revalidated={st['revalidated']} misses={st['misses']} hit_ratio={st['hit_ratio']*100:.0f}% saved={st['bytes_saved']/1024:.1f} KiB{C_RESET}")
+
+
 # === Encryption Functions ===
 def generate_key():
     """Generates a new Fernet key and saves it to KEY_FILE."""
@@ -350,7 +657,277 @@ def select_or_enter_credentials(key):
         except KeyboardInterrupt: print(f"\n{C_YELLOW}Credential selection cancelled.{C_RESET}"); return None, None, False
 
 
+# === Session Cache ===
+_session_cache_lock = threading.Lock()
+
+def _load_session_cache():
+    if not os.path.exists(SESSION_CACHE_FILE): return {}
+    try:
+        with open(SESSION_CACHE_FILE, 'r', encoding='utf-8') as f: sessions = json.load(f)
+        return sessions if isinstance(sessions, dict) else {}
+    except (json.JSONDecodeError, IOError): return {}
+
+def _save_session_cache(sessions):
+    try:
+        _atomic_write(SESSION_CACHE_FILE, json.dumps(sessions, indent=4).encode('utf-8'), mode=0o600) # A JSESSIONID is as good as a password while it lives
+    except (IOError, OSError) as e: print(f"{C_WARNING}{E_WARNING} Could not save session cache: {e}{C_RESET}")
+
+def load_cached_session(username):
+    """Returns the cached JSESSIONID for username, or None if absent or older than SESSION_MAX_AGE."""
+    entry = _load_session_cache().get(username)
+    if not isinstance(entry, dict) or not entry.get('jsessionid'): return None
+    if time.time() - entry.get('obtained_at', 0) > SESSION_MAX_AGE: return None
+    return entry['jsessionid']
+
+def save_cached_session(username, jsessionid):
+    """Stores a freshly obtained JSESSIONID for username with the time it was obtained."""
+    with _session_cache_lock:
+        sessions = _load_session_cache()
+        sessions[username] = {'jsessionid': jsessionid, 'obtained_at': time.time()}
+        _save_session_cache(sessions)
+
+def drop_cached_session(username):
+    with _session_cache_lock:
+        sessions = _load_session_cache()
+        if sessions.pop(username, None) is not None: _save_session_cache(sessions)
+
+def verify_jsessionid(jsessionid, timeout=10):
+    """Cheap validity probe: asks for the attendance endpoint and checks the status and content type without
+    following the login redirect or downloading the body."""
+    if not jsessionid: return False
+    try:
+        response = get_http_manager().get(NIET_ATTENDANCE_URL, label='verify', params={'termId': DEFAULT_TERM_ID, 'refreshData': '0'},
+                                          cookies={'JSESSIONID': jsessionid}, headers=NIET_API_HEADERS, timeout=timeout, allow_redirects=False, stream=True)
+        with response: return response.status_code == 200 and 'application/json' in response.headers.get('Content-Type', '').lower()
+    except requests.exceptions.RequestException: return False
+
+def get_session_for_user(username, password, browser_choice='firefox', quiet=False, login_lock=None):
+    """Returns (username, jsessionid): the cached session when the probe accepts it, else a fresh login (which is
+    then cached) tried as plain HTTP, then on the browser daemon if one is running, then in a local browser.
+    `login_lock` serialises local browser logins when called from worker threads."""
+    cached = load_cached_session(username)
+    if cached:
+        if verify_jsessionid(cached):
+            if not quiet: print(f"{C_SUCCESS}{E_REUSE} Reusing saved session for {C_CYAN}{username}{C_RESET}{C_SUCCESS} (browser login skipped).{C_RESET}")
+            return username, cached
+        if not quiet: print(f"{C_INFO}{E_INFO} Saved session for {username} expired. Logging in again...{C_RESET}")
+        drop_cached_session(username)
+    if not password: return None, None
+    login_username, jsessionid = login_http(NIET_LOGIN_URL, username, password, quiet=quiet) if HTTP_LOGIN_ENABLED else (None, None)
+    daemon_result = None
+    if not jsessionid:
+        daemon_result = login_via_browser_daemon(NIET_LOGIN_URL, username, password, quiet=quiet)
+        if daemon_result is not None: login_username, jsessionid = daemon_result
+    if not jsessionid and daemon_result is None and SELENIUM_AVAILABLE:
+        if HTTP_LOGIN_ENABLED and not quiet: print(f"{C_INFO}{E_INFO} Falling back to browser login...{C_RESET}")
+        if login_lock:
+            with login_lock: login_username, jsessionid = login_and_extract_selenium(NIET_LOGIN_URL, username, password, browser_choice=browser_choice)
+        else: login_username, jsessionid = login_and_extract_selenium(NIET_LOGIN_URL, username, password, browser_choice=browser_choice)
+    if jsessionid: save_cached_session(login_username or username, jsessionid)
+    return login_username, jsessionid
+
+
+# === HTTP Login ===
+class _LoginFormParser(HTMLParser):
+    """Collects each <form>'s action, method and <input> name/value pairs."""
+    def __init__(self):
+        super().__init__(); self.forms = []; self._current = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form':
+            self._current = {'action': attrs.get('action') or '', 'method': (attrs.get('method') or 'get').lower(), 'fields': {}}
+            self.forms.append(self._current)
+        elif tag == 'input' and self._current is not None and attrs.get('name'):
+            input_type = (attrs.get('type') or 'text').lower()
+            if input_type in ('checkbox', 'radio') and 'checked' not in attrs: return
+            if input_type in ('submit', 'button', 'image'): return # Browsers only send the clicked button
+            self._current['fields'][attrs['name']] = attrs.get('value') or ''
+
+    def handle_endtag(self, tag):
+        if tag == 'form': self._current = None
+
+def _jsessionid_from_jar(jar):
+    """Latest JSESSIONID in a cookie jar (the portal may re-issue it on login)."""
+    values = [c.value for c in jar if c.name == 'JSESSIONID']
+    return values[-1] if values else None
+
+def _looks_logged_in(response):
+    """Same success indicators the Selenium login waits for, and no login form in the page."""
+    text = response.text
+    if 'j_password' in text: return False
+    return 'Dashboard' in response.url or 'Logout' in text or 'Welcome' in text
+
+def login_http(url, username, password, timeout=20, quiet=False):
+    """Logs in by posting the portal's login form with requests (no browser). Returns (username, jsessionid) or (None, None)."""
+    manager = get_http_manager()
+    session = manager.new_session() # Cookie-keeping session on the shared pool. Never close() it: that would close the pool.
+    browser_headers = {'User-Agent': NIET_API_HEADERS['User-Agent'], 'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8'}
+    try:
+        page = manager.get(url, label='login', session=session, headers=browser_headers, timeout=timeout)
+        page.raise_for_status()
+        parser = _LoginFormParser(); parser.feed(page.text)
+        form = next((f for f in parser.forms if 'j_username' in f['fields']), None)
+        if form is None:
+            if not quiet: print(f"{C_DIM}HTTP login: login form not found on {url}.{C_RESET}")
+            return None, None
+        fields = dict(form['fields'], j_username=username, j_password=password)
+        action = urljoin(page.url, form['action']) if form['action'] else page.url
+        resp = manager.request('POST', action, label='login', session=session, data=fields, headers=dict(browser_headers, Referer=page.url), timeout=timeout)
+        jsessionid = _jsessionid_from_jar(session.cookies)
+        if resp.status_code != 200 or not jsessionid or not _looks_logged_in(resp):
+            if not quiet: print(f"{C_DIM}HTTP login for {username} did not reach the dashboard (status {resp.status_code}).{C_RESET}")
+            return None, None
+        if not quiet: print(f"{C_SUCCESS}{E_SUCCESS} Logged in via HTTP. JSESSIONID obtained.{C_RESET}")
+        return username, jsessionid
+    except requests.exceptions.RequestException as e:
+        if not quiet: print(f"{C_DIM}HTTP login error: {e}{C_RESET}")
+        return None, None
+
+
 # === Selenium Login ===
+def create_webdriver(browser_choice='firefox'):
+    """Builds a headless WebDriver for the chosen browser. Raises ValueError for unsupported browsers and
+    whatever Selenium raises if the driver cannot start."""
+    if browser_choice == 'firefox':
+        from selenium.webdriver.firefox.options import Options as BrowserOptions; from selenium.webdriver.firefox.service import Service as BrowserService
+        DriverClass = webdriver.Firefox; DriverManager = None
+        try: from webdriver_manager.firefox import GeckoDriverManager as DriverManager
+        except ImportError: print(f"{C_DIM}webdriver-manager optional.{C_RESET}")
+        opts = BrowserOptions(); opts.add_argument('--headless'); opts.add_argument("--window-size=1920,1080")
+    elif browser_choice == 'edge':
+        from selenium.webdriver.edge.options import Options as BrowserOptions; from selenium.webdriver.edge.service import Service as BrowserService
+        DriverClass = webdriver.Edge; DriverManager = None
+        try: from webdriver_manager.microsoft import EdgeChromiumDriverManager as DriverManager
+        except ImportError: print(f"{C_DIM}webdriver-manager optional.{C_RESET}")
+        opts = BrowserOptions(); opts.add_argument('--headless'); opts.add_argument('--disable-gpu'); opts.add_argument("--window-size=1920,1080"); opts.add_argument("--log-level=3"); opts.add_experimental_option('excludeSwitches', ['enable-logging'])
+    elif browser_choice == 'chrome':
+        from selenium.webdriver.chrome.options import Options as BrowserOptions; from selenium.webdriver.chrome.service import Service as ChromeService; BrowserService = ChromeService
+        DriverClass = webdriver.Chrome; DriverManager = None
+        try: from webdriver_manager.chrome import ChromeDriverManager as DriverManager
+        except ImportError: print(f"{C_DIM}webdriver-manager optional.{C_RESET}")
+        opts = BrowserOptions(); opts.add_argument('--headless'); opts.add_argument('--disable-gpu'); opts.add_argument("--window-size=1920,1080"); opts.add_argument("--log-level=3"); opts.add_experimental_option('excludeSwitches', ['enable-logging']); opts.add_argument("--no-sandbox"); opts.add_argument("--disable-dev-shm-usage")
+    else: raise ValueError(f"Unsupported browser: {browser_choice}")
+
+    os.environ['WDM_LOG_LEVEL'] = '0'; os.environ['WDM_PRINT_FIRST_LINE'] = 'False'
+    driver_path = resolve_webdriver(browser_choice, DriverManager)
+    svc = BrowserService(driver_path) if driver_path else BrowserService() # None: let Selenium find a system driver
+    return DriverClass(service=svc, options=opts)
+
+
+# === WebDriver Registry ===
+_BROWSER_BINARIES = {'firefox': ('firefox', 'firefox-esr'), 'chrome': ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser'),
+                     'edge': ('microsoft-edge', 'microsoft-edge-stable')}
+_DRIVER_BINARIES = {'firefox': 'geckodriver', 'chrome': 'chromedriver', 'edge': 'msedgedriver'}
+_driver_registry_lock = threading.Lock()
+
+def set_webdriver_offline(offline=True):
+    """Stops webdriver-manager and Selenium Manager from downloading drivers."""
+    global WEBDRIVER_OFFLINE
+    WEBDRIVER_OFFLINE = offline
+    if offline: os.environ['SE_OFFLINE'] = 'true'
+    else: os.environ.pop('SE_OFFLINE', None)
+
+def _load_driver_registry():
+    try:
+        with open(WEBDRIVER_REGISTRY_FILE, 'r', encoding='utf-8') as f: registry = json.load(f)
+        return registry if isinstance(registry, dict) else {}
+    except (OSError, ValueError): return {}
+
+def _browser_fingerprint(browser_choice):
+    """[path, mtime_ns, size] of the installed browser binary, or None. Changes whenever the browser is upgraded,
+    and costs a stat() instead of running `browser --version`."""
+    for name in _BROWSER_BINARIES.get(browser_choice, ()):
+        path = shutil.which(name)
+        if path:
+            real = os.path.realpath(path); st = os.stat(real)
+            return [real, st.st_mtime_ns, st.st_size]
+    return None
+
+def _binary_version(path):
+    """Version number printed by `<binary> --version`, or None."""
+    try: out = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=15).stdout
+    except (OSError, subprocess.SubprocessError): return None
+    match = re.search(r'\d+(?:\.\d+)+', out or '')
+    return match.group(0) if match else None
+
+def resolve_webdriver(browser_choice, driver_manager=None, offline=None):
+    """Returns the driver binary for a browser, or None to let Selenium look for one itself.
+    The registry entry is reused while the browser binary is unchanged; otherwise the driver is resolved again
+    with webdriver-manager (skipped offline) or found on PATH, and recorded with its versions and resolve time."""
+    offline = WEBDRIVER_OFFLINE if offline is None else offline
+    start = time.perf_counter()
+    fingerprint = _browser_fingerprint(browser_choice)
+    with _driver_registry_lock:
+        registry = _load_driver_registry(); entry = registry.get(browser_choice) or {}
+        driver_path = entry.get('driver_path')
+        if driver_path and os.path.exists(driver_path) and (entry.get('fingerprint') == fingerprint or offline):
+            if entry.get('fingerprint') != fingerprint: print(f"{C_DIM}{browser_choice.capitalize()} changed since its driver was recorded; using it anyway (offline).{C_RESET}")
+            if DEBUG_MODE: print(f"{C_DIM}{browser_choice} driver from registry in {(time.perf_counter() - start) * 1000:.1f} ms (full resolve took {entry.get('resolve_seconds', 0):.2f} s).{C_RESET}")
+            return driver_path
+
+        driver_path = None; source = None
+        if driver_manager and not offline:
+            try: driver_path = driver_manager().install(); source = 'webdriver-manager'
+            except Exception as e: print(f"{C_DIM}webdriver-manager could not resolve a {browser_choice} driver: {e}{C_RESET}")
+        if not driver_path:
+            driver_path = shutil.which(_DRIVER_BINARIES.get(browser_choice, '')); source = 'PATH'
+        if not driver_path: return None
+        registry[browser_choice] = {'driver_path': driver_path, 'driver_version': _binary_version(driver_path),
+                                    'browser_version': _binary_version(fingerprint[0]) if fingerprint else None,
+                                    'fingerprint': fingerprint, 'source': source, 'resolved_at': time.time(),
+                                    'resolve_seconds': round(time.perf_counter() - start, 3)}
+        try: _atomic_write(WEBDRIVER_REGISTRY_FILE, json.dumps(registry, indent=2).encode('utf-8'))
+        except OSError as e: print(f"{C_WARNING}Could not save {WEBDRIVER_REGISTRY_FILE}: {e}{C_RESET}")
+        return driver_path
+
+def show_driver_registry():
+    """Prints the recorded drivers and how long a registry lookup takes compared with the original resolve."""
+    registry = _load_driver_registry()
+    if not registry: print(f"{C_INFO}{E_INFO} No drivers recorded yet in '{WEBDRIVER_REGISTRY_FILE}'. They are added on the first browser login.{C_RESET}"); return
+    print(f"\n{C_HEADER}{E_GEAR} WebDriver registry ('{WEBDRIVER_REGISTRY_FILE}'){C_RESET}")
+    for browser, entry in sorted(registry.items()):
+        start = time.perf_counter(); fingerprint = _browser_fingerprint(browser); lookup = time.perf_counter() - start
+        status = "current" if fingerprint == entry.get('fingerprint') else "browser changed, re-resolves on next login"
+        if not os.path.exists(entry.get('driver_path', '')): status = "driver missing, re-resolves on next login"
+        resolved = entry.get('resolve_seconds', 0)
+        print(f"  {C_CYAN}{browser:<8}{C_RESET} driver {entry.get('driver_version') or '?':<14} browser {entry.get('browser_version') or '?':<16} via {entry.get('source', '?'):<17} ({status})")
+        print(f"  {'':<8} {C_DIM}{entry.get('driver_path')}{C_RESET}")
+        print(f"  {'':<8} resolve {resolved * 1000:>8.1f} ms   lookup {lookup * 1000:>6.2f} ms   saved per login ~{max(resolved - lookup, 0) * 1000:.0f} ms")
+
+def _submit_login_form(driver, url, username, password, verbose=False):
+    """Drives the portal login form in an existing WebDriver and returns the JSESSIONID (None if no cookie).
+    Raises TimeoutException if the page or the post-login indicators never appear.
+    verbose=True shows the spinner and progress lines (main thread only)."""
+    if verbose: start_loading(f"{E_EYES} Opening page...")
+    driver.get(url)
+    WebDriverWait(driver, 30).until(lambda d: d.execute_script('return document.readyState') == 'complete')
+    if verbose: stop_loading()
+
+    # Wait for login form to be present and interactable
+    username_field = WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.NAME, "j_username")))
+    WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.NAME, "j_username")))
+    username_field.clear(); username_field.send_keys(username)
+    password_field = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "j_password")))
+    password_field.clear(); password_field.send_keys(password)
+    if verbose: print(f"{C_INFO}   Credentials entered.")
+
+    # Submit login
+    if verbose: start_loading(f"{E_ROCKET} Submitting...")
+    submit_button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[type='submit']")))
+    submit_button.click()
+
+    # Wait for successful login indicators
+    WebDriverWait(driver, 30).until(
+        EC.any_of(
+            EC.url_contains("Dashboard"),
+            EC.presence_of_element_located((By.LINK_TEXT, "Logout")),
+            EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Welcome')]"))
+        )
+    )
+    if verbose: stop_loading(f"{E_SUCCESS} Login submitted.")
+    return next((c['value'] for c in driver.get_cookies() if c['name'] == 'JSESSIONID'), None)
+
 def login_and_extract_selenium(url, username, password, browser_choice='firefox', output_filename=SELENIUM_OUTPUT_FILE):
     """Logs in using Selenium, returns username and jsessionid if successful."""
     if not SELENIUM_AVAILABLE:
@@ -358,80 +935,15 @@ def login_and_extract_selenium(url, username, password, browser_choice='firefox'
     driver = None; jsessionid = None; browser_name = browser_choice.capitalize()
     start_loading(f"{E_GEAR} Initializing {browser_name} WebDriver...")
     try:
-        # --- Browser Specific Setup ---
-        # (Browser setup code remains the same as before)
-        if browser_choice == 'firefox':
-            from selenium.webdriver.firefox.options import Options as BrowserOptions; from selenium.webdriver.firefox.service import Service as BrowserService
-            DriverClass = webdriver.Firefox; DriverManager = None
-            try: from webdriver_manager.firefox import GeckoDriverManager as DriverManager
-            except ImportError: print(f"{C_DIM}webdriver-manager optional.{C_RESET}")
-            opts = BrowserOptions(); opts.add_argument('--headless'); opts.add_argument("--window-size=1920,1080")
-        elif browser_choice == 'edge':
-            from selenium.webdriver.edge.options import Options as BrowserOptions; from selenium.webdriver.edge.service import Service as BrowserService
-            DriverClass = webdriver.Edge; DriverManager = None
-            try: from webdriver_manager.microsoft import EdgeChromiumDriverManager as DriverManager
-            except ImportError: print(f"{C_DIM}webdriver-manager optional.{C_RESET}")
-            opts = BrowserOptions(); opts.add_argument('--headless'); opts.add_argument('--disable-gpu'); opts.add_argument("--window-size=1920,1080"); opts.add_argument("--log-level=3"); opts.add_experimental_option('excludeSwitches', ['enable-logging'])
-        elif browser_choice == 'chrome':
-            from selenium.webdriver.chrome.options import Options as BrowserOptions; from selenium.webdriver.chrome.service import Service as ChromeService; BrowserService = ChromeService
-            DriverClass = webdriver.Chrome; DriverManager = None
-            try: from webdriver_manager.chrome import ChromeDriverManager as DriverManager
-            except ImportError: print(f"{C_DIM}webdriver-manager optional.{C_RESET}")
-            opts = BrowserOptions(); opts.add_argument('--headless'); opts.add_argument('--disable-gpu'); opts.add_argument("--window-size=1920,1080"); opts.add_argument("--log-level=3"); opts.add_experimental_option('excludeSwitches', ['enable-logging']); opts.add_argument("--no-sandbox"); opts.add_argument("--disable-dev-shm-usage")
-        else: stop_loading(); print(f"{C_ERROR}{E_ERROR} Unsupported browser: {browser_choice}{C_RESET}"); return None, None
-
         # --- WebDriver Initialization ---
-        # (WebDriver initialization code remains the same)
-        try:
-            if DriverManager: svc = BrowserService(DriverManager().install()); os.environ['WDM_LOG_LEVEL'] = '0'; os.environ['WDM_PRINT_FIRST_LINE'] = 'False'
-            else: svc = BrowserService() # Try system driver
-            driver = DriverClass(service=svc, options=opts)
+        try: driver = create_webdriver(browser_choice)
+        except ValueError as e: stop_loading(); print(f"{C_ERROR}{E_ERROR} {e}{C_RESET}"); return None, None
         except Exception as e: stop_loading(); print(f"{C_ERROR}{E_ERROR} {browser_name} WebDriver setup failed: {e}{C_RESET}\n{C_DIM} Ensure {browser_name} installed & correct driver in PATH or install webdriver-manager.{C_RESET}"); return None, None
 
         # --- Login Steps ---
         stop_loading(f"{E_COMPUTER} {browser_name} WebDriver Initialized.")
         print(f"{C_INFO}{E_LOGIN} Logging into: {C_CYAN}{url}{C_RESET} using {browser_name}")
-        
-        # Wait for page to load completely
-        start_loading(f"{E_EYES} Opening page...")
-        driver.get(url)
-        WebDriverWait(driver, 30).until(lambda d: d.execute_script('return document.readyState') == 'complete')
-        stop_loading()
-        
-        # Wait for login form to be present and interactable
-        try:
-            username_field = WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.NAME, "j_username"))
-            )
-            WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.NAME, "j_username")))
-            username_field.clear()
-            username_field.send_keys(username)
-            
-            password_field = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "j_password"))
-            )
-            password_field.clear()
-            password_field.send_keys(password)
-            
-            print(f"{C_INFO}   Credentials entered.")
-            
-            # Submit login
-            start_loading(f"{E_ROCKET} Submitting...")
-            submit_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "button[type='submit']"))
-            )
-            submit_button.click()
-            
-            # Wait for successful login indicators
-            WebDriverWait(driver, 30).until(
-                EC.any_of(
-                    EC.url_contains("Dashboard"),
-                    EC.presence_of_element_located((By.LINK_TEXT, "Logout")),
-                    EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Welcome')]"))
-                )
-            )
-            stop_loading(f"{E_SUCCESS} Login submitted.")
-            
+        try: jsessionid = _submit_login_form(driver, url, username, password, verbose=True)
         except TimeoutException as e:
             stop_loading()
             print(f"{C_ERROR}{E_ERROR} Login failed: {str(e)}")
@@ -450,7 +962,6 @@ def login_and_extract_selenium(url, username, password, browser_choice='firefox'
             print(f"{C_WARNING}Could not save HTML output: {e}{C_RESET}")
         # ******** FIX END ********
 
-        cookies = driver.get_cookies(); jsessionid = next((c['value'] for c in cookies if c['name'] == 'JSESSIONID'), None)
         if jsessionid: print(f"{C_SUCCESS}{E_SUCCESS} JSESSIONID obtained.")
         else: print(f"{C_ERROR}{E_ERROR} JSESSIONID NOT found. Login FAILED? Check {output_filename}.{C_RESET}"); return None, None
     except (TimeoutException, WebDriverException, Exception) as e: stop_loading(); print(f"{C_ERROR}{E_ERROR} Selenium Error ({browser_name}): {e}{C_RESET}\n{C_DIM}{traceback.format_exc()}{C_RESET}"); jsessionid = None
@@ -466,29 +977,186 @@ def login_and_extract_selenium(url, username, password, browser_choice='firefox'
 
     return username if jsessionid else None, jsessionid
 
+
+# === Browser Daemon ===
+class _BrowserSlot:
+    """One warm WebDriver and the number of logins it has served since it was started."""
+    def __init__(self, browser_choice):
+        self.browser_choice = browser_choice; self.driver = None; self.jobs = 0
+
+    def ensure(self):
+        if self.driver is None: self.driver = create_webdriver(self.browser_choice); self.jobs = 0
+        return self.driver
+
+    def recycle(self):
+        if self.driver is not None:
+            try: self.driver.quit()
+            except Exception: pass
+        self.driver = None; self.jobs = 0
+
+class BrowserDaemon:
+    """Keeps N headless drivers running and serves login jobs on them, one job per driver at a time.
+    Browser state is cleared between users; a driver is restarted after max_jobs logins or on any WebDriver error."""
+    def __init__(self, browser_choice='firefox', drivers=BROWSER_DAEMON_DRIVERS, max_jobs=BROWSER_DAEMON_MAX_JOBS):
+        self.browser_choice = browser_choice; self.max_jobs = max(1, max_jobs)
+        self.slots = [_BrowserSlot(browser_choice) for _ in range(max(1, drivers))]
+        self._idle = queue.Queue()
+        for slot in self.slots: self._idle.put(slot)
+        self._stats = {'jobs': 0, 'failures': 0, 'recycled': 0}; self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock: self._stats[key] += 1
+
+    def warm_up(self):
+        """Starts every driver up front so the first logins don't pay for it. Returns how many started."""
+        def start(slot):
+            try: slot.ensure(); return True
+            except Exception as e: print(f"{C_WARNING}{E_WARNING} Could not start {self.browser_choice} driver: {e}{C_RESET}"); return False
+        with ThreadPoolExecutor(max_workers=len(self.slots)) as pool: return sum(pool.map(start, self.slots))
+
+    @staticmethod
+    def _clear_browser_state(driver):
+        # Only the browser's copy is dropped; the session stays valid on the server for the caller.
+        driver.delete_all_cookies()
+        driver.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+        driver.get('about:blank')
+
+    def login(self, url, username, password, wait=BROWSER_DAEMON_TIMEOUT):
+        """Runs one login on an idle driver. Returns the JSESSIONID or None; raises queue.Empty if all drivers stay busy."""
+        slot = self._idle.get(timeout=wait)
+        try:
+            driver = slot.ensure()
+            try: jsessionid = _submit_login_form(driver, url, username, password)
+            except TimeoutException: jsessionid = None # Wrong credentials or slow portal; the driver itself is fine
+            slot.jobs += 1; self._count('jobs')
+            if not jsessionid: self._count('failures')
+            self._clear_browser_state(driver)
+            if slot.jobs >= self.max_jobs: slot.recycle(); self._count('recycled')
+            return jsessionid
+        except Exception:
+            slot.recycle(); self._count('recycled'); self._count('failures') # Crashed or wedged: start fresh next time
+            raise
+        finally: self._idle.put(slot)
+
+    def stats(self):
+        with self._lock: stats = dict(self._stats)
+        stats.update(drivers=len(self.slots), running=sum(1 for s in self.slots if s.driver is not None), idle=self._idle.qsize())
+        return stats
+
+    def close(self):
+        for slot in self.slots: slot.recycle()
+
+def _browser_daemon_handler(daemon, token):
+    """Request handler class for the daemon: one JSON line in, one JSON line out."""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try: job = json.loads(self.rfile.readline(65536) or b'{}')
+            except ValueError: job = {}
+            if not hmac.compare_digest(str(job.get('token', '')), token): reply = {'ok': False, 'error': 'bad token'}
+            elif job.get('op') == 'ping': reply = {'ok': True, 'browser': daemon.browser_choice}
+            elif job.get('op') == 'stats': reply = {'ok': True, 'stats': daemon.stats()}
+            elif job.get('op') == 'login':
+                try:
+                    jsessionid = daemon.login(job.get('url') or NIET_LOGIN_URL, job.get('username', ''), job.get('password', ''))
+                    reply = {'ok': bool(jsessionid), 'jsessionid': jsessionid, 'error': None if jsessionid else 'login failed'}
+                except queue.Empty: reply = {'ok': False, 'error': 'all drivers busy'}
+                except Exception as e: reply = {'ok': False, 'error': f"driver error: {e}"}
+            else: reply = {'ok': False, 'error': 'unknown op'}
+            self.wfile.write((json.dumps(reply) + '\n').encode('utf-8'))
+    return Handler
+
+def run_browser_daemon(browser_choice='firefox', drivers=BROWSER_DAEMON_DRIVERS, max_jobs=BROWSER_DAEMON_MAX_JOBS, port=0):
+    """Runs the browser daemon in the foreground until interrupted. Its port and access token go to
+    BROWSER_DAEMON_FILE (mode 0600) so logins in other runs of the tracker can find it."""
+    if not SELENIUM_AVAILABLE:
+        print(f"{C_ERROR}{E_ERROR} Selenium unavailable. (pip install selenium beautifulsoup4 webdriver-manager){C_RESET}"); return
+    daemon = BrowserDaemon(browser_choice, drivers, max_jobs)
+    start_loading(f"{E_GEAR} Starting {drivers} headless {browser_choice.capitalize()} driver(s)...")
+    started = daemon.warm_up()
+    stop_loading(f"{E_COMPUTER} {started}/{len(daemon.slots)} driver(s) ready.")
+    token = secrets.token_hex(16)
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', port), _browser_daemon_handler(daemon, token))
+    server.daemon_threads = True
+    info = {'pid': os.getpid(), 'port': server.server_address[1], 'token': token, 'browser': browser_choice}
+    _atomic_write(BROWSER_DAEMON_FILE, json.dumps(info).encode('utf-8'), mode=0o600) # The token authorises logins
+    print(f"{C_SUCCESS}{E_SUCCESS} Browser daemon listening on 127.0.0.1:{info['port']} (recycle after {daemon.max_jobs} logins). Ctrl+C to stop.{C_RESET}")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        server.server_close(); daemon.close()
+        try: os.remove(BROWSER_DAEMON_FILE)
+        except OSError: pass
+        print(f"\n{C_INFO}{E_WAVE} Browser daemon stopped. {daemon.stats()}{C_RESET}")
+
+def browser_daemon_request(job, timeout=BROWSER_DAEMON_TIMEOUT):
+    """Sends one job to the running browser daemon. Returns its reply dict, or None if no daemon is reachable."""
+    try:
+        with open(BROWSER_DAEMON_FILE, 'r', encoding='utf-8') as f: info = json.load(f)
+        with socket.create_connection(('127.0.0.1', int(info['port'])), timeout=timeout) as sock:
+            sock.sendall((json.dumps(dict(job, token=info['token'])) + '\n').encode('utf-8'))
+            line = sock.makefile('rb').readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError, KeyError, TypeError): return None
+
+def login_via_browser_daemon(url, username, password, quiet=False):
+    """Logs in on the warm browser daemon. Returns (username, jsessionid) or (None, None), or None if no daemon is running."""
+    reply = browser_daemon_request({'op': 'login', 'url': url, 'username': username, 'password': password}, timeout=BROWSER_DAEMON_TIMEOUT + 60)
+    if reply is None: return None
+    if reply.get('ok') and reply.get('jsessionid'):
+        if not quiet: print(f"{C_SUCCESS}{E_SUCCESS} Logged in via browser daemon. JSESSIONID obtained.{C_RESET}")
+        return username, reply['jsessionid']
+    if not quiet: print(f"{C_WARNING}{E_WARNING} Browser daemon login failed: {reply.get('error')}{C_RESET}")
+    return None, None
+
 # === Attendance Data Fetching ===
-def fetch_attendance_data(jsessionid, bypass_ssl_verify=False):
-    """Fetches attendance data using JSESSIONID. Can bypass SSL verification."""
-    if not jsessionid: print(f"{C_ERROR}{E_ERROR} JSESSIONID required.{C_RESET}"); return None
+def fetch_attendance_data(jsessionid, bypass_ssl_verify=False, username=None, use_cache=True, force_refresh=False,
+                          term_id=DEFAULT_TERM_ID, quiet=False, save_to_file=True, timeout=45, errors=None):
+    """Fetches attendance data using JSESSIONID. Can bypass SSL verification.
+    Served from the response cache while fresh; revalidated with ETag/Last-Modified once the TTL expires.
+    quiet=True suppresses progress output and the spinner so the call is safe from worker threads.
+    With an `errors` list, error messages are appended to it instead of printed and bad responses are not dumped to
+    the shared debug files (such calls run alongside others, e.g. one per term or batch account)."""
+    def report(msg):
+        if errors is None: print(msg)
+        elif msg: errors.append(msg)
+    if not jsessionid: report(f"{C_ERROR}{E_ERROR} JSESSIONID required.{C_RESET}"); return None
     cookies = {'JSESSIONID': jsessionid}
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.0.0 Safari/537.36', 'Accept': 'application/json, text/javascript, */*; q=0.01', 'X-Requested-With': 'XMLHttpRequest', 'Referer': 'https://nietcloud.niet.co.in/studentCourseFileNew.htm'}
-    params = {'termId': '2', 'refreshData': '0'}
+    headers = dict(NIET_API_HEADERS)
+    params = {'termId': str(term_id), 'refreshData': '0'}
     url = NIET_ATTENDANCE_URL
-    print(f"\n{C_INFO}{E_ROCKET} Fetching attendance data...{C_RESET}")
-    start_loading("Requesting from NIET Cloud...")
-    data, response, raw_text = None, None, ""
+    cache = cache_key = cached = None
+    if use_cache:
+        cache = get_response_cache()
+        cache_key = cache.make_key(username or _session_user_key(jsessionid), params['termId'], url)
+        cached = cache.get(cache_key)
+        if cached and not force_refresh and cache.is_fresh(cached):
+            data = cache.load_json(cached)
+            if data is not None:
+                cache.count('hits', cached['size'])
+                if not quiet: print(f"{C_SUCCESS}{E_REUSE} Using cached attendance data ({int(cache.age(cached) // 60)} min old).{C_RESET}")
+                return data
+        if cached: headers.update(cache.conditional_headers(cached))
+    if not quiet:
+        print(f"\n{C_INFO}{E_ROCKET} Fetching attendance data...{C_RESET}")
+        start_loading("Requesting from NIET Cloud...")
+    data, response = None, None
     verify_ssl = True
     if bypass_ssl_verify:
-        print(f"{C_WARNING}{E_WARNING} Bypassing SSL certificate verification.{C_RESET}")
+        if not quiet: print(f"{C_WARNING}{E_WARNING} Bypassing SSL certificate verification.{C_RESET}")
         try: urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         except AttributeError: pass
         verify_ssl = False
     try:
-        response = requests.get(url, params=params, cookies=cookies, headers=headers, timeout=45, verify=verify_ssl)
-        stop_loading()
+        response = get_http_manager().get(url, label='attendance', params=params, cookies=cookies, headers=headers, timeout=timeout, verify=verify_ssl)
+        if not quiet: stop_loading()
+        if cached and response.status_code == 304: # Not modified since our cached copy
+            data = cache.load_json(cached)
+            if data is not None:
+                cache.touch(cache_key, cached); cache.count('revalidated', cached['size'])
+                if not quiet: print(f"{C_SUCCESS}{E_REUSE} Attendance unchanged on server, using cached copy.{C_RESET}")
+                return data
         content_type = response.headers.get('Content-Type', '').lower()
-        try: raw_text = response.content.decode('utf-8', errors='replace')
-        except Exception: raw_text = str(response.content) # Fallback
 
         # Optional Debug Prints can remain commented out or enabled as needed
         # print(f"\n{C_DIM}--- Request Debug Info ---")
@@ -498,109 +1166,1005 @@ def fetch_attendance_data(jsessionid, bypass_ssl_verify=False):
         response.raise_for_status() # Check for HTTP errors AFTER getting potential content
 
         if 'application/json' not in content_type:
-             print(f"{C_ERROR}{E_ERROR} Server didn't return JSON (Content-Type: '{content_type}'). Cannot parse.{C_RESET}")
+             report(f"{C_ERROR}{E_ERROR} Server didn't return JSON (Content-Type: '{content_type}'). Cannot parse.{C_RESET}")
              # ******** FIX START ********
+             if errors is not None: return None
              try:
-                 with open("non_json_response.txt", "w", encoding="utf-8") as f:
-                     f.write(raw_text)
+                 with open("non_json_response.txt", "wb") as f:
+                     f.write(response.content)
                  # This print should be outside the 'with' block if it's just confirming the save
-                 print(f"{C_INFO}Unexpected response saved to non_json_response.txt{C_RESET}")
+                 report(f"{C_INFO}Unexpected response saved to non_json_response.txt{C_RESET}")
              except Exception as save_err:
-                 print(f"{C_WARNING}Could not save non-JSON response: {save_err}{C_RESET}")
+                 report(f"{C_WARNING}Could not save non-JSON response: {save_err}{C_RESET}")
              # ******** FIX END ********
              return None
 
-        # If content type IS JSON, proceed to decode
-        data = response.json()
-        try:
-            with open(ATTENDANCE_FILE, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4)
-            print(f"{C_SUCCESS}{E_SUCCESS} Fresh data saved to '{ATTENDANCE_FILE}'.{C_RESET}")
-        except (IOError, TypeError) as e: print(f"{C_WARNING}{E_WARNING} Could not save data to {ATTENDANCE_FILE}: {e}{C_RESET}")
-
-    except requests.exceptions.Timeout: print(f"{C_ERROR}{E_ERROR} Request timed out.{C_RESET}")
-    except requests.exceptions.SSLError as e: print(f"{C_ERROR}{E_ERROR} SSL Error: {e}.{C_YELLOW} Server cert issue?{C_RESET}")
-    except requests.exceptions.ConnectionError as e: print(f"{C_ERROR}{E_ERROR} Connection Error: {e}.{C_INFO} Check network/firewall.{C_RESET}")
-    except requests.exceptions.HTTPError as e: print(f"{C_ERROR}{E_ERROR} HTTP Error: {e}. {C_YELLOW} Check JSESSIONID validity.{C_RESET}" if response and response.status_code in [401, 403] else "")
-    except requests.exceptions.RequestException as e: print(f"{C_ERROR}{E_ERROR} Network Error: {e}{C_RESET}")
+        # If content type IS JSON, proceed to decode (straight from bytes; no decoded text copy is kept)
+        data = json.loads(response.content)
+        if cache:
+            cache.count('misses')
+            cache.put(cache_key, response.content, response.headers, user=username, term_id=params['termId'], endpoint=url)
+        record_history(data, username, params['termId'], response.content, quiet=quiet, jsessionid=jsessionid)
+        if save_to_file: save_attendance_data(data)
+
+    except requests.exceptions.Timeout: report(f"{C_ERROR}{E_ERROR} Request timed out.{C_RESET}")
+    except requests.exceptions.SSLError as e: report(f"{C_ERROR}{E_ERROR} SSL Error: {e}.{C_YELLOW} Server cert issue?{C_RESET}")
+    except requests.exceptions.ConnectionError as e: report(f"{C_ERROR}{E_ERROR} Connection Error: {e}.{C_INFO} Check network/firewall.{C_RESET}")
+    except requests.exceptions.HTTPError as e: report(f"{C_ERROR}{E_ERROR} HTTP Error: {e}. {C_YELLOW} Check JSESSIONID validity.{C_RESET}" if response and response.status_code in [401, 403] else "")
+    except requests.exceptions.RequestException as e: report(f"{C_ERROR}{E_ERROR} Network Error: {e}{C_RESET}")
     except json.JSONDecodeError as e:
-        print(f"{C_ERROR}{E_ERROR} Failed to decode JSON response: {e}{C_RESET}\n{C_INFO}Check debug output or saved 'json_decode_error_response.txt'.{C_RESET}")
-        if raw_text:
+        report(f"{C_ERROR}{E_ERROR} Failed to decode JSON response: {e}{C_RESET}\n{C_INFO}Check debug output or saved 'json_decode_error_response.txt'.{C_RESET}")
+        if response is not None and response.content and errors is None:
             # ******** FIX START (Repeated Fix - Ensure correct indentation here too) ********
             try:
-                with open("json_decode_error_response.txt", "w", encoding="utf-8") as f:
-                    f.write(raw_text)
-                print(f"{C_INFO}Problematic response saved to json_decode_error_response.txt{C_RESET}")
+                with open("json_decode_error_response.txt", "wb") as f:
+                    f.write(response.content)
+                report(f"{C_INFO}Problematic response saved to json_decode_error_response.txt{C_RESET}")
             except Exception as save_err:
-                print(f"{C_WARNING}Could not save error response: {save_err}{C_RESET}")
+                report(f"{C_WARNING}Could not save error response: {save_err}{C_RESET}")
             # ******** FIX END ********
-    except Exception as e: print(f"{C_ERROR}{E_ERROR} Unexpected error during fetch: {e}\n{C_DIM}{traceback.format_exc()}{C_RESET}")
+    except Exception as e: report(f"{C_ERROR}{E_ERROR} Unexpected error during fetch: {e}\n{C_DIM}{traceback.format_exc()}{C_RESET}")
     finally:
         # Ensure loading stops even if there was an error before this point
-        if _loading_thread and _loading_thread.is_alive(): stop_loading()
+        if not quiet and _loading_thread and _loading_thread.is_alive(): stop_loading()
     return data
 
+_JSON_STRUCT_RE = re.compile(r'[\[\]{}"\\]')
+
+class JsonArrayStream:
+    """Incrementally splits a top-level JSON array into its element objects as text arrives.
+    Only the element currently being received is buffered."""
+    def __init__(self):
+        self._buf = ''; self._pos = 0; self._depth = 0; self._start = None
+        self._in_str = False; self._skip_next = False; self._seen_array = False
+
+    def feed(self, text):
+        """Consumes a text chunk and yields every element object it completes."""
+        buf = self._buf + text; pos = self._pos
+        if self._skip_next and pos < len(buf): pos += 1; self._skip_next = False # Escape split across chunks
+        while not self._skip_next:
+            m = _JSON_STRUCT_RE.search(buf, pos)
+            if not m: pos = len(buf); break
+            ch = m.group(); pos = m.end()
+            if self._in_str:
+                if ch == '\\':
+                    if pos >= len(buf): self._skip_next = True
+                    else: pos += 1
+                elif ch == '"': self._in_str = False
+                continue
+            if ch == '"': self._in_str = True
+            elif ch in '[{':
+                if not self._seen_array:
+                    if ch != '[': raise ValueError("Expected a JSON array of subjects")
+                    self._seen_array = True
+                self._depth += 1
+                if self._depth == 2 and ch == '{': self._start = m.start()
+            else:
+                self._depth -= 1
+                if self._depth == 1 and ch == '}' and self._start is not None:
+                    yield json.loads(buf[self._start:pos]); self._start = None
+        keep_from = self._start if self._start is not None else pos
+        self._buf = buf[keep_from:]; self._pos = pos - keep_from
+        if self._start is not None: self._start = 0
+
+    def close(self):
+        """Raises ValueError if the array was never closed (truncated payload)."""
+        if not self._seen_array or self._depth != 0 or self._in_str: raise ValueError("Truncated JSON array")
+
+def stream_attendance_data(jsessionid, bypass_ssl_verify=False, term_id=DEFAULT_TERM_ID, raw_file=ATTENDANCE_FILE, timeout=45, chunk_size=STREAM_CHUNK_SIZE):
+    """Yields subject dicts one by one while the response downloads, writing the raw bytes to `raw_file`
+    (None to skip) as they arrive. Bypasses the response cache. Raises requests exceptions / ValueError on failure."""
+    if bypass_ssl_verify:
+        try: urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        except AttributeError: pass
+    response = get_http_manager().get(NIET_ATTENDANCE_URL, label='attendance', params={'termId': str(term_id), 'refreshData': '0'},
+                                      cookies={'JSESSIONID': jsessionid}, headers=NIET_API_HEADERS, timeout=timeout, verify=not bypass_ssl_verify, stream=True)
+    with response:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '').lower()
+        if 'application/json' not in content_type: raise ValueError(f"Server didn't return JSON (Content-Type: '{content_type}')")
+        splitter = JsonArrayStream(); decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        tmp_path = f"{raw_file}.part" if raw_file else None
+        out = open(tmp_path, 'wb') if tmp_path else None
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if out: out.write(chunk)
+                yield from splitter.feed(decoder.decode(chunk))
+            yield from splitter.feed(decoder.decode(b'', final=True))
+            splitter.close()
+            if out: out.close(); out = None; os.replace(tmp_path, raw_file) # Only replace the old file once complete
+        finally:
+            if out: out.close()
+            if tmp_path and os.path.exists(tmp_path): os.remove(tmp_path)
+
+def fetch_attendance_data_streaming(jsessionid, bypass_ssl_verify=False, term_id=DEFAULT_TERM_ID, raw_file=ATTENDANCE_FILE, timeout=45, quiet=False, username=None):
+    """Streaming counterpart of fetch_attendance_data: same return value (subject list or None) and error reporting."""
+    if not jsessionid: print(f"{C_ERROR}{E_ERROR} JSESSIONID required.{C_RESET}"); return None
+    if not quiet: print(f"\n{C_INFO}{E_ROCKET} Streaming attendance data...{C_RESET}"); start_loading("Receiving from NIET Cloud...")
+    try:
+        as_snapshot = raw_file == ATTENDANCE_FILE and ATTENDANCE_STORE_FORMAT == 'snapshot' # Same format as fetch_attendance_data
+        data = list(stream_attendance_data(jsessionid, bypass_ssl_verify, term_id, None if as_snapshot else raw_file, timeout))
+        if not quiet: stop_loading(f"{E_SUCCESS} Received {len(data)} subjects" + (f", raw data saved to '{raw_file}'." if raw_file and not as_snapshot else "."))
+        if as_snapshot: save_attendance_data(data)
+        record_history(data, username, str(term_id), quiet=quiet, jsessionid=jsessionid)
+        return data
+    except requests.exceptions.Timeout: print(f"{C_ERROR}{E_ERROR} Request timed out.{C_RESET}")
+    except requests.exceptions.SSLError as e: print(f"{C_ERROR}{E_ERROR} SSL Error: {e}.{C_YELLOW} Server cert issue?{C_RESET}")
+    except requests.exceptions.ConnectionError as e: print(f"{C_ERROR}{E_ERROR} Connection Error: {e}.{C_INFO} Check network/firewall.{C_RESET}")
+    except requests.exceptions.RequestException as e: print(f"{C_ERROR}{E_ERROR} Network Error: {e}{C_RESET}")
+    except ValueError as e: print(f"{C_ERROR}{E_ERROR} Could not parse streamed response: {e}{C_RESET}")
+    finally:
+        if not quiet and _loading_thread and _loading_thread.is_alive(): stop_loading()
+    return None
+
+def set_attendance_store_format(store_format):
+    """Chooses how fresh fetches are saved: 'json' (ATTENDANCE_FILE) or 'snapshot' (ATTENDANCE_SNAPSHOT_FILE)."""
+    global ATTENDANCE_STORE_FORMAT
+    if store_format not in ('json', 'snapshot'): raise ValueError(f"Unknown store format: {store_format}")
+    ATTENDANCE_STORE_FORMAT = store_format
+
+def save_attendance_data(data, json_file=None):
+    """Writes fetched attendance data as a snapshot (ATTENDANCE_SNAPSHOT_FILE) or pretty JSON (ATTENDANCE_FILE)."""
+    use_snapshot = json_file is None and ATTENDANCE_STORE_FORMAT == 'snapshot'
+    target = ATTENDANCE_SNAPSHOT_FILE if use_snapshot else (json_file or ATTENDANCE_FILE)
+    try:
+        if use_snapshot: write_snapshot(data, target)
+        else:
+            with open(target, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4)
+        print(f"{C_SUCCESS}{E_SUCCESS} Fresh data saved to '{target}'.{C_RESET}")
+    except (IOError, OSError, TypeError, ValueError) as e: print(f"{C_WARNING}{E_WARNING} Could not save data to {target}: {e}{C_RESET}")
+
+def fetch_attendance_terms(jsessionid, term_ids=None, bypass_ssl_verify=False, username=None, max_workers=MAX_TERM_FETCH_WORKERS, force_refresh=False, quiet=False):
+    """Fetches several terms concurrently and merges them into one list, each subject tagged with 'termId'.
+    With term_ids=None every id in TERM_PROBE_IDS is probed and terms returning no subjects are dropped; their
+    errors are expected and only shown when no term returns data. quiet=True suppresses progress output."""
+    if not jsessionid: print(f"{C_ERROR}{E_ERROR} JSESSIONID required.{C_RESET}"); return None
+    discovering = term_ids is None
+    term_ids = [str(t) for t in (TERM_PROBE_IDS if discovering else term_ids)]
+    if not quiet:
+        print(f"\n{C_INFO}{E_ROCKET} Fetching {len(term_ids)} term(s) {'(discovery)' if discovering else ''}...{C_RESET}")
+        start_loading(f"Requesting {len(term_ids)} terms from NIET Cloud...")
+    results = {}; errors = {t: [] for t in term_ids}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(term_ids)))) as pool:
+            futures = {pool.submit(fetch_attendance_data, jsessionid, bypass_ssl_verify, username, term_id=t, quiet=True, save_to_file=False,
+                                   force_refresh=force_refresh, errors=errors[t]): t for t in term_ids}
+            for future in as_completed(futures):
+                try: results[futures[future]] = future.result()
+                except Exception as e: errors[futures[future]].append(f"{C_WARNING}{E_WARNING} Term {futures[future]} failed: {e}{C_RESET}")
+    finally:
+        if not quiet: stop_loading()
+    merged = merge_term_data({t: results.get(t) for t in term_ids})
+    found = [t for t in term_ids if isinstance(results.get(t), list) and results[t]]
+    for t in term_ids:
+        if t not in found and (not found or not discovering): # A requested term failing always matters; a probe only if all fail
+            for msg in errors[t]: print(f"{C_DIM}Term {t}:{C_RESET} {msg}")
+    if not found: print(f"{C_ERROR}{E_ERROR} No term returned attendance data.{C_RESET}"); return None
+    if not quiet: print(f"{C_SUCCESS}{E_SUCCESS} Got {len(merged)} subjects across terms: {', '.join(found)}.{C_RESET}")
+    save_attendance_data(merged)
+    return merged
+
+def merge_term_data(term_results):
+    """Merges {termId: subject list} into one list of subject dicts tagged with their 'termId'."""
+    merged = []
+    for term_id, subjects in term_results.items():
+        if not isinstance(subjects, list): continue
+        for sub in subjects:
+            if isinstance(sub, dict): merged.append(dict(sub, termId=str(term_id)))
+    return merged
+
+def get_term_ids(data):
+    """Returns the distinct termIds tagged in a (possibly merged) dataset, in first-seen order."""
+    if not isinstance(data, list): return []
+    return list(dict.fromkeys(str(sub['termId']) for sub in data if isinstance(sub, dict) and sub.get('termId') is not None))
+
+def filter_by_term(data, term_id=None):
+    """Returns only the subjects of one term (all subjects when term_id is None)."""
+    if term_id is None or not isinstance(data, list): return data
+    return [sub for sub in data if isinstance(sub, dict) and str(sub.get('termId')) == str(term_id)]
+
+# === Attendance Snapshots ===
+# Layout: fixed header, then the (optionally compressed) payload. A list of subject dicts is stored as columns: the
+# short fields as compact JSON rows, and every long text field (the class logs, nearly all of the bytes) in one UTF-8
+# text column that is decoded once and sliced on load, so no JSON string scanning happens for the bulk of the data.
+# Anything else is stored as plain JSON. Compression is zstd when the optional 'zstandard' package is installed
+# (inflates faster than the JSON parses); without it snapshots are left uncompressed, since zlib inflates slower.
+SNAPSHOT_MAGIC = b'NIETSNAP'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_CODEC_JSON = 1; SNAPSHOT_CODEC_COLUMNS = 2
+SNAPSHOT_COMPRESS_NONE = 0; SNAPSHOT_COMPRESS_ZLIB = 1; SNAPSHOT_COMPRESS_ZSTD = 2
+SNAPSHOT_TEXT_MIN = 128 # String fields at least this long go to the text column
+_SNAPSHOT_HEADER = struct.Struct('>8sHBBBdQ32s') # magic, version, codec, codec version, compression, created_at, raw size, sha256(payload)
+_SNAPSHOT_META_SIZE = struct.Struct('>I') # Columns codec: length of the JSON part before the text column
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot is corrupt, truncated or written by an unsupported version."""
+
+def _encode_columns(data):
+    """List of dicts -> raw columns payload: meta length, JSON {'rows', 'text': [[row, key, start, end], ...]}, text."""
+    rows = []; refs = []; parts = []; pos = 0
+    for i, sub in enumerate(data):
+        row = {}
+        for key, value in sub.items():
+            if isinstance(value, str) and len(value) >= SNAPSHOT_TEXT_MIN:
+                parts.append(value); refs.append([i, key, pos, pos + len(value)]); pos += len(value)
+            else: row[key] = value
+        rows.append(row)
+    meta = json.dumps({'rows': rows, 'text': refs}, separators=(',', ':')).encode('utf-8')
+    return _SNAPSHOT_META_SIZE.pack(len(meta)) + meta + ''.join(parts).encode('utf-8')
+
+def _decode_columns(raw):
+    try:
+        (meta_size,) = _SNAPSHOT_META_SIZE.unpack_from(raw); offset = _SNAPSHOT_META_SIZE.size
+        meta = json.loads(bytes(raw[offset:offset + meta_size])); rows = meta['rows']
+        text = str(raw[offset + meta_size:], 'utf-8')
+        for i, key, start, end in meta['text']: rows[i][key] = text[start:end]
+        return rows
+    except (struct.error, KeyError, IndexError, TypeError, ValueError) as e: raise SnapshotError(f"Malformed snapshot columns: {e}") from None
+
+def write_snapshot(data, path=ATTENDANCE_SNAPSHOT_FILE, compression=None):
+    """Writes JSON-serialisable data as a versioned, checksummed snapshot (temp file + rename)."""
+    if compression is None: compression = SNAPSHOT_COMPRESS_ZSTD if ZSTD_AVAILABLE else SNAPSHOT_COMPRESS_NONE
+    if isinstance(data, list) and all(isinstance(sub, dict) and all(isinstance(k, str) for k in sub) for sub in data):
+        codec = SNAPSHOT_CODEC_COLUMNS; raw = _encode_columns(data)
+    else: codec = SNAPSHOT_CODEC_JSON; raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    if compression == SNAPSHOT_COMPRESS_ZSTD: payload = zstandard.ZstdCompressor(level=10).compress(raw)
+    elif compression == SNAPSHOT_COMPRESS_ZLIB: payload = zlib.compress(raw, 6)
+    else: payload = raw
+    header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, codec, 0, compression, time.time(), len(raw), hashlib.sha256(payload).digest())
+    _atomic_write(path, header + payload)
+
+def read_snapshot(path=ATTENDANCE_SNAPSHOT_FILE):
+    """Loads and verifies a snapshot written by write_snapshot. Raises SnapshotError on any mismatch."""
+    with open(path, 'rb') as f: blob = f.read()
+    if len(blob) < _SNAPSHOT_HEADER.size: raise SnapshotError("File too short for a snapshot header")
+    magic, version, codec, _, compression, _, raw_size, digest = _SNAPSHOT_HEADER.unpack_from(blob)
+    if magic != SNAPSHOT_MAGIC: raise SnapshotError("Not an attendance snapshot")
+    if version > SNAPSHOT_VERSION: raise SnapshotError(f"Snapshot version {version} is newer than supported ({SNAPSHOT_VERSION})")
+    if codec not in (SNAPSHOT_CODEC_JSON, SNAPSHOT_CODEC_COLUMNS): raise SnapshotError(f"Unknown snapshot codec: {codec}")
+    payload = memoryview(blob)[_SNAPSHOT_HEADER.size:]
+    if hashlib.sha256(payload).digest() != digest: raise SnapshotError("Checksum mismatch (corrupt or truncated snapshot)")
+    if compression == SNAPSHOT_COMPRESS_ZSTD:
+        if not ZSTD_AVAILABLE: raise SnapshotError("Snapshot is zstd-compressed; install 'zstandard' or re-export it")
+        raw = zstandard.ZstdDecompressor().decompress(payload, max_output_size=raw_size)
+    elif compression == SNAPSHOT_COMPRESS_ZLIB: raw = zlib.decompress(payload)
+    elif compression == SNAPSHOT_COMPRESS_NONE: raw = payload
+    else: raise SnapshotError(f"Unknown snapshot compression: {compression}")
+    if len(raw) != raw_size: raise SnapshotError("Decompressed size mismatch")
+    if codec == SNAPSHOT_CODEC_COLUMNS: return _decode_columns(memoryview(raw))
+    return json.loads(bytes(raw))
+
+def is_snapshot_file(path):
+    """True if `path` starts with the snapshot magic bytes."""
+    try:
+        with open(path, 'rb') as f: return f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+    except (IOError, OSError): return False
+
+def default_attendance_file():
+    """The most recently written of ATTENDANCE_SNAPSHOT_FILE / ATTENDANCE_FILE (ATTENDANCE_FILE if neither exists)."""
+    existing = [p for p in (ATTENDANCE_SNAPSHOT_FILE, ATTENDANCE_FILE) if os.path.exists(p)]
+    return max(existing, key=os.path.getmtime) if existing else ATTENDANCE_FILE
+
+def export_snapshot_json(snapshot_file=ATTENDANCE_SNAPSHOT_FILE, json_file=ATTENDANCE_FILE):
+    """Exports a snapshot back to the pretty-printed JSON format."""
+    try:
+        data = read_snapshot(snapshot_file)
+        with open(json_file, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4)
+        print(f"{C_SUCCESS}{E_SUCCESS} Exported '{snapshot_file}' to '{json_file}'.{C_RESET}"); return True
+    except Exception as e: print(f"{C_ERROR}{E_ERROR} Export failed: {e}{C_RESET}"); return False
+
+def benchmark_snapshot(json_file=ATTENDANCE_FILE, repeat=5):
+    """Compares size and load time of the pretty JSON file against the snapshot compression variants."""
+    if os.path.exists(json_file) and not is_snapshot_file(json_file):
+        with open(json_file, 'r', encoding='utf-8') as f: data = json.load(f)
+        source = f"'{json_file}'"
+    else: data = _synthetic_attendance(subjects=60, entries_per_subject=3000); source = "synthetic data"
+    print(f"\n{C_HEADER}{E_GEAR} Snapshot benchmark ({source}, best of {repeat}){C_RESET}")
+    tmp_dir = f".snapbench{os.getpid()}"; os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        json_path = os.path.join(tmp_dir, "a.json")
+        with open(json_path, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4)
+        def load_json():
+            with open(json_path, 'r', encoding='utf-8') as f: return json.load(f)
+        candidates = [("JSON (indent=4)", json_path, load_json)]
+        variants = [("uncompressed", SNAPSHOT_COMPRESS_NONE), ("zlib", SNAPSHOT_COMPRESS_ZLIB)]
+        if ZSTD_AVAILABLE: variants.insert(0, ("zstd", SNAPSHOT_COMPRESS_ZSTD))
+        for name, compression in variants:
+            path = os.path.join(tmp_dir, f"a.{compression}.snap"); write_snapshot(data, path, compression=compression)
+            candidates.append((f"Snapshot {name}", path, lambda path=path: read_snapshot(path)))
+        base_time = None
+        for name, path, loader in candidates:
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter(); loaded = loader(); best = min(best, time.perf_counter() - start)
+            if loaded != data: print(f"{C_ERROR}{E_ERROR} {name}: round-trip mismatch!{C_RESET}")
+            base_time = base_time or best
+            print(f"  {name:<22} size {os.path.getsize(path)/1024:>9.1f} KiB   load {best*1000:>8.2f} ms   {base_time/best:>5.1f}x")
+        if not ZSTD_AVAILABLE: print(f"{C_DIM}  (pip install zstandard for snapshots that are both small and fast to load){C_RESET}")
+    finally:
+        for name in os.listdir(tmp_dir): os.remove(os.path.join(tmp_dir, name))
+        os.rmdir(tmp_dir)
+
+def _synthetic_attendance(subjects=10, entries_per_subject=600, seed=7):
+    """Builds a deterministic fake attendance payload in the portal's format (for benchmarks)."""
+    rng = random.Random(seed); start = date(2024, 1, 1); data = []
+    slots = [("09:00", "09:50"), ("10:00", "10:50"), ("11:00", "11:50"), ("13:00", "13:50"), ("14:00", "15:40")]
+    for i in range(subjects):
+        entries = []; present = 0
+        for j in range(entries_per_subject):
+            d = start + timedelta(days=j * 7 // 5); s_t, e_t = rng.choice(slots)
+            status = 'Present' if rng.random() < 0.82 else 'Absent'; present += status == 'Present'
+            entries.append(f"{d.strftime('%b %d, %Y')}^^^{s_t}^^^{e_t}^^^{status}^^^{'Lab' if e_t == '15:40' else 'Lecture'}^^^{j}")
+        data.append({'subject': f"Synthetic Subject {i + 1}", 'subjectCode': f"SYN{100 + i}", 'presentCount': present,
+                     'absentCount': entries_per_subject - present, 'studentAttendanceData': ";".join(entries)})
+    return data
+
+# === Attendance History ===
+# One row per class ever seen, keyed on (user, subject, date, start, session); a later fetch that reports the same
+# class updates it in place (status corrections) instead of adding a duplicate. Every fetch adds a snapshots row
+# (plus per-subject portal counts), so "as of" and "added since" questions are index range scans.
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY, user TEXT NOT NULL, fetched_at REAL NOT NULL, term_id TEXT, source TEXT,
+    subjects INTEGER NOT NULL, present INTEGER NOT NULL, total INTEGER NOT NULL, payload_sha256 TEXT, new_entries INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS snapshots_user_time ON snapshots (user, fetched_at);
+CREATE TABLE IF NOT EXISTS snapshot_subjects (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id), code TEXT NOT NULL, name TEXT, term_id TEXT,
+    present INTEGER NOT NULL, absent INTEGER NOT NULL, PRIMARY KEY (snapshot_id, code, term_id));
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY, user TEXT NOT NULL, subject TEXT NOT NULL, date TEXT NOT NULL, start TEXT NOT NULL,
+    end TEXT, session TEXT NOT NULL, status TEXT NOT NULL, term_id TEXT,
+    first_snapshot INTEGER NOT NULL REFERENCES snapshots (id), last_snapshot INTEGER NOT NULL, first_seen REAL NOT NULL,
+    UNIQUE (user, subject, date, start, session));
+-- status is included so per-subject counts up to a date are answered from the index alone
+CREATE INDEX IF NOT EXISTS entries_user_subject_date ON entries (user, subject, date, status);
+CREATE INDEX IF NOT EXISTS entries_user_first_seen ON entries (user, first_seen);
+"""
+
+class HistoryStore:
+    """SQLite store of every fetch (see _HISTORY_SCHEMA). Each call uses its own connection, so batch worker
+    threads can record concurrently; WAL mode lets queries run while a fetch is being written."""
+    def __init__(self, path=HISTORY_DB_FILE):
+        self.path = path
+        with self._connect() as conn: conn.executescript(_HISTORY_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=NORMAL")
+            with conn: yield conn # Commits on success, rolls back on error
+        finally: conn.close()
+
+    @staticmethod
+    def _entry_rows(sub):
+        """(date, start, end, session, status) for each well-formed class of a subject; ISO dates sort as text."""
+        log = AttendanceLog.from_subject(sub, quiet=True); strings = log.strings
+        for j in range(len(log)):
+            yield (date.fromordinal(log.dates[j]).isoformat(), log._clock_text(log.starts[j]), log._clock_text(log.ends[j]),
+                   strings[log.sessions[j]], _status_display(strings[log.statuses[j]])[0])
+
+    def record(self, data, user, source='fetch', term_id=None, payload=None):
+        """Stores one fetched data set under `user`. Returns (snapshot id, classes not seen before)."""
+        now = time.time()
+        subjects = [sub for sub in data if isinstance(sub, dict) and sub.get('subjectCode')]
+        model = AttendanceModel.from_data(subjects) if subjects else None
+        digest = hashlib.sha256(payload if payload is not None else json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+        with self._connect() as conn:
+            snapshot_id = conn.execute("INSERT INTO snapshots (user, fetched_at, term_id, source, subjects, present, total, payload_sha256) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                       (user, now, term_id, source, len(subjects), model.present if model else 0, model.total if model else 0, digest)).lastrowid
+            conn.executemany("INSERT OR REPLACE INTO snapshot_subjects VALUES (?, ?, ?, ?, ?, ?)",
+                             [(snapshot_id, s.code, s.name, str(s.term_id if s.term_id is not None else term_id or ''), s.present, s.absent) for s in (model.subjects if model else ())])
+            before = conn.execute("SELECT COUNT(*) FROM entries WHERE user = ?", (user,)).fetchone()[0]
+            for sub in subjects:
+                sub_term = str(sub.get('termId', term_id or ''))
+                conn.executemany("""INSERT INTO entries (user, subject, date, start, end, session, status, term_id, first_snapshot, last_snapshot, first_seen)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                    ON CONFLICT (user, subject, date, start, session) DO UPDATE SET
+                                    status = excluded.status, end = excluded.end, last_snapshot = excluded.last_snapshot""",
+                                 [(user, sub['subjectCode'], *row, sub_term, snapshot_id, snapshot_id, now) for row in self._entry_rows(sub)])
+            added = conn.execute("SELECT COUNT(*) FROM entries WHERE user = ?", (user,)).fetchone()[0] - before
+            conn.execute("UPDATE snapshots SET new_entries = ? WHERE id = ?", (added, snapshot_id))
+        return snapshot_id, added
+
+    def users(self):
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute("SELECT user FROM snapshots GROUP BY user ORDER BY MAX(fetched_at) DESC")]
+
+    def first_fetch(self, user):
+        with self._connect() as conn: return conn.execute("SELECT MIN(fetched_at) FROM snapshots WHERE user = ?", (user,)).fetchone()[0]
+
+    def subject_names(self, user):
+        """{code: name} from the user's most recent snapshot that listed each subject."""
+        with self._connect() as conn:
+            return dict(conn.execute("""SELECT ss.code, ss.name FROM snapshot_subjects ss JOIN snapshots s ON s.id = ss.snapshot_id
+                                        WHERE s.user = ? ORDER BY s.fetched_at""", (user,)))
+
+    def attendance_as_of(self, user, as_of):
+        """[(subject, present, absent)] counting classes held on or before `as_of` (a date or 'YYYY-MM-DD')."""
+        as_of = as_of.isoformat() if isinstance(as_of, date) else str(as_of)
+        with self._connect() as conn:
+            return conn.execute("""SELECT subject, SUM(status = 'Present'), SUM(status = 'Absent') FROM entries
+                                   WHERE user = ? AND date <= ? GROUP BY subject ORDER BY subject""", (user, as_of)).fetchall()
+
+    def entries_added_since(self, user, since):
+        """Classes first seen in a fetch at or after `since` (epoch seconds), newest first:
+        [(first_seen, subject, date, start, end, session, status)]."""
+        with self._connect() as conn:
+            return conn.execute("""SELECT first_seen, subject, date, start, end, session, status FROM entries
+                                   WHERE user = ? AND first_seen >= ? ORDER BY first_seen DESC, date DESC, start DESC""", (user, since)).fetchall()
+
+_history_store = None
+_history_lock = threading.Lock()
+
+def get_history_store():
+    """Returns the process-wide HistoryStore, creating the database on first use."""
+    global _history_store
+    with _history_lock:
+        if _history_store is None: _history_store = HistoryStore()
+        return _history_store
+
+def record_history(data, username=None, term_id=None, payload=None, quiet=False, jsessionid=None):
+    """Adds a fetch to the history database; failures only warn, the fetched data is still used.
+    Fetches made with only a JSESSIONID are kept under the same per-session key as the response cache."""
+    user = username or (_session_user_key(jsessionid) if jsessionid else None)
+    if not HISTORY_ENABLED or not user or not isinstance(data, list) or not data: return None
+    try:
+        snapshot_id, added = get_history_store().record(data, user, term_id=term_id, payload=payload)
+        if not quiet and added: print(f"{C_INFO}{E_SAVE} {added} new class(es) added to history.{C_RESET}")
+        return snapshot_id
+    except sqlite3.Error as e:
+        print(f"{C_WARNING}{E_WARNING} Could not record history in '{HISTORY_DB_FILE}': {e}{C_RESET}"); return None
+
+def _history_user(store, username=None):
+    """The requested user, else the only (or most recently fetched) user in the database."""
+    if username: return username
+    users = store.users()
+    if len(users) > 1: print(f"{C_INFO}History has {len(users)} users ({', '.join(users)}); showing '{users[0]}'. Use --user=NAME to choose.{C_RESET}")
+    return users[0] if users else None
+
+def show_history_as_of(as_of, username=None):
+    """Prints per-subject and overall attendance counting only classes held on or before `as_of` (YYYY-MM-DD)."""
+    try: as_of = date.fromisoformat(as_of)
+    except (TypeError, ValueError): print(f"{C_ERROR}{E_ERROR} Invalid date '{as_of}'. Use YYYY-MM-DD.{C_RESET}"); return
+    store = get_history_store(); user = _history_user(store, username)
+    if not user: print(f"{C_WARNING}{E_WARNING} No history recorded yet in '{HISTORY_DB_FILE}'.{C_RESET}"); return
+    start = time.perf_counter(); counts = store.attendance_as_of(user, as_of); elapsed = time.perf_counter() - start
+    names = store.subject_names(user)
+    data = [{'subjectCode': code, 'subject': names.get(code, code), 'presentCount': p, 'absentCount': a} for code, p, a in counts]
+    print(f"\n{C_TITLE}{E_CALENDAR} Attendance for '{user}' as of {as_of.strftime('%b %d, %Y')}{C_RESET}")
+    if not data: print(f"{C_INFO}No classes recorded on or before that date.{C_RESET}"); return
+    model = AttendanceModel.from_data(data)
+    print_styled_table(summary_rows(model), left_columns=(f'{E_BOOK} Course',))
+    print(f"{C_DIM}Query took {elapsed * 1000:.1f} ms.{C_RESET}")
+
+def show_history_added(days=7, username=None):
+    """Prints the classes that first appeared in fetches made during the last `days` days."""
+    store = get_history_store(); user = _history_user(store, username)
+    if not user: print(f"{C_WARNING}{E_WARNING} No history recorded yet in '{HISTORY_DB_FILE}'.{C_RESET}"); return
+    start = time.perf_counter(); rows = store.entries_added_since(user, time.time() - days * 86400); elapsed = time.perf_counter() - start
+    print(f"\n{C_TITLE}{E_CALENDAR} Classes added for '{user}' in the last {days:g} day(s): {len(rows)}{C_RESET}")
+    first = store.first_fetch(user)
+    if first and first >= time.time() - days * 86400: print(f"{C_DIM}History starts {datetime.fromtimestamp(first):%b %d, %Y %H:%M}; classes from that first fetch are included.{C_RESET}")
+    if rows:
+        print_styled_table([{'Fetched': f"{datetime.fromtimestamp(seen):%b %d %H:%M}", 'Subject': subject, f'{E_CALENDAR} Date': date.fromisoformat(day).strftime('%b %d, %Y'),
+                             f'{E_CLOCK} Time': f"{st}-{en}", 'Session': session, 'Status': status, '_style': _status_display(status)[2]}
+                            for seen, subject, day, st, en, session, status in rows])
+    print(f"{C_DIM}Query took {elapsed * 1000:.1f} ms.{C_RESET}")
+
 # === Data Loading / Processing / Display ===
-def load_attendance_data(json_file=ATTENDANCE_FILE):
-    """Loads attendance data from a JSON file."""
+def load_attendance_data(json_file=None):
+    """Loads attendance data from a JSON file or a snapshot (detected by its magic bytes)."""
+    json_file = json_file or default_attendance_file()
     try:
-        with open(json_file,'r', encoding='utf-8') as f: print(f"{C_INFO}{E_INFO} Loading data from '{C_CYAN}{json_file}{C_INFO}'...{C_RESET}"); return json.load(f)
+        print(f"{C_INFO}{E_INFO} Loading data from '{C_CYAN}{json_file}{C_INFO}'...{C_RESET}")
+        if is_snapshot_file(json_file): return read_snapshot(json_file)
+        with open(json_file,'r', encoding='utf-8') as f: return json.load(f)
     except FileNotFoundError: print(f"{C_ERROR}{E_ERROR} File not found: '{json_file}'.{C_RESET}"); return None
     except json.JSONDecodeError: print(f"{C_ERROR}{E_ERROR} Invalid JSON in '{json_file}'.{C_RESET}"); return None
+    except (SnapshotError, zlib.error, MemoryError) as e: print(f"{C_ERROR}{E_ERROR} Invalid snapshot '{json_file}': {e}{C_RESET}"); return None
     except Exception as e: print(f"{C_ERROR}{E_ERROR} Error loading {json_file}: {e}{C_RESET}"); return None
 
-# --- MODIFIED: extract_summary_data (for rich) ---
-def extract_summary_data(data):
-    """Extracts and formats summary attendance data for display, preparing for rich."""
-    if not isinstance(data, list): print(f"{C_ERROR}{E_ERROR} Invalid data format.{C_RESET}"); return [], 0, 0
-    summary=[]; total_p=0; total_c=0
-    for sub in data:
-        if not isinstance(sub, dict): print(f"{C_WARNING}{E_WARNING} Skipping invalid entry: {sub}{C_RESET}"); continue
-        try:
-            p=int(sub.get('presentCount',0)); a=int(sub.get('absentCount',0)); t=p+a
-            perc=(p/t*100)if t>0 else 0.0
-            perc_s=f"{perc:.2f}%"
-            emoji = ""; rich_style = "" # Rich style string
-
-            if t > 0:
-                if perc < 75: rich_style, emoji = "bold red", E_SAD
-                elif perc < 85: rich_style, emoji = "bold yellow", E_NEUTRAL
-                else: rich_style, emoji = "bold green", E_HAPPY
-            else: rich_style, emoji = "dim", " " # Dim for N/A, space for alignment
-
-            subj_name = sub.get('subject', 'N/A'); subj_code = sub.get('subjectCode', 'N/A')
-            summary.append({
-                'Code': f"{subj_code}", # Plain code
-                f'{E_BOOK} Course': f"{subj_name}", # Plain name
-                'Count': f"{p}/{t}",
-                f'{E_CHART_UP} %': perc_s, # Plain percentage string
-                ' ': emoji, # Emoji
-                '_style': rich_style # Internal key for rich style
-            })
-            total_p+=p; total_c+=t
-        except (ValueError, TypeError) as e: print(f"{C_WARNING}{E_WARNING} Error processing subject ({sub.get('subjectCode','N/A')}): {e}. Skipping.{C_RESET}"); continue
-
-    ov_perc=(total_p/total_c*100)if total_c>0 else 0.0
-    ov_emoji = ""; ov_rich_style = ""
-    if total_c > 0:
-        if ov_perc < 75: ov_rich_style, ov_emoji = "bold red", E_SAD
-        elif ov_perc < 85: ov_rich_style, ov_emoji = "bold yellow", E_NEUTRAL
-        else: ov_rich_style, ov_emoji = "bold green", E_HAPPY
-    else: ov_rich_style, ov_emoji = "dim", " "
-    ov_perc_s = f"{ov_perc:.2f}%"
-
+# === Attendance Model ===
+BAND_LOW_BELOW = 75.0 # Percentages below this are 'low' (red)
+BAND_MID_BELOW = 85.0 # ... below this 'mid' (yellow), otherwise 'high' (green)
+CLASSES_PER_WEEKDAY = (7, 7, 7, 7, 7, 6, 0) # Classes scheduled Mon-Sun; 0 marks a non-teaching weekday
+SESSION_TYPES = ('lecture', 'lab', 'other') # Buckets for the portal's free-text session field (see session_type)
+SUBJECT_MIN_PERCENTAGE = 75.0 # Default per-subject minimum for the per-subject calculator (menu option 12)
+TREND_WINDOWS = (7, 14, 30) # Rolling windows (days) reported by trend_report
+BAND_DISPLAY = {'low': ("bold red", E_SAD), 'mid': ("bold yellow", E_NEUTRAL), 'high': ("bold green", E_HAPPY), 'none': ("dim", " ")}
+
+def attendance_band(percentage, total=1):
+    """'low' / 'mid' / 'high' for a percentage, or 'none' when there are no classes."""
+    if not total: return 'none'
+    return 'low' if percentage < BAND_LOW_BELOW else 'mid' if percentage < BAND_MID_BELOW else 'high'
+
+def band_display(percentage, total=1):
+    """(rich style, emoji) for a percentage."""
+    return BAND_DISPLAY[attendance_band(percentage, total)]
+
+@dataclass(frozen=True)
+class SubjectAttendance:
+    """One subject's counts, computed once."""
+    code: str
+    name: str
+    present: int
+    absent: int
+    total: int
+    percentage: float
+    band: str
+    term_id: Optional[str] = None
+
+@dataclass(frozen=True)
+class AttendanceModel:
+    """Per-subject and overall attendance computed in one pass over the data. Renderers and calculators read
+    from it instead of recounting; to_dict() gives the same numbers for machine consumers."""
+    subjects: Tuple[SubjectAttendance, ...]
+    present: int
+    total: int
+    percentage: float
+    band: str
+    term_id: Optional[str] = None
+    session_type: Optional[str] = None
+
+    @property
+    def absent(self): return self.total - self.present
+
+    @classmethod
+    def from_data(cls, data, term_id=None, session_type=None):
+        """Builds the model from portal data (optionally one term of a merged data set). Invalid subjects are
+        skipped with the same warnings extract_summary_data has always printed.
+        With session_type ('lecture', 'lab' or 'other') the counts come from the class logs of that type only,
+        and subjects without such classes are left out."""
+        data = filter_by_term(data, term_id)
+        if not isinstance(data, list): print(f"{C_ERROR}{E_ERROR} Invalid data format.{C_RESET}"); return None
+        subjects = []; total_p = 0; total_c = 0
+        for sub in data:
+            if not isinstance(sub, dict): print(f"{C_WARNING}{E_WARNING} Skipping invalid entry: {sub}{C_RESET}"); continue
+            try:
+                if session_type:
+                    p, a = get_detail_cache().get(sub).session_counts().get(session_type, (0, 0))
+                    if not p + a: continue
+                else: p = int(sub.get('presentCount', 0)); a = int(sub.get('absentCount', 0))
+                t = p + a
+                perc = (p / t * 100) if t > 0 else 0.0
+                subjects.append(SubjectAttendance(code=sub.get('subjectCode', 'N/A'), name=sub.get('subject', 'N/A'), present=p, absent=a, total=t,
+                                                  percentage=perc, band=attendance_band(perc, t), term_id=sub.get('termId')))
+                total_p += p; total_c += t
+            except (ValueError, TypeError) as e: print(f"{C_WARNING}{E_WARNING} Error processing subject ({sub.get('subjectCode','N/A')}): {e}. Skipping.{C_RESET}"); continue
+        ov_perc = (total_p / total_c * 100) if total_c > 0 else 0.0
+        return cls(subjects=tuple(subjects), present=total_p, total=total_c, percentage=ov_perc, band=attendance_band(ov_perc, total_c),
+                   term_id=term_id, session_type=session_type)
+
+    def to_dict(self):
+        return dict(asdict(self), absent=self.absent, generated_at=datetime.now().isoformat(timespec='seconds'))
+
+def summary_rows(model):
+    """Display rows for the summary table (subjects then TOTAL), with rich styles under '_style'."""
+    summary = []
+    for sub in model.subjects:
+        rich_style, emoji = BAND_DISPLAY[sub.band]
+        summary.append({
+            'Code': f"{sub.code}", # Plain code
+            f'{E_BOOK} Course': f"{sub.name}", # Plain name
+            'Count': f"{sub.present}/{sub.total}",
+            f'{E_CHART_UP} %': f"{sub.percentage:.2f}%", # Plain percentage string
+            ' ': emoji, # Emoji
+            '_style': rich_style # Internal key for rich style
+        })
     summary.append({
         'Code': '',
         f'{E_BOOK} Course': 'TOTAL',
-        'Count': f"{total_p}/{total_c}",
-        f'{E_CHART_UP} %': ov_perc_s,
-        ' ': ov_emoji,
+        'Count': f"{model.present}/{model.total}",
+        f'{E_CHART_UP} %': f"{model.percentage:.2f}%",
+        ' ': BAND_DISPLAY[model.band][1],
         '_style': "bold white" # Style for TOTAL row (overrides percentage color)
     })
-    return summary,total_p,total_c
+    return summary
+
+# --- MODIFIED: extract_summary_data (for rich) ---
+def extract_summary_data(data, term_id=None):
+    """Extracts and formats summary attendance data for display, preparing for rich.
+    term_id restricts the summary to one term of a merged multi-term dataset."""
+    model = AttendanceModel.from_data(data, term_id)
+    if model is None: return [], 0, 0
+    return summary_rows(model), model.present, model.total
+
+# --- studentAttendanceData tokenizer ---
+@functools.lru_cache(maxsize=16384)
+def _decode_portal_date(date_text):
+    """'Jan 5, 2024' -> date ordinal. Memoised because a log repeats each date once per class that day;
+    strptime itself does the decoding so case, padding and invalid dates behave exactly as before. Raises ValueError."""
+    return datetime.strptime(date_text.strip(), '%b %d, %Y').toordinal()
+
+@functools.lru_cache(maxsize=16384)
+def _format_ordinal(ordinal):
+    """Date ordinal -> 'Jan 05, 2024' (the detail table's date format)."""
+    return date.fromordinal(ordinal).strftime('%b %d, %Y')
+
+@functools.lru_cache(maxsize=4096)
+def _clock_minutes(text):
+    """'09:50' -> 590, or None when the text is not a valid 24-hour HH:MM (such values, e.g. '09:75', are kept as text)."""
+    if len(text) == 5 and text[2] == ':' and text[:2].isdigit() and text[3:].isdigit() and text.isascii():
+        hours, minutes = int(text[:2]), int(text[3:])
+        if hours < 24 and minutes < 60: return hours * 60 + minutes
+    return None
+
+@functools.lru_cache(maxsize=1440)
+def _minutes_text(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def _status_display(status):
+    """Raw status field -> (text, emoji, rich style)."""
+    st_l = status.lower().strip()
+    if st_l == 'present': return "Present", E_PRESENT, "green"
+    if st_l == 'absent': return "Absent", E_ABSENT, "red"
+    return status, E_OTHER_STATUS, "yellow" # Unknown status text
+
+_LAB_SESSION_RE = re.compile(r'\b(?:lab|labs|laboratory|laboratories|prac|practical|practicals)\d*\b')
+_LECTURE_SESSION_RE = re.compile(r'\b(?:lect|lecture|lectures|theory)\d*\b')
+
+@functools.lru_cache(maxsize=256)
+def session_type(session):
+    """Portal session text -> 'lab', 'lecture' or 'other' (tutorials, seminars, ...), matched on whole words
+    (case-insensitive, an optional trailing number such as 'Lab2' allowed):
+    lab: lab, labs, laboratory, laboratories, prac, practical, practicals;
+    lecture: lect, lecture, lectures, theory.
+    So 'Syllabus', 'Practice test' and 'Elective' are 'other'."""
+    text = session.lower()
+    if _LAB_SESSION_RE.search(text): return 'lab'
+    if _LECTURE_SESSION_RE.search(text): return 'lecture'
+    return 'other'
+
+def iter_attendance_entries(att_str, start=0):
+    """Splits a studentAttendanceData string (from offset `start`) into its entries. Yields (entry, parts, end) where
+    parts is [date, start, end, status, session, ...] or None for a malformed entry (fewer than six fields), and end is
+    the offset just past the entry (its ';' or the end of the string). Empty entries are skipped."""
+    pos = start
+    for entry in (att_str[start:] if start else att_str).split(';'):
+        end = pos + len(entry); pos = end + 1
+        if not entry: continue
+        parts = entry.split('^^^', 6) # Only the first six fields are used
+        yield entry, (parts if len(parts) >= 6 else None), end
+
+def _common_prefix_length(a, b):
+    """Length of the common prefix of two strings (binary search over C-level slice compares)."""
+    if b.startswith(a): return len(a)
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]: lo = mid
+        else: hi = mid - 1
+    return lo
+
+class RollingTrend:
+    """Present/total classes per day as prefix sums over the sorted class days, so the count for any date window is
+    two bisects and a subtraction. Classes are added (or removed, with negative counts) one at a time: a class on or
+    after the newest day is O(1); an older one shifts the later sums."""
+    __slots__ = ('days', 'present', 'total')
+
+    def __init__(self):
+        self.days = array('i'); self.present = array('i'); self.total = array('i') # present/total are cumulative
+
+    def add(self, day, present, total=1):
+        days = self.days
+        if not days or day > days[-1]:
+            days.append(day); self.present.append((self.present[-1] if self.present else 0) + present)
+            self.total.append((self.total[-1] if self.total else 0) + total); return
+        i = bisect.bisect_left(days, day)
+        if days[i] != day:
+            days.insert(i, day); self.present.insert(i, self.present[i - 1] if i else 0); self.total.insert(i, self.total[i - 1] if i else 0)
+        for j in range(i, len(days)): self.present[j] += present; self.total[j] += total
+
+    def counts(self, window, as_of):
+        """(present, total) for classes in the `window` days ending on ordinal `as_of` (inclusive); window=None counts
+        every class up to as_of."""
+        hi = bisect.bisect_right(self.days, as_of) - 1
+        if hi < 0: return 0, 0
+        lo = bisect.bisect_right(self.days, as_of - window) - 1 if window is not None else -1
+        if lo < 0: return self.present[hi], self.total[hi]
+        return self.present[hi] - self.present[lo], self.total[hi] - self.total[lo]
+
+    def last_day(self):
+        return self.days[-1] if self.days else None
+
+class AttendanceLog:
+    """One subject's class log held column-wise in typed arrays, in portal order (~22 bytes per class):
+    date ordinal, start/end minutes, session/status codes into a per-log table of interned strings, and the
+    offset where each entry ends in the raw string; `order` lists the rows newest first for display.
+    A start/end time that is not plain HH:MM is stored as -(1 + index) into the string table so it renders unchanged.
+    Display rows (the dicts extract_detailed_attendance returns) are built only when asked for.
+    `warnings` keeps the malformed-entry/date-error messages; `status_counts` maps status code -> classes.
+    refresh() re-parses only what changed at the end of the raw string, and keeps trend() in step."""
+    HEADERS = ['Sr', f'{E_CALENDAR} Date', f'{E_CLOCK} Time', 'Session', 'Status', ' ']
+    __slots__ = ('dates', 'starts', 'ends', 'sessions', 'statuses', 'offsets', 'order', 'strings', '_codes',
+                 'warnings', '_warning_offsets', 'status_counts', 'raw', '_trend')
+
+    def __init__(self):
+        self.dates = array('i'); self.starts = array('i'); self.ends = array('i')
+        self.sessions = array('H'); self.statuses = array('H'); self.offsets = array('i'); self.order = array('i')
+        self.strings = []; self._codes = {}; self.warnings = []; self._warning_offsets = []; self.status_counts = {}; self.raw = ''
+        self._trend = None
+
+    def _intern(self, text):
+        code = self._codes.get(text)
+        if code is None: code = self._codes[text] = len(self.strings); self.strings.append(text)
+        return code
+
+    def _clock(self, text):
+        minutes = _clock_minutes(text)
+        return minutes if minutes is not None else -1 - self._intern(text)
+
+    @classmethod
+    def parse(cls, att_str, quiet=False):
+        """Builds a log from a studentAttendanceData string, printing the same warnings as extract_detailed_attendance
+        (quiet=True only records them, e.g. when parsing off the main thread)."""
+        log = cls()
+        if isinstance(att_str, (bytes, bytearray)): att_str = att_str.decode('utf-8')
+        if not att_str: return log
+        log.raw = att_str; log._parse_from(0, quiet)
+        order = list(range(len(log.dates))); dates = log.dates
+        if any(dates[i] < dates[i + 1] for i in range(len(dates) - 1)):
+            order.sort(key=dates.__getitem__, reverse=True) # Stable: same-day classes keep portal order
+        log.order = array('i', order)
+        return log
+
+    @classmethod
+    def from_subject(cls, sub_data, quiet=False):
+        return cls.parse(sub_data.get('studentAttendanceData', ''), quiet=quiet)
+
+    def _parse_from(self, start, quiet):
+        """Appends the rows for raw[start:]; `order` is left for the caller."""
+        counts = self.status_counts
+        for entry, parts, end in iter_attendance_entries(self.raw, start):
+            if parts is None: message = f"{C_WARNING}Malformed entry: {entry}{C_RESET}"
+            else:
+                try:
+                    ordinal = _decode_portal_date(parts[0])
+                    status = self._intern(parts[3]); counts[status] = counts.get(status, 0) + 1
+                    self.dates.append(ordinal); self.starts.append(self._clock(parts[1])); self.ends.append(self._clock(parts[2]))
+                    self.statuses.append(status); self.sessions.append(self._intern(parts[4])); self.offsets.append(end)
+                    continue
+                except ValueError: message = f"{C_WARNING}Date parse error: {entry}{C_RESET}"
+            self.warnings.append(message); self._warning_offsets.append(end)
+            if not quiet: print(message)
+
+    def refresh(self, att_str, quiet=False):
+        """Brings the log up to date with a newer studentAttendanceData string in place. Rows whose entries lie in the
+        unchanged prefix are kept; only the rest is parsed, so the cost follows the number of new or changed classes.
+        Returns the number of entries parsed."""
+        if isinstance(att_str, (bytes, bytearray)): att_str = att_str.decode('utf-8')
+        old = self.raw; att_str = att_str or ''
+        if att_str == old: return 0
+        prefix = _common_prefix_length(old, att_str)
+        # An entry is unchanged if it and its terminator lie in the common prefix (the last entry has no ';' in `old`)
+        keep_through = prefix if prefix < len(old) or (len(att_str) > prefix and att_str[prefix] != ';') else prefix + 1
+        kept = bisect.bisect_left(self.offsets, keep_through); warnings_kept = bisect.bisect_left(self._warning_offsets, keep_through)
+        restart = max(self.offsets[kept - 1] + 1 if kept else 0, self._warning_offsets[warnings_kept - 1] + 1 if warnings_kept else 0)
+
+        n = len(self.dates); dropped = n - kept
+        for code in self.statuses[kept:]: self.status_counts[code] -= 1
+        if self._trend is not None: self._apply_trend(kept, n, -1)
+        for column in (self.dates, self.starts, self.ends, self.sessions, self.statuses, self.offsets): del column[kept:]
+        del self.warnings[warnings_kept:]; del self._warning_offsets[warnings_kept:]
+        if dropped:
+            head = self.order[:dropped] # Replaced rows are usually the newest, i.e. at the front of the display order
+            self.order = self.order[dropped:] if all(j >= kept for j in head) else array('i', (j for j in self.order if j < kept))
+
+        self.raw = att_str; parsed_before = len(self.warnings) + len(self.dates)
+        self._parse_from(restart, quiet)
+        self._merge_new_rows(kept)
+        if self._trend is not None: self._apply_trend(kept, len(self.dates), 1)
+        return len(self.warnings) + len(self.dates) - parsed_before
+
+    def _merge_new_rows(self, first_new):
+        """Adds rows first_new.. to `order`. New classes are normally on or after the newest kept date, which is a
+        prepend; anything else falls back to a full stable sort."""
+        dates = self.dates; n = len(dates)
+        if first_new >= n: return
+        new_rows = sorted(range(first_new, n), key=dates.__getitem__, reverse=True)
+        if not self.order: self.order = array('i', new_rows); return
+        newest_old = dates[self.order[0]]
+        if dates[new_rows[-1]] < newest_old:
+            self.order = array('i', sorted(range(n), key=dates.__getitem__, reverse=True)); return
+        same_day_old = 0
+        while same_day_old < len(self.order) and dates[self.order[same_day_old]] == newest_old: same_day_old += 1
+        newer = [j for j in new_rows if dates[j] > newest_old]; same_day_new = new_rows[len(newer):]
+        self.order = array('i', newer) + self.order[:same_day_old] + array('i', same_day_new) + self.order[same_day_old:]
+
+    def counts(self):
+        """(present, absent) classes in the log."""
+        present = absent = 0
+        for code, count in self.status_counts.items():
+            status = _status_display(self.strings[code])[0]
+            if status == "Present": present += count
+            elif status == "Absent": absent += count
+        return present, absent
+
+    def __len__(self): return len(self.dates)
+
+    def session_counts(self):
+        """{session type: (present, absent)} over the log's Present/Absent classes."""
+        counts = {}
+        for (session, status), n in Counter(zip(self.sessions, self.statuses)).items():
+            status = _status_display(self.strings[status])[0]
+            if status not in ("Present", "Absent"): continue
+            entry = counts.setdefault(session_type(self.strings[session]), [0, 0]); entry[status == "Absent"] += n
+        return {k: tuple(v) for k, v in counts.items()}
+
+    def weekday_session_counts(self):
+        """{(weekday, session type): classes} over every recorded class, Monday = 0."""
+        counts = Counter()
+        for (day, session), n in Counter(zip(self.dates, self.sessions)).items():
+            counts[(day - 1) % 7, session_type(self.strings[session])] += n # Ordinal 1 (Jan 1, year 1) is a Monday
+        return counts
+
+    def _apply_trend(self, first, last, sign):
+        """Adds (sign=1) or removes (sign=-1) rows first..last-1 in the trend; only Present/Absent classes count."""
+        trend = self._trend; strings = self.strings; dates = self.dates; statuses = self.statuses
+        for j in range(first, last):
+            status = _status_display(strings[statuses[j]])[0]
+            if status in ("Present", "Absent"): trend.add(dates[j], sign * (status == "Present"), sign)
+
+    def trend(self):
+        """The log's RollingTrend, built on first use (oldest class first) and updated by refresh() from then on."""
+        if self._trend is None:
+            self._trend = RollingTrend(); present_code = {code for code in self.status_counts if _status_display(self.strings[code])[0] == "Present"}
+            counted = present_code | {code for code in self.status_counts if _status_display(self.strings[code])[0] == "Absent"}
+            dates = self.dates; statuses = self.statuses; add = self._trend.add
+            for j in reversed(self.order): # Oldest first, so every add is an append or a bump of the last day
+                if statuses[j] in counted: add(dates[j], statuses[j] in present_code)
+        return self._trend
+
+    def _clock_text(self, value):
+        return _minutes_text(value) if value >= 0 else self.strings[-1 - value]
+
+    def row(self, i):
+        """Display dict for the i-th newest class, as produced by extract_detailed_attendance."""
+        j = self.order[i]
+        text, emoji, style = _status_display(self.strings[self.statuses[j]])
+        return {'Sr': f"{i + 1}", f'{E_CALENDAR} Date': _format_ordinal(self.dates[j]),
+                f'{E_CLOCK} Time': f"{self._clock_text(self.starts[j])}-{self._clock_text(self.ends[j])}",
+                'Session': self.strings[self.sessions[j]], 'Status': text, ' ': emoji, '_style': style}
+
+    def rows(self):
+        """Lazily yields the display dicts, newest first (same as row(i), with per-log lookups hoisted)."""
+        strings = self.strings; clock = self._clock_text
+        dates, starts, ends, sessions, statuses = self.dates, self.starts, self.ends, self.sessions, self.statuses
+        displays = [_status_display(t) for t in strings] # Only status codes index into this
+        date_key, time_key = f'{E_CALENDAR} Date', f'{E_CLOCK} Time'
+        for i, j in enumerate(self.order, 1):
+            text, emoji, style = displays[statuses[j]]
+            yield {'Sr': str(i), date_key: _format_ordinal(dates[j]), time_key: f"{clock(starts[j])}-{clock(ends[j])}",
+                   'Session': strings[sessions[j]], 'Status': text, ' ': emoji, '_style': style}
+
+    def nbytes(self):
+        """Approximate memory held by the columns and the string table (not the raw string, which the data set owns)."""
+        columns = sum(c.itemsize * len(c) + sys.getsizeof(c) for c in (self.dates, self.starts, self.ends, self.sessions, self.statuses, self.offsets, self.order))
+        return columns + sum(sys.getsizeof(t) for t in self.strings) + sys.getsizeof(self.strings) + sys.getsizeof(self._codes)
+
+class DetailCache:
+    """Parsed AttendanceLogs for the menu, keyed by (subject code, term, hash of the raw log string).
+    A changed log string after a fetch hashes differently, so stale entries are never served. The subject's
+    previous log is then refreshed in place (only the changed tail is parsed) instead of being rebuilt, unless
+    several subjects of the data set share its (code, term): those always get logs of their own.
+    warm() starts a new data set, drops logs no longer in it and brings the rest up to date on a background thread."""
+    def __init__(self):
+        self._logs = {}; self._latest = {} # key -> log; (code, term) -> log
+        self._loaded_in = {}; self._shared = set(); self._generation = 0 # (code, term) -> data set it was loaded for
+        self._lock = threading.Lock(); self._warm_thread = None
+        self.hits = 0; self.misses = 0; self.refreshed = 0
+
+    @staticmethod
+    def key(sub_data):
+        raw = sub_data.get('studentAttendanceData') or ''
+        digest = hashlib.blake2b(raw.encode('utf-8') if isinstance(raw, str) else raw, digest_size=16).hexdigest()
+        return sub_data.get('subjectCode', 'N/A'), str(sub_data.get('termId', '')), digest
+
+    def _load(self, key, sub_data):
+        # Caller holds the lock, so a log is never refreshed by two threads or read mid-refresh.
+        log = self._logs.get(key)
+        if log is not None: return log
+        slot = key[:2]; previous = self._latest.get(slot)
+        if previous is not None and (slot in self._shared or self._loaded_in.get(slot) == self._generation):
+            # Another subject with the same code and term was loaded for this data set: its log is not ours to change
+            self._shared.add(slot); del self._latest[slot]; previous = None
+        if previous is not None:
+            previous.refresh(sub_data.get('studentAttendanceData') or '', quiet=True); log = previous; self.refreshed += 1
+            self._logs = {k: v for k, v in self._logs.items() if v is not previous} # Its old key no longer describes it
+        else: log = AttendanceLog.from_subject(sub_data, quiet=True)
+        self._logs[key] = log
+        if slot not in self._shared: self._latest[slot] = log; self._loaded_in[slot] = self._generation
+        return log
+
+    def get(self, sub_data):
+        """Cached log for a subject, parsing or refreshing it now if the background warm-up has not reached it yet."""
+        key = self.key(sub_data)
+        with self._lock:
+            if key in self._logs: self.hits += 1
+            else: self.misses += 1
+            return self._load(key, sub_data)
+
+    def warm(self, data):
+        """Forgets logs for subjects not in `data`, then parses/refreshes the rest in the background."""
+        subjects = [sub for sub in (data or []) if isinstance(sub, dict) and sub.get('subjectCode')]
+        keys = {self.key(sub): sub for sub in subjects}
+        with self._lock:
+            slots = Counter(k[:2] for k in keys); live = set(slots); self._generation += 1
+            self._shared = {slot for slot, n in slots.items() if n > 1}
+            self._latest = {k: v for k, v in self._latest.items() if k in live and k not in self._shared}
+            self._logs = {k: v for k, v in self._logs.items() if k[:2] in live}
+        def fill():
+            for key, sub in keys.items():
+                with self._lock: self._load(key, sub)
+        self._warm_thread = threading.Thread(target=fill, name="detail-cache-warm", daemon=True); self._warm_thread.start()
+
+    def clear(self):
+        with self._lock: self._logs.clear(); self._latest.clear(); self._loaded_in.clear(); self._shared.clear()
+
+    def __len__(self):
+        with self._lock: return len(self._logs)
+
+_detail_cache = DetailCache()
+
+def get_detail_cache():
+    return _detail_cache
+
+# --- Rolling trends ---
+def _window_stats(present, total):
+    return {'present': present, 'total': total, 'percentage': (present / total * 100) if total else None}
+
+def trend_report(data, windows=TREND_WINDOWS, as_of=None):
+    """Rolling attendance per subject and overall for each window (days ending on `as_of`, default the newest
+    class in the data). Uses the detail cache's logs, so after a refresh only new classes are folded in."""
+    cache = get_detail_cache(); subjects = []; overall = {w: [0, 0] for w in windows}
+    trends = [(sub, cache.get(sub).trend()) for sub in (data or []) if isinstance(sub, dict) and sub.get('subjectCode')]
+    if as_of is None: as_of = max((t.last_day() for _, t in trends if t.last_day() is not None), default=None)
+    elif isinstance(as_of, date): as_of = as_of.toordinal()
+    for sub, trend in trends:
+        entry = {'code': sub['subjectCode'], 'name': sub.get('subject', 'N/A'), 'term_id': sub.get('termId'), 'windows': {}}
+        for w in windows:
+            p, t = trend.counts(w, as_of) if as_of is not None else (0, 0)
+            entry['windows'][w] = _window_stats(p, t); overall[w][0] += p; overall[w][1] += t
+        p, t = trend.counts(None, as_of) if as_of is not None else (0, 0)
+        entry['cumulative'] = _window_stats(p, t); subjects.append(entry)
+    cumulative = [sum(e['cumulative'][k] for e in subjects) for k in ('present', 'total')]
+    return {'as_of': date.fromordinal(as_of).isoformat() if as_of is not None else None, 'windows': list(windows), 'subjects': subjects,
+            'overall': {'windows': {w: _window_stats(*overall[w]) for w in windows}, 'cumulative': _window_stats(*cumulative)}}
+
+def _trend_cell(stats):
+    return f"{stats['percentage']:.1f}% ({stats['present']}/{stats['total']})" if stats['total'] else "-"
+
+def _trend_arrow(report_entry, windows):
+    """Compares the shortest window that has classes with the cumulative rate."""
+    recent = next((report_entry['windows'][w] for w in windows if report_entry['windows'][w]['total']), None)
+    overall = report_entry['cumulative']['percentage']
+    if recent is None or overall is None: return " "
+    delta = recent['percentage'] - overall
+    return E_CHART_UP if delta >= 1 else E_CHART_DOWN if delta <= -1 else "➖"
+
+def display_trends(data, windows=TREND_WINDOWS):
+    """Table of rolling attendance per subject and overall, styled by the shortest window's band."""
+    report = trend_report(data, windows)
+    if report['as_of'] is None: print(f"{C_WARNING}{E_WARNING} No dated classes to aggregate.{C_RESET}"); return
+    rows = []; total = dict(report['overall'], code='', name='TOTAL')
+    for entry in report['subjects'] + [total]:
+        recent = next((entry['windows'][w] for w in windows if entry['windows'][w]['total']), None)
+        row = {'Code': entry['code'], f'{E_BOOK} Course': entry['name']}
+        row.update({f"{w}d": _trend_cell(entry['windows'][w]) for w in windows})
+        row['All'] = _trend_cell(entry['cumulative']); row[' '] = _trend_arrow(entry, windows)
+        row['_style'] = "bold white" if entry is total else (band_display(recent['percentage'])[0] if recent else "dim")
+        rows.append(row)
+    print(f"\n{C_HEADER}{E_STAR}=== Rolling Attendance (days ending {date.fromisoformat(report['as_of']).strftime('%b %d, %Y')}) ==={E_STAR}{C_RESET}\n")
+    print_styled_table(rows, left_columns=('Code', f'{E_BOOK} Course'))
 
 # --- MODIFIED: extract_detailed_attendance (for rich) ---
 def extract_detailed_attendance(sub_data):
     """Extracts and formats detailed attendance, preparing for rich."""
+    return list(AttendanceLog.from_subject(sub_data).rows())
+
+def _extract_detailed_attendance_strptime(sub_data):
+    """The original one-strptime-per-entry parser, kept as the benchmark baseline and parity reference."""
     details=[]; p_entries=[]
     att_str = sub_data.get('studentAttendanceData','');
     if not att_str: return details
@@ -610,11 +2174,7 @@ def extract_detailed_attendance(sub_data):
         if len(parts)>=6:
             d_s,s_t,e_t,st,sess,_=parts[:6]
             try:
-                d_o=datetime.strptime(d_s.strip(),'%b %d, %Y'); st_l=st.lower().strip()
-                status_text = ""; status_emoji = ""; rich_style = ""
-                if st_l=='present': status_text, status_emoji, rich_style = "Present", E_PRESENT, "green"
-                elif st_l=='absent': status_text, status_emoji, rich_style = "Absent", E_ABSENT, "red"
-                else: status_text, status_emoji, rich_style = st, E_OTHER_STATUS, "yellow" # Unknown status text
+                d_o=datetime.strptime(d_s.strip(),'%b %d, %Y'); status_text, status_emoji, rich_style = _status_display(st)
                 p_entries.append({
                     'd_o': d_o, 'Sr': 0, f'{E_CALENDAR} Date': d_o.strftime('%b %d, %Y'), f'{E_CLOCK} Time': f"{s_t}-{e_t}",
                     'Session': sess, 'Status': status_text, ' ': status_emoji, '_style': rich_style })
@@ -624,6 +2184,214 @@ def extract_detailed_attendance(sub_data):
     for i,item in enumerate(p_entries,1): item['Sr']=f"{i}"; del item['d_o']; details.append(item)
     return details
 
+def benchmark_parser(sizes=(100_000, 1_000_000), repeat=3):
+    """Times the tokenizer against the strptime baseline on synthetic logs and checks both give the same rows and warnings."""
+    print(f"\n{C_HEADER}{E_GEAR} studentAttendanceData parser benchmark (best of {repeat}){C_RESET}")
+    edge_cases = {'studentAttendanceData': "jan 5, 2024^^^09:00^^^09:50^^^ present ^^^Lecture^^^1;;Feb 30, 2024^^^09:00^^^09:50^^^Absent^^^Lab^^^2;"
+                                            "broken^^^entry;Mar  07,  2024 ^^^10:00^^^10:50^^^Leave^^^Lecture^^^3^^^x;Jan 05, 2024^^^11:00^^^11:50^^^Absent^^^Lab^^^4"}
+    outputs = []
+    for parser in (_extract_detailed_attendance_strptime, extract_detailed_attendance):
+        buf = io.StringIO()
+        with contextlib.redirect_stdout(buf): rows = parser(edge_cases)
+        outputs.append((rows, buf.getvalue()))
+    print(f"  Edge cases (case, padding, invalid date, malformed, unknown status): {'identical' if outputs[0] == outputs[1] else C_ERROR + 'MISMATCH' + C_RESET}")
+    for size in sizes:
+        per_subject = min(size, 2000) # ~8 years of classes per subject: dates repeat like a real cohort's logs
+        data = _synthetic_attendance(subjects=max(1, size // per_subject), entries_per_subject=per_subject)
+        entries = sum(sub['studentAttendanceData'].count(';') + 1 for sub in data)
+        timings = []; rows = {}
+        for name, parser in (("strptime per entry", _extract_detailed_attendance_strptime), ("dict rows via log", extract_detailed_attendance),
+                             ("AttendanceLog only", AttendanceLog.from_subject)):
+            best = float('inf')
+            for _ in range(repeat):
+                _decode_portal_date.cache_clear(); _format_ordinal.cache_clear() # Cold caches each run
+                start = time.perf_counter(); result = [parser(sub) for sub in data]; best = min(best, time.perf_counter() - start)
+            timings.append((name, best))
+            if name != "AttendanceLog only": rows[name] = result
+            del result
+        for name, best in timings:
+            print(f"  {entries:>9,} entries  {name:<20} {best:>7.3f} s   {entries / best:>12,.0f} entries/s   {timings[0][1] / best:>5.1f}x")
+        if len({repr(r) for r in rows.values()}) != 1: print(f"{C_ERROR}{E_ERROR} Parsers disagree on {entries:,} entries!{C_RESET}")
+        del rows
+        for name, build in (("dict rows", lambda: [extract_detailed_attendance(sub) for sub in data]),
+                            ("AttendanceLog", lambda: [AttendanceLog.from_subject(sub) for sub in data])):
+            tracemalloc.start(); held = build(); size = tracemalloc.get_traced_memory()[0]; tracemalloc.stop(); del held
+            print(f"  {entries:>9,} entries  {name:<20} {size / 2**20:>7.1f} MiB held   {size / entries:>8.1f} bytes/entry")
+
+# --- Whole-dataset DataFrame ---
+FRAME_COLUMNS = ['subjectCode', 'date', 'start', 'end', 'session', 'status']
+
+def attendance_frame(data):
+    """Parses every subject's studentAttendanceData at once into one DataFrame (newest first within each subject):
+    subjectCode/start/end/session/status are categoricals, date is datetime64; termId is added for multi-term data.
+    Drops the same malformed entries and bad dates as extract_detailed_attendance (without printing them)."""
+    subjects = [sub for sub in (data or []) if isinstance(sub, dict)]
+    raw = pd.Series([sub.get('studentAttendanceData') or '' for sub in subjects], index=pd.RangeIndex(len(subjects)), dtype=object)
+    entries = raw.str.split(';').explode()
+    entries = entries[entries != '']
+    parts = entries.str.split('^^^', n=6, expand=True, regex=False).reindex(columns=range(7))
+    parts = parts[parts[5].notna()] # Malformed: fewer than six fields
+    # Dates and statuses repeat heavily, so the string/date work runs on the distinct values only
+    date_codes, date_texts = pd.factorize(parts[0])
+    dates = pd.to_datetime(pd.Series(date_texts, dtype=object).str.strip(), format='%b %d, %Y', errors='coerce').to_numpy()[date_codes] # Same rules as strptime
+    valid = ~np.isnat(dates); parts = parts[valid]; dates = dates[valid]
+    status_codes, status_texts = pd.factorize(parts[3])
+    name_codes, status_names = pd.factorize(pd.Series([_status_display(t)[0] for t in status_texts], dtype=object)) # ' present' -> 'Present'
+    status = pd.Categorical.from_codes(name_codes[status_codes], categories=status_names)
+    source = parts.index.to_numpy()
+    frame = pd.DataFrame({
+        'subjectCode': pd.Categorical([subjects[i].get('subjectCode', 'N/A') for i in source]) if len(source) else pd.Categorical([]),
+        'date': dates, 'start': pd.Categorical(parts[1].to_numpy()), 'end': pd.Categorical(parts[2].to_numpy()),
+        'session': pd.Categorical(parts[4].to_numpy()), 'status': status })
+    frame['_subject'] = source # Position in `data`, so repeated codes across terms stay separate
+    if any('termId' in sub for sub in subjects): frame['termId'] = pd.Categorical([str(subjects[i].get('termId', '')) for i in source])
+    return frame.sort_values(['_subject', 'date'], ascending=[True, False], kind='stable').reset_index(drop=True)
+
+def frame_subject_view(frame, subject_code):
+    """One subject's classes, newest first."""
+    return frame[frame['subjectCode'] == subject_code].drop(columns='_subject').reset_index(drop=True)
+
+def frame_summary(frame):
+    """Per-subject present/absent/total/percentage plus overall (total_p, total_c), counting Present and Absent
+    classes like the portal's presentCount/absentCount."""
+    counted = frame[frame['status'].isin(['Present', 'Absent'])]
+    per_subject = (counted.assign(present=counted['status'] == 'Present').groupby('_subject', observed=True)
+                   .agg(subjectCode=('subjectCode', 'first'), present=('present', 'sum'), total=('present', 'size')))
+    per_subject['absent'] = per_subject['total'] - per_subject['present']
+    per_subject['percentage'] = per_subject['present'] / per_subject['total'] * 100
+    return per_subject, int(per_subject['present'].sum()), int(per_subject['total'].sum())
+
+def weekly_attendance(frame, by_subject=False):
+    """Present/total/percentage per calendar week (weeks start on Monday), optionally per subject."""
+    counted = frame[frame['status'].isin(['Present', 'Absent'])].assign(present=lambda f: f['status'] == 'Present')
+    keys = (['subjectCode'] if by_subject else []) + [pd.Grouper(key='date', freq='W-MON', label='left', closed='left')]
+    weekly = counted.groupby(keys, observed=True).agg(present=('present', 'sum'), total=('present', 'size'))
+    weekly = weekly[weekly['total'] > 0]
+    weekly['percentage'] = weekly['present'] / weekly['total'] * 100
+    return weekly
+
+def display_weekly_attendance(frame, weeks=12):
+    """Table of the last `weeks` weeks across all subjects."""
+    weekly = weekly_attendance(frame).tail(weeks)
+    if weekly.empty: print(f"{C_WARNING}{E_WARNING} No dated classes to aggregate.{C_RESET}"); return
+    rows = []
+    for week_start, rec in weekly.iterrows():
+        perc = rec['percentage']
+        rich_style, emoji = band_display(perc)
+        rows.append({f'{E_CALENDAR} Week of': week_start.strftime('%b %d, %Y'), 'Count': f"{int(rec['present'])}/{int(rec['total'])}",
+                     f'{E_CHART_UP} %': f"{perc:.2f}%", ' ': emoji, '_style': rich_style})
+    print(f"\n{C_HEADER}{E_STAR}=== Weekly Attendance (last {len(rows)} weeks) ==={E_STAR}{C_RESET}\n")
+    print_styled_table(rows, left_columns=(f'{E_CALENDAR} Week of',))
+
+WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+@dataclass(frozen=True, eq=False)
+class AttendanceHeatmap:
+    """Present/absent counts per subject x weekday (Mon=0) x time slot, as (subjects, 7, slots) int32 arrays.
+    `subjects` follows the position of each subject dict in the data; `slots` ('HH:MM-HH:MM') are sorted by start."""
+    subjects: Tuple[str, ...]
+    slots: Tuple[str, ...]
+    present: Any
+    absent: Any
+
+    @classmethod
+    def from_frame(cls, frame, subjects):
+        """One pass over an attendance_frame: every class becomes a flat (subject, weekday, slot) index and the
+        counts are two bincounts."""
+        starts, ends, status = frame['start'].cat, frame['end'].cat, frame['status'].cat
+        pairs, slot_idx = np.unique(starts.codes.to_numpy(np.int64) * len(ends.categories) + ends.codes.to_numpy(np.int64), return_inverse=True)
+        labels = [f"{starts.categories[p // len(ends.categories)]}-{ends.categories[p % len(ends.categories)]}" for p in pairs]
+        rank = sorted(range(len(labels)), key=lambda k: (_clock_minutes(labels[k][:5]) is None, labels[k])) # HH:MM starts sort by text
+        remap = np.empty(len(labels), dtype=np.int64); remap[rank] = np.arange(len(labels))
+        n_slots = len(labels); size = len(subjects) * 7 * n_slots
+        flat = (frame['_subject'].to_numpy(dtype=np.int64) * 7 + frame['date'].dt.weekday.to_numpy(dtype=np.int64)) * n_slots + remap[slot_idx.ravel()]
+        codes = status.codes.to_numpy(); shape = (len(subjects), 7, n_slots)
+        def tally(name):
+            mask = codes == (list(status.categories).index(name) if name in status.categories else -2)
+            return np.bincount(flat[mask], minlength=size).astype(np.int32).reshape(shape)
+        present = tally('Present'); absent = tally('Absent')
+        return cls(subjects=tuple(subjects), slots=tuple(labels[k] for k in rank), present=present, absent=absent)
+
+    def counts(self, subject=None):
+        """(present, absent) 7 x slots arrays for one subject position, or summed over all subjects."""
+        if subject is None: return self.present.sum(axis=0), self.absent.sum(axis=0)
+        return self.present[subject], self.absent[subject]
+
+    def to_payload(self):
+        return {'subjects': list(self.subjects), 'slots': list(self.slots), 'shape': list(self.present.shape),
+                'present': base64.b64encode(self.present.astype('<i4').tobytes()).decode('ascii'),
+                'absent': base64.b64encode(self.absent.astype('<i4').tobytes()).decode('ascii')}
+
+    @classmethod
+    def from_payload(cls, payload):
+        shape = tuple(payload['shape'])
+        return cls(subjects=tuple(payload['subjects']), slots=tuple(payload['slots']),
+                   present=np.frombuffer(base64.b64decode(payload['present']), dtype='<i4').reshape(shape),
+                   absent=np.frombuffer(base64.b64decode(payload['absent']), dtype='<i4').reshape(shape))
+
+def _dataset_digest(data):
+    """Digest of the fields the derived aggregates depend on (codes, terms and raw class logs)."""
+    h = hashlib.blake2b(digest_size=16)
+    for sub in data or []:
+        if not isinstance(sub, dict): continue
+        raw = sub.get('studentAttendanceData') or ''
+        h.update(f"{sub.get('subjectCode', 'N/A')}\0{sub.get('termId', '')}\0".encode('utf-8')); h.update(raw.encode('utf-8') if isinstance(raw, str) else raw); h.update(b'\1')
+    return h.hexdigest()
+
+def load_heatmap(data, frame=None, path=HEATMAP_CACHE_FILE):
+    """The data set's AttendanceHeatmap from the on-disk cache when it was built from the same data, otherwise built
+    (from `frame` if already parsed) and cached for the next run."""
+    key = _dataset_digest(data)
+    try:
+        if os.path.exists(path):
+            payload = read_snapshot(path)
+            if isinstance(payload, dict) and payload.get('key') == key: return AttendanceHeatmap.from_payload(payload)
+    except (SnapshotError, OSError, ValueError, KeyError, TypeError, EOFError): pass # Rebuilt below
+    subjects = [sub.get('subjectCode', 'N/A') for sub in (data or []) if isinstance(sub, dict)]
+    heatmap = AttendanceHeatmap.from_frame(frame if frame is not None else attendance_frame(data), subjects)
+    try: write_snapshot(dict(heatmap.to_payload(), key=key), path)
+    except (OSError, ValueError) as e: print(f"{C_DIM}Could not cache heatmap in '{path}': {e}{C_RESET}")
+    return heatmap
+
+def display_heatmap(heatmap, subject=None, worst=3, min_classes=3):
+    """Terminal heatmap of absence rate by weekday (rows) and time slot (columns), coloured by attendance band."""
+    present, absent = heatmap.counts(subject); total = present + absent
+    days = [d for d in range(7) if total[d].any()]; slots = [k for k in range(len(heatmap.slots)) if total[:, k].any()]
+    title = heatmap.subjects[subject] if subject is not None else "all subjects"
+    if not days: print(f"{C_WARNING}{E_WARNING} No dated classes to aggregate.{C_RESET}"); return
+    width = max(11, *(len(heatmap.slots[k]) for k in slots))
+    colours = {'low': C_LOW, 'mid': C_MID, 'high': C_HIGH, 'none': C_DIM}
+    print(f"\n{C_HEADER}{E_STAR}=== Absence by Weekday and Time Slot ({title}) ==={E_STAR}{C_RESET}\n")
+    print("Day  " + " ".join(f"{C_BOLD}{heatmap.slots[k]:>{width}}{C_RESET}" for k in slots))
+    for d in days:
+        cells = []
+        for k in slots:
+            t = int(total[d, k])
+            if not t: cells.append(f"{C_DIM}{'.':>{width}}{C_RESET}"); continue
+            a = int(absent[d, k]); rate = a / t * 100
+            cells.append(f"{colours[attendance_band(100 - rate, t)]}{f'{rate:.0f}% {a}/{t}':>{width}}{C_RESET}")
+        print(f"{WEEKDAY_NAMES[d]:<5}" + " ".join(cells))
+    print(f"{C_DIM}Cells: absence % and absent/total classes. Colours follow the {BAND_MID_BELOW:g}%/{BAND_LOW_BELOW:g}% attendance bands.{C_RESET}")
+    ranked = sorted(((absent[d, k] / total[d, k], int(absent[d, k]), int(total[d, k]), d, k) for d in days for k in slots if total[d, k] >= min_classes and absent[d, k]), reverse=True)
+    if ranked: print(f"{C_WARNING}{E_POINT_RIGHT} Most missed: " + ", ".join(f"{WEEKDAY_NAMES[d]} {heatmap.slots[k]} ({r * 100:.0f}%, {a}/{t})" for r, a, t, d, k in ranked[:worst]) + C_RESET)
+
+def benchmark_frame(sizes=(100_000, 1_000_000)):
+    """Times the vectorised whole-dataset parse against per-subject AttendanceLog parsing and checks totals."""
+    print(f"\n{C_HEADER}{E_GEAR} DataFrame parse benchmark{C_RESET}")
+    for size in sizes:
+        per_subject = min(size, 2000)
+        data = _synthetic_attendance(subjects=max(1, size // per_subject), entries_per_subject=per_subject)
+        _decode_portal_date.cache_clear()
+        start = time.perf_counter(); logs = [AttendanceLog.from_subject(sub) for sub in data]; loop_time = time.perf_counter() - start
+        start = time.perf_counter(); frame = attendance_frame(data); frame_time = time.perf_counter() - start
+        start = time.perf_counter(); _, total_p, total_c = frame_summary(frame); weekly_attendance(frame, by_subject=True); agg_time = time.perf_counter() - start
+        _, expected_p, expected_c = extract_summary_data(data)
+        same_rows = len(frame) == sum(len(log) for log in logs)
+        print(f"  {size:>9,} entries  AttendanceLog loop {loop_time:>7.3f} s   DataFrame {frame_time:>7.3f} s   summary+weekly groupby {agg_time * 1000:>7.1f} ms   "
+              f"{frame.memory_usage(deep=True).sum() / size:>6.1f} bytes/entry")
+        print(f"  {'':>9}          totals {total_p}/{total_c} vs extract_summary_data {expected_p}/{expected_c}: "
+              f"{'match' if (total_p, total_c) == (expected_p, expected_c) and same_rows else C_ERROR + 'MISMATCH' + C_RESET}")
+
 # --- REWRITTEN: display_summary (using rich with lines) ---
 def display_summary(summary_data):
     """Displays the attendance summary table using rich if available."""
@@ -707,18 +2475,91 @@ def display_summary(summary_data):
         for row_dict in summary_data: print(" | ".join(str(row_dict.get(h, '')) for h in headers))
 
 
+def print_styled_table(rows, left_columns=()):
+    """Prints row dicts (one '_style' rich style per row) with rich, tabulate or plain text, whichever is available."""
+    headers = [h for h in rows[0].keys() if not h.startswith('_')] if rows else []
+    if RICH_AVAILABLE and rows:
+        table = Table(show_header=True, header_style="bold cyan", border_style="dim", show_edge=True, box=box.SQUARE, show_lines=True)
+        for h in headers: table.add_column(h, justify="left" if h in left_columns else "right")
+        for row_dict in rows: table.add_row(*[row_dict.get(h, '') for h in headers], style=row_dict.get('_style', ''))
+        Console().print(table)
+    elif TABULATE_AVAILABLE and rows:
+        try: print(tabulate(pd.DataFrame([{h: row[h] for h in headers} for row in rows]), headers='keys', tablefmt='grid', showindex=False))
+        except Exception as e: print(f"{C_ERROR}{E_ERROR} Tabulate error: {e}{C_RESET}")
+    else:
+        if headers: print(" | ".join(headers))
+        for row_dict in rows: print(" | ".join(str(row_dict.get(h, '')) for h in headers))
+
+# --- Session types ---
+def session_breakdown(data):
+    """[(subject dict, {session type: (present, absent)})] for every subject with a code, from the cached logs."""
+    cache = get_detail_cache()
+    return [(sub, cache.get(sub).session_counts()) for sub in (data or []) if isinstance(sub, dict) and sub.get('subjectCode')]
+
+def session_weekday_shares(data, stype):
+    """Fraction of past classes on each weekday (Mon=0) that were of session type `stype`; used to turn an
+    all-classes schedule into one for that type."""
+    cache = get_detail_cache(); all_classes = Counter(); typed = Counter()
+    for sub in data or []:
+        if not isinstance(sub, dict) or not sub.get('subjectCode'): continue
+        for (weekday, kind), n in cache.get(sub).weekday_session_counts().items():
+            all_classes[weekday] += n
+            if kind == stype: typed[weekday] += n
+    return [typed[d] / all_classes[d] if all_classes[d] else 0.0 for d in range(7)]
+
+def scale_schedule(schedule, weekday_shares):
+    """Schedule with each day's classes multiplied by its weekday's share, rounded cumulatively so the total
+    over any prefix stays within half a class of the exact expectation."""
+    scaled = []; expected = 0.0; given = 0
+    for day, classes in schedule:
+        expected += classes * weekday_shares[day.weekday()]; n = math.floor(expected + 0.5) - given
+        given += n; scaled.append((day, n))
+    return Schedule(scaled)
+
+def _session_cell(counts):
+    p, a = counts; t = p + a
+    return f"{p / t * 100:.1f}% ({p}/{t})" if t else "-"
+
+def display_session_breakdown(data):
+    """Table of attendance per subject split into lecture / lab / other classes, with an overall row."""
+    rows = []; totals = {k: [0, 0] for k in SESSION_TYPES}
+    for sub, counts in session_breakdown(data):
+        row = {'Code': sub['subjectCode'], f'{E_BOOK} Course': sub.get('subject', 'N/A')}
+        for kind in SESSION_TYPES:
+            p, a = counts.get(kind, (0, 0)); totals[kind][0] += p; totals[kind][1] += a
+            row[kind.capitalize()] = _session_cell((p, a))
+        all_p = sum(c[0] for c in counts.values()); all_a = sum(c[1] for c in counts.values())
+        row['All'] = _session_cell((all_p, all_a)); row['_style'] = band_display(all_p / (all_p + all_a) * 100 if all_p + all_a else 0.0, all_p + all_a)[0]
+        rows.append(row)
+    if not rows: print(f"{C_WARNING}{E_WARNING} No subjects with class logs.{C_RESET}"); return
+    total_row = {'Code': '', f'{E_BOOK} Course': 'TOTAL'}
+    total_row.update({kind.capitalize(): _session_cell(totals[kind]) for kind in SESSION_TYPES})
+    total_row['All'] = _session_cell((sum(v[0] for v in totals.values()), sum(v[1] for v in totals.values()))); total_row['_style'] = "bold white"
+    print(f"\n{C_HEADER}{E_STAR}=== Attendance by Session Type ==={E_STAR}{C_RESET}\n")
+    print_styled_table(rows + [total_row], left_columns=('Code', f'{E_BOOK} Course'))
+
+def prompt_session_type():
+    """Asks for a session type to restrict a calculation to; None means all classes."""
+    options = ", ".join(f"{i} = {kind}" for i, kind in enumerate(SESSION_TYPES, 1))
+    while True:
+        answer = input(f"{C_PROMPT}Session type (blank = all classes, {options}): {C_RESET}").strip().lower()
+        if not answer: return None
+        if answer in SESSION_TYPES: return answer
+        if answer.isdigit() and 1 <= int(answer) <= len(SESSION_TYPES): return SESSION_TYPES[int(answer) - 1]
+        print(f"{C_WARNING}Invalid session type.{C_RESET}")
+
 # --- REWRITTEN: display_subject_details (using rich with lines) ---
 def display_subject_details(subject, details_data):
     """Displays the detailed attendance table for a subject using rich if available."""
     if not details_data: print(f"\n{C_WARNING}{E_WARNING} No details for {C_SUBJECT}{subject}{C_RESET}.{C_RESET}"); return
+    if isinstance(details_data, AttendanceLog): details_data = details_data.rows() # Rows are rendered one at a time
     
     # Clear screen before displaying header
     clear_screen()
 
     if RICH_AVAILABLE:
         console = Console()
-        headers = list(details_data[0].keys()) if details_data else []
-        headers = [h for h in headers if not h.startswith('_')]
+        headers = AttendanceLog.HEADERS
 
         table = Table(title=f"Details: [bold magenta]{subject}[/]", show_header=True, header_style="bold cyan", border_style="dim", show_edge=True, box=box.SQUARE, show_lines=True) # Added show_lines=True
         table.add_column(headers[0], style="dim", justify="right") # Sr
@@ -765,28 +2606,265 @@ def display_subject_details(subject, details_data):
     else: # Basic fallback
          subj_d=f"{C_SUBJECT}{C_BOLD}{subject}{C_RESET}"
          print(f"\n{C_HEADER}=== {E_EYES} Details: {subj_d} ==={C_RESET}\n")
-         headers = list(details_data[0].keys()) if details_data else []
-         headers = [h for h in headers if not h.startswith('_')]
+         headers = AttendanceLog.HEADERS
          if headers: print(" | ".join(headers))
          for row_dict in details_data: print(" | ".join(str(row_dict.get(h, '')) for h in headers))
 
 
+# === Academic Calendar ===
+# CSV rows (header: kind,start,end,value,label):
+#   holiday,2024-10-31,2024-11-04,,Diwali break   -> no classes (end optional, inclusive)
+#   exam,2024-12-02,2024-12-14,,End-sem exams     -> no classes
+#   weekday,Sat,,4,                               -> classes on every teaching Saturday (Mon..Sun or 0-6)
+#   classes,2024-11-09,,7,Working Saturday        -> explicit class count for those dates
+# ICS: every all-day or timed VEVENT is a non-teaching day span; 'exam' in SUMMARY/CATEGORIES marks an exam blackout.
+CALENDAR_KINDS = ('holiday', 'exam', 'weekday', 'classes')
+
+class CalendarError(ValueError):
+    """Raised when an academic calendar file cannot be parsed."""
+
+def _parse_weekday(text):
+    text = str(text).strip().lower()
+    if text.isdigit() and int(text) < 7: return int(text)
+    for i, name in enumerate(WEEKDAY_NAMES):
+        if text[:3] == name.lower(): return i
+    raise CalendarError(f"Unknown weekday '{text}'")
+
+def _class_count(text):
+    """A calendar `value` cell -> classes per day; must fit the compiled int16 day array (-1 there means 'default')."""
+    value = int(text)
+    if not 0 <= value <= 32767: raise CalendarError(f"classes value {value} is outside 0..32767")
+    return value
+
+def _parse_calendar_csv(text):
+    """CSV calendar -> (events, weekday counts): events are (start ordinal, end ordinal, kind, value, label)."""
+    events = []; weekdays = list(CLASSES_PER_WEEKDAY)
+    for line_no, row in enumerate(csv.DictReader(io.StringIO(text)), 2):
+        row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+        kind = row.get('kind', '').lower()
+        if not kind or kind.startswith('#'): continue
+        try:
+            if kind not in CALENDAR_KINDS: raise CalendarError(f"unknown kind '{kind}'")
+            if kind == 'weekday': weekdays[_parse_weekday(row.get('start', ''))] = _class_count(row.get('value') or 0); continue
+            start = date.fromisoformat(row.get('start', '')).toordinal()
+            end = date.fromisoformat(row['end']).toordinal() if row.get('end') else start
+            if end < start: raise CalendarError("end is before start")
+            events.append((start, end, kind, _class_count(row['value']) if kind == 'classes' else 0, row.get('label', '')))
+        except (ValueError, KeyError) as e: raise CalendarError(f"line {line_no}: {e}") from None # CalendarError is a ValueError
+    return events, tuple(weekdays)
+
+def _ics_date(value):
+    """DTSTART/DTEND value (YYYYMMDD or YYYYMMDDTHHMMSS[Z]) -> (ordinal, is_all_day)."""
+    value = value.strip()
+    return datetime.strptime(value[:8], '%Y%m%d').date().toordinal(), 'T' not in value
+
+def _parse_calendar_ics(text):
+    """ICS calendar -> (events, weekday counts). Recurrence rules are not expanded."""
+    events = []; current = None
+    for line in re.sub(r'\r?\n[ \t]', '', text).splitlines(): # Unfold continuation lines
+        name, _, value = line.partition(':'); key = name.split(';')[0].upper()
+        if key == 'BEGIN' and value.strip().upper() == 'VEVENT': current = {}
+        elif key == 'END' and value.strip().upper() == 'VEVENT' and current is not None:
+            if 'DTSTART' not in current: raise CalendarError("VEVENT without DTSTART")
+            try:
+                start, _ = _ics_date(current['DTSTART'])
+                if 'DTEND' in current:
+                    end, all_day = _ics_date(current['DTEND']); end = max(start, end - 1 if all_day else end) # All-day DTEND is exclusive
+                else: end = start
+            except ValueError as e: raise CalendarError(f"bad event date: {e}") from None
+            label = current.get('SUMMARY', '').strip()
+            kind = 'exam' if 'exam' in f"{label} {current.get('CATEGORIES', '')}".lower() else 'holiday'
+            events.append((start, end, kind, 0, label)); current = None
+        elif current is not None and key in ('DTSTART', 'DTEND', 'SUMMARY', 'CATEGORIES'): current[key] = value
+    return events, CLASSES_PER_WEEKDAY
+
+@dataclass(frozen=True, eq=False)
+class AcademicCalendar:
+    """A calendar file compiled to one int16 entry per day from `first_day` (ordinal): -1 keeps the weekday's
+    default count, anything else is that day's class count (0 on holidays and exam days)."""
+    first_day: int
+    day_counts: Any
+    classes_per_weekday: Tuple[int, ...]
+    events: Tuple[Tuple[int, int, str, int, str], ...]
+    source: str = ''
+    digest: str = ''
+
+    @classmethod
+    def compile(cls, events, classes_per_weekday, source='', digest=''):
+        if not events: return cls(0, np.zeros(0, dtype=np.int16), tuple(classes_per_weekday), (), source, digest)
+        first = min(e[0] for e in events); counts = np.full(max(e[1] for e in events) - first + 1, -1, dtype=np.int16)
+        for start, end, kind, value, _ in sorted(events, key=lambda e: e[2] == 'classes'): # Explicit class days win over breaks
+            counts[start - first:end - first + 1] = value
+        return cls(first, counts, tuple(classes_per_weekday), tuple(events), source, digest)
+
+    def overlay(self, first_day, counts):
+        """`counts` (one per day from first_day) with this calendar's explicit days applied."""
+        start = first_day.toordinal() - self.first_day; lo = max(start, 0); hi = min(start + len(counts), len(self.day_counts))
+        if lo >= hi: return counts
+        window = self.day_counts[lo:hi]; counts = counts.copy()
+        counts[lo - start:hi - start] = np.where(window >= 0, window, counts[lo - start:hi - start])
+        return counts
+
+    def count(self, kind):
+        return sum(end - start + 1 for start, end, k, _, _ in self.events if k == kind)
+
+    def to_payload(self):
+        return {'first_day': self.first_day, 'day_counts': base64.b64encode(self.day_counts.astype('<i2').tobytes()).decode('ascii'), 'classes_per_weekday': list(self.classes_per_weekday),
+                'events': [list(e) for e in self.events], 'source': self.source, 'digest': self.digest}
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(payload['first_day'], np.frombuffer(base64.b64decode(payload['day_counts']), dtype='<i2'), tuple(payload['classes_per_weekday']),
+                   tuple(tuple(e) for e in payload['events']), payload.get('source', ''), payload.get('digest', ''))
+
+def load_academic_calendar(path, cache_path=CALENDAR_CACHE_FILE):
+    """Compiles a .csv/.ics calendar, reusing the cached compile when the file's SHA-256 is unchanged.
+    Raises OSError / CalendarError."""
+    with open(path, 'rb') as f: blob = f.read()
+    digest = hashlib.sha256(blob).hexdigest()
+    try:
+        if os.path.exists(cache_path):
+            payload = read_snapshot(cache_path)
+            if isinstance(payload, dict) and payload.get('digest') == digest: return AcademicCalendar.from_payload(payload)
+    except (SnapshotError, OSError, ValueError, KeyError, TypeError, EOFError): pass # Recompiled below
+    text = blob.decode('utf-8-sig')
+    parser = _parse_calendar_ics if path.lower().endswith('.ics') or text.lstrip().upper().startswith('BEGIN:VCALENDAR') else _parse_calendar_csv
+    events, weekdays = parser(text)
+    calendar = AcademicCalendar.compile(events, weekdays, source=os.path.basename(path), digest=digest)
+    try: write_snapshot(calendar.to_payload(), cache_path)
+    except (OSError, ValueError) as e: print(f"{C_DIM}Could not cache calendar in '{cache_path}': {e}{C_RESET}")
+    return calendar
+
+_academic_calendar = None
+
+def get_academic_calendar():
+    """The calendar loaded with set_academic_calendar (None if none)."""
+    return _academic_calendar
+
+def set_academic_calendar(path=None, quiet=False):
+    """Loads `path` (default ACADEMIC_CALENDAR_FILE when it exists) as the calendar every schedule uses."""
+    global _academic_calendar
+    path = path or (ACADEMIC_CALENDAR_FILE if os.path.exists(ACADEMIC_CALENDAR_FILE) else None)
+    if not path: return None
+    try: _academic_calendar = load_academic_calendar(path)
+    except (OSError, CalendarError, UnicodeDecodeError) as e:
+        print(f"{C_WARNING}{E_WARNING} Could not load academic calendar '{path}': {e}{C_RESET}"); return None
+    if not quiet:
+        cal = _academic_calendar
+        print(f"{C_INFO}{E_CALENDAR} Academic calendar '{cal.source}': {cal.count('holiday')} holiday day(s), {cal.count('exam')} exam day(s), "
+              f"classes/week {'/'.join(str(n) for n in cal.classes_per_weekday)} (Mon-Sun).{C_RESET}")
+    return _academic_calendar
+
 # === Calculations (Unaffected by rich, kept as is) ===
-def generate_future_schedule(days_ahead: int, holidays: set = None) -> List[Tuple[date, int]]:
-    """Generates a schedule for future days, excluding today."""
-    if holidays is None: holidays = set()
-    schedule = []
-    curr_d = date.today()
-    classes_per_weekday = {0: 7, 1: 7, 2: 7, 3: 7, 4: 7, 5: 6, 6: 0} # Mon-Sun
-    for i in range(1, days_ahead + 1):
-        temp_d = curr_d + timedelta(days=i)
-        date_str = temp_d.strftime("%Y-%m-%d"); is_holiday = date_str in holidays
-        dow = temp_d.weekday(); cls_day = 0
-        if not is_holiday: cls_day = classes_per_weekday.get(dow, 0)
-        schedule.append((temp_d, cls_day))
-    return schedule
-
-def calculate_classes_needed_for_target(total_present: int, total_classes: int, future_schedule: List[Tuple[date, int]], target_percentage: float = 85.0) -> Tuple[int, int, float]:
+class Schedule:
+    """Future days in date order with their class counts, plus running totals of classes and of days that have
+    classes. "Days until k classes" and "classes between two dates" are binary searches on those totals.
+    Iterating yields (date, classes) pairs, as the list-based schedules did."""
+    __slots__ = ('days', 'classes', 'cumulative', 'class_days')
+
+    def __init__(self, pairs=()):
+        self.days = array('i'); self.classes = array('i'); self.cumulative = array('q'); self.class_days = array('i')
+        total = teaching = 0
+        for day, n in pairs:
+            total += n; teaching += n > 0
+            self.days.append(day.toordinal()); self.classes.append(n); self.cumulative.append(total); self.class_days.append(teaching)
+
+    @classmethod
+    def from_counts(cls, first_day, counts):
+        """Schedule for consecutive days from `first_day`, one class count per day (a NumPy integer vector)."""
+        schedule = cls(); counts = np.asarray(counts, dtype=np.int64)
+        schedule.days = array('i', range(first_day.toordinal(), first_day.toordinal() + len(counts)))
+        schedule.classes.frombytes(counts.astype(np.intc).tobytes())
+        schedule.cumulative.frombytes(np.cumsum(counts).astype(np.longlong).tobytes())
+        schedule.class_days.frombytes(np.cumsum(counts > 0).astype(np.intc).tobytes())
+        return schedule
+
+    @classmethod
+    def of(cls, schedule):
+        """`schedule` itself if it is a Schedule, else one built from (date, classes) pairs."""
+        return schedule if isinstance(schedule, cls) else cls(schedule or ())
+
+    def __iter__(self): return zip(map(date.fromordinal, self.days), self.classes)
+    def __len__(self): return len(self.days)
+
+    @property
+    def total(self): return self.cumulative[-1] if self.cumulative else 0
+
+    @property
+    def total_class_days(self): return self.class_days[-1] if self.class_days else 0
+
+    def classes_between(self, start, end):
+        """Classes on days start..end inclusive (dates)."""
+        lo = bisect.bisect_left(self.days, start.toordinal()); hi = bisect.bisect_right(self.days, end.toordinal())
+        if hi <= lo: return 0
+        return self.cumulative[hi - 1] - (self.cumulative[lo - 1] if lo else 0)
+
+    def days_to_accumulate(self, k):
+        """Days with classes needed to sit (or miss) k classes from the start, or None if the schedule has fewer."""
+        if k <= 0: return 0
+        i = bisect.bisect_left(self.cumulative, k)
+        return self.class_days[i] if i < len(self.cumulative) else None
+
+def _holiday_ordinals(holidays):
+    """Holiday dates ('YYYY-MM-DD' strings or date objects) as a set of ordinals; unparseable entries are ignored."""
+    ordinals = set()
+    for h in holidays or ():
+        try: ordinals.add(h.toordinal() if isinstance(h, date) else date.fromisoformat(str(h).strip()).toordinal())
+        except ValueError: continue
+    return ordinals
+
+def schedule_class_counts(first_day, days, holidays=None, classes_per_weekday=None, calendar=None):
+    """Class count for each of `days` consecutive days from `first_day`, computed in one pass over a datetime64 range:
+    a busdaycalendar (weekmask from the teaching weekdays, holiday array) marks teaching days, which then take
+    their weekday's count. An AcademicCalendar supplies the weekday counts and its explicit days; `holidays`
+    given here still win over both."""
+    if classes_per_weekday is None: classes_per_weekday = calendar.classes_per_weekday if calendar is not None else CLASSES_PER_WEEKDAY
+    dates = np.arange(np.datetime64(first_day, 'D'), np.datetime64(first_day, 'D') + max(days, 0))
+    holiday_days = np.array([date.fromordinal(o) for o in sorted(_holiday_ordinals(holidays))], dtype='datetime64[D]')
+    if any(classes_per_weekday):
+        busdays = np.busdaycalendar(weekmask=[bool(n) for n in classes_per_weekday], holidays=holiday_days)
+        weekdays = (dates.astype(np.int64) + 3) % 7 # 1970-01-01 was a Thursday
+        counts = np.where(np.is_busday(dates, busdaycal=busdays), np.asarray(classes_per_weekday, dtype=np.int64)[weekdays], 0)
+    else: counts = np.zeros(len(dates), dtype=np.int64)
+    if calendar is not None:
+        counts = calendar.overlay(first_day, counts)
+        if len(holiday_days): counts[np.isin(dates, holiday_days)] = 0
+    return counts
+
+def generate_future_schedule(days_ahead: int, holidays: set = None) -> Schedule:
+    """Generates a schedule for future days, excluding today (using the academic calendar when one is loaded)."""
+    first_day = date.today() + timedelta(days=1)
+    return Schedule.from_counts(first_day, schedule_class_counts(first_day, days_ahead, holidays, calendar=get_academic_calendar()))
+
+def _generate_future_schedule_loop(days_ahead, holidays=None):
+    """Day-by-day schedule builder, kept as the benchmark baseline and parity reference."""
+    holidays = _holiday_ordinals(holidays)
+    start = date.today().toordinal()
+    return Schedule((date.fromordinal(o), 0 if o in holidays else CLASSES_PER_WEEKDAY[(o - 1) % 7]) for o in range(start + 1, start + days_ahead + 1))
+
+def benchmark_schedule(horizons=(90, 365, 5 * 365), repeat=20):
+    """Times busdaycalendar schedule generation against the day-by-day loop and checks both give the same schedule."""
+    print(f"\n{C_HEADER}{E_GEAR} Schedule generation benchmark (best of {repeat}){C_RESET}")
+    rng = random.Random(7); today = date.today()
+    for days in horizons:
+        holidays = {(today + timedelta(days=rng.randrange(1, days + 1))).isoformat() for _ in range(max(1, days // 30))}
+        timings = []
+        busday = lambda n, h: Schedule.from_counts(today + timedelta(days=1), schedule_class_counts(today + timedelta(days=1), n, h)) # Calendar-free, like the loop
+        for name, build in (("day-by-day loop", _generate_future_schedule_loop), ("busdaycalendar", busday)):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter(); schedule = build(days, holidays); best = min(best, time.perf_counter() - start)
+            timings.append((name, best, schedule))
+        same = list(timings[0][2]) == list(timings[1][2]) and timings[0][2].total == timings[1][2].total
+        pairs = list(timings[1][2]) # classes_between (binary search) against a plain sum over random windows
+        for _ in range(200):
+            a, b = sorted(today + timedelta(days=rng.randrange(-5, days + 6)) for _ in range(2))
+            same = same and timings[1][2].classes_between(a, b) == sum(n for d, n in pairs if a <= d <= b)
+        for name, best, schedule in timings:
+            print(f"  {days:>5} days  {name:<16} {best * 1000:>8.3f} ms   {schedule.total:>6} classes   {timings[0][1] / best:>5.1f}x")
+        print(f"  {'':>5}       schedules and date-window totals {'identical' if same else C_ERROR + 'MISMATCH' + C_RESET}")
+
+def calculate_classes_needed_for_target(total_present: int, total_classes: int, future_schedule: Schedule, target_percentage: float = 85.0) -> Tuple[int, int, float]:
     """Calculates classes needed to reach target % considering future schedule."""
     if target_percentage > 100: target_percentage = 100
     if target_percentage <= 0: return 0, 0, (total_present / total_classes * 100) if total_classes > 0 else 0.0
@@ -797,21 +2875,120 @@ def calculate_classes_needed_for_target(total_present: int, total_classes: int,
     if denominator <= 1e-9: return float('inf'), float('inf'), curr_p
     if numerator <= 0: classes_needed_raw = 1 # Need at least 1 if below target and formula negative/zero
     else: classes_needed_raw = math.ceil(numerator / denominator)
-    classes_accumulated = 0; unique_days_needed = set(); possible_to_reach = False
-    for day_date, classes_on_day in future_schedule:
-        if classes_on_day > 0:
-            can_attend_today = min(classes_on_day, classes_needed_raw - classes_accumulated)
-            if can_attend_today > 0:
-                classes_accumulated += can_attend_today; unique_days_needed.add(day_date)
-                if classes_accumulated >= classes_needed_raw: possible_to_reach = True; break
-    if not possible_to_reach: return float('inf'), float('inf'), curr_p
-    total_future_classes_in_schedule = sum(classes for _, classes in future_schedule)
+    schedule = Schedule.of(future_schedule)
+    days_needed = schedule.days_to_accumulate(classes_needed_raw)
+    if days_needed is None: return float('inf'), float('inf'), curr_p
     projected_total_present = total_present + classes_needed_raw
-    projected_total_classes = total_classes + total_future_classes_in_schedule
+    projected_total_classes = total_classes + schedule.total
     projected_percentage = (projected_total_present / projected_total_classes * 100) if projected_total_classes > 0 else 0.0
-    return int(classes_needed_raw), len(unique_days_needed), projected_percentage
-
-def calculate_leave_allowance(total_present: int, total_classes: int, future_schedule: List[Tuple[date, int]], target_percentage: float = 85.0) -> Dict[str, any]:
+    return int(classes_needed_raw), days_needed, projected_percentage
+
+def solve_targets(total_present, total_classes, future_schedule, targets=range(1, 101)):
+    """calculate_classes_needed_for_target for many targets in one vectorised pass: the closed-form class count per
+    target, then one searchsorted over the schedule's running totals for the days. Returns a DataFrame with columns
+    target, classes_needed, days_needed, projected_percentage (inf where a target cannot be reached)."""
+    schedule = Schedule.of(future_schedule)
+    targets = np.minimum(np.asarray(list(targets), dtype=np.float64), 100.0)
+    curr_p = (total_present / total_classes * 100) if total_classes > 0 else 0.0
+    numerator = targets * total_classes - 100 * total_present; denominator = 100 - targets
+    with np.errstate(divide='ignore', invalid='ignore'):
+        needed = np.where(numerator <= 0, 1.0, np.ceil(numerator / denominator))
+    needed = np.where(denominator <= 1e-9, np.inf, needed)
+    met = (targets <= 0) | (curr_p >= targets); needed[met] = 0
+    cumulative = np.frombuffer(schedule.cumulative, dtype=np.longlong); class_days = np.frombuffer(schedule.class_days, dtype=np.intc)
+    finite = np.isfinite(needed); idx = np.full(len(targets), len(cumulative))
+    idx[finite] = np.searchsorted(cumulative, needed[finite], side='left')
+    reachable = met | (finite & (idx < len(cumulative)))
+    days = np.where(met, 0, class_days[np.minimum(idx, max(len(class_days) - 1, 0))] if len(class_days) else 0).astype(np.float64)
+    projected_total = total_classes + schedule.total
+    projected = np.where(met, curr_p, (total_present + np.where(finite, needed, 0)) / projected_total * 100 if projected_total > 0 else 0.0)
+    return pd.DataFrame({'target': targets, 'classes_needed': np.where(reachable, needed, np.inf), 'days_needed': np.where(reachable, days, np.inf),
+                         'projected_percentage': np.where(reachable, projected, curr_p)})
+
+def display_target_curve(curve, current_percentage, days_ahead):
+    """One table for the whole requirement curve; targets already met and targets out of reach are each folded into one row."""
+    def span(targets):
+        if len(targets) > 2 and (np.diff(targets.to_numpy()) == 1).all(): return f"{targets.iloc[0]:g}-{targets.iloc[-1]:g}%"
+        return ", ".join(f"{t:g}%" for t in targets)
+    met = curve[curve['classes_needed'] == 0]; impossible = curve[~np.isfinite(curve['classes_needed'])]
+    rows = []
+    if len(met): rows.append({f'{E_TARGET} Target': span(met['target']), 'Classes Needed': '0', 'Unique Days': '0', f'{E_CHART_UP}Proj. %': "already met", '_style': "green"})
+    for rec in curve[(curve['classes_needed'] > 0) & np.isfinite(curve['classes_needed'])].itertuples(index=False):
+        rows.append({f'{E_TARGET} Target': f"{rec.target:g}%", 'Classes Needed': f"{int(rec.classes_needed)}", 'Unique Days': f"{int(rec.days_needed)}",
+                     f'{E_CHART_UP}Proj. %': f"{rec.projected_percentage:.2f}%", '_style': "yellow"})
+    if len(impossible): rows.append({f'{E_TARGET} Target': span(impossible['target']), 'Classes Needed': 'impossible', 'Unique Days': '-', f'{E_CHART_UP}Proj. %': '-', '_style': "red"})
+    print(f"\n{C_HEADER}{E_TARGET}=== Requirement Curve ({days_ahead}-day schedule, current {current_percentage:.2f}%) ==={C_RESET}\n")
+    print_styled_table(rows)
+    print(f"{C_DIM}Classes Needed must be attended consecutively. Proj. % is the end-of-schedule figure if only those classes are attended.{C_RESET}")
+
+def per_subject_requirements(model, future_schedule, threshold=SUBJECT_MIN_PERCENTAGE):
+    """Leave allowance and classes needed for every subject of an AttendanceModel at once, against a per-subject
+    minimum. Each subject is assumed to keep its historical share of classes in the future schedule, so
+    "k classes of this subject" becomes one searchsorted over the schedule's running totals.
+    Returns a DataFrame (one row per subject with classes) whose `binding` column marks the subject that limits
+    leave, or that needs the most days to recover when any subject is below the minimum."""
+    schedule = Schedule.of(future_schedule); threshold = min(max(float(threshold), 0.1), 100.0)
+    subjects = [sub for sub in model.subjects if sub.total > 0]
+    present = np.array([sub.present for sub in subjects], dtype=np.float64); total = np.array([sub.total for sub in subjects], dtype=np.float64)
+    percentage = present / total * 100 if len(subjects) else np.zeros(0)
+    share = total / total.sum() if len(subjects) else np.zeros(0)
+    meets = percentage >= threshold
+    max_absences = np.where(meets, np.maximum(np.floor(present * 100 / threshold - total), 0), 0)
+    numerator = threshold * total - 100 * present; denominator = 100 - threshold
+    with np.errstate(divide='ignore', invalid='ignore'):
+        needed = np.where(meets, 0, np.where(numerator <= 0, 1, np.ceil(numerator / denominator)) if denominator > 1e-9 else np.inf)
+        overall_needed = np.ceil(needed / share); overall_skippable = np.minimum(np.ceil(max_absences / share), schedule.total) # Classes of any subject
+    cumulative = np.frombuffer(schedule.cumulative, dtype=np.longlong); class_days = np.frombuffer(schedule.class_days, dtype=np.intc)
+    def days_for(k):
+        """Vectorised Schedule.days_to_accumulate (inf where the schedule is too short)."""
+        k = np.asarray(k, dtype=np.float64); finite = np.isfinite(k) & (k > 0)
+        idx = np.full(len(k), len(cumulative)); idx[finite] = np.searchsorted(cumulative, k[finite], side='left')
+        days = np.where(idx < len(cumulative), class_days[np.minimum(idx, max(len(cumulative) - 1, 0))] if len(cumulative) else 0, np.inf)
+        return np.where(k <= 0, 0, days)
+    days_needed = np.where(meets, 0, days_for(overall_needed)); leave_days = np.where(meets, days_for(overall_skippable), 0)
+    frame = pd.DataFrame({'code': [sub.code for sub in subjects], 'name': [sub.name for sub in subjects], 'present': present.astype(int), 'total': total.astype(int),
+                          'percentage': percentage, 'meets': meets, 'max_absences': max_absences, 'classes_needed': needed,
+                          'future_classes': np.floor(schedule.total * share), 'leave_days': leave_days, 'days_needed': days_needed})
+    frame['binding'] = False
+    if len(frame):
+        if (~meets).any(): # Slowest recovery binds; ties go to the lowest percentage
+            order = np.lexsort((percentage, -np.where(meets, -1, days_needed))); binding = order[0]
+        else: binding = np.lexsort((max_absences, leave_days))[0] # Fewest leave days binds
+        frame.loc[binding, 'binding'] = True
+    return frame
+
+def display_subject_requirements(frame, threshold, days_ahead):
+    """Per-subject table for per_subject_requirements, with the binding subject called out."""
+    if frame.empty: print(f"{C_WARNING}{E_WARNING} No subjects with classes.{C_RESET}"); return
+    rows = []
+    for rec in frame.itertuples(index=False):
+        if rec.meets: need, days = f"can miss {int(rec.max_absences)}", f"{rec.leave_days:g} leave" if np.isfinite(rec.leave_days) else "-"
+        elif np.isfinite(rec.classes_needed) and np.isfinite(rec.days_needed): need, days = f"attend {int(rec.classes_needed)}", f"{rec.days_needed:g} to recover"
+        else: need, days = f"attend {int(rec.classes_needed)}" if np.isfinite(rec.classes_needed) else "impossible", "not in schedule"
+        rows.append({'Code': rec.code, f'{E_BOOK} Course': rec.name, 'Count': f"{rec.present}/{rec.total}", f'{E_CHART_UP} %': f"{rec.percentage:.2f}%",
+                     'Classes': need, 'Days': days, ' ': f"{E_WARNING} binding" if rec.binding else (E_HAPPY if rec.meets else E_SAD),
+                     '_style': ("bold " if rec.binding else "") + ("green" if rec.meets else "red")})
+    print(f"\n{C_HEADER}{E_TARGET}=== Per-Subject Requirements (minimum {threshold:g}% per subject, {days_ahead}-day schedule) ==={C_RESET}\n")
+    print_styled_table(rows, left_columns=('Code', f'{E_BOOK} Course', 'Classes', 'Days'))
+    binding = frame[frame['binding']].iloc[0]
+    if binding.meets: print(f"{C_YELLOW}{E_POINT_RIGHT} {binding['name']} [{binding.code}] limits leave: taking about {binding.leave_days:g} class day(s) off keeps every subject >= {threshold:g}%.{C_RESET}")
+    else: print(f"{C_WARNING}{E_POINT_RIGHT} {binding['name']} [{binding.code}] is the hardest to recover: " +
+               (f"{int(binding.classes_needed)} classes over about {binding.days_needed:g} class day(s).{C_RESET}" if np.isfinite(binding.days_needed) else f"it cannot reach {threshold:g}% within the schedule.{C_RESET}"))
+    print(f"{C_DIM}Assumes each subject keeps its past share of classes in the schedule.{C_RESET}")
+
+def parse_targets(text):
+    """'85' -> [85.0]; '75,80,85' -> list; 'all' / '1-100' -> range. Raises ValueError."""
+    text = text.strip().lower()
+    if text in ('all', '*'): return [float(t) for t in range(1, 101)]
+    targets = []
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        if '-' in part.strip('-'):
+            lo, hi = (float(x) for x in part.split('-', 1)); targets.extend(float(t) for t in range(math.ceil(lo), math.floor(hi) + 1))
+        else: targets.append(float(part))
+    if not targets or any(not 0 < t <= 100 for t in targets): raise ValueError("targets must be > 0 and <= 100")
+    return targets
+
+def calculate_leave_allowance(total_present: int, total_classes: int, future_schedule: Schedule, target_percentage: float = 85.0) -> Dict[str, any]:
     """Calculates max allowed absences based on current state and estimates future days."""
     if target_percentage > 100: target_percentage = 100
     if target_percentage <= 0: target_percentage = 0.1
@@ -822,49 +2999,30 @@ def calculate_leave_allowance(total_present: int, total_classes: int, future_sch
         else: max_abs = float('inf')
         if max_abs < 0: max_abs = 0
         can_m = True
-    abs_remaining = max_abs; unique_leave_days = set()
     estimated_days = 0
     if can_m and max_abs > 0 and max_abs != float('inf'):
-        for day_date, classes_on_day in future_schedule:
-            if abs_remaining <= 0: break
-            if classes_on_day > 0:
-                absences_today = min(classes_on_day, abs_remaining)
-                if absences_today > 0: abs_remaining -= absences_today; unique_leave_days.add(day_date)
-        estimated_days = len(unique_leave_days)
+        schedule = Schedule.of(future_schedule) # More absences than scheduled classes means every class day can be taken off
+        estimated_days = schedule.days_to_accumulate(min(max_abs, schedule.total))
     elif max_abs == float('inf'): estimated_days = float('inf')
     return {'current_percentage': curr_p, 'target_percentage': target_percentage, 'max_absences': int(max_abs) if max_abs != float('inf') else float('inf'), 'estimated_days_leave': estimated_days, 'can_maintain_target': can_m}
 
-def calculate_future_attendance(total_present, total_classes, end_date_str, holidays=None):
-    """Calculates projected attendance based on various future attendance rates."""
+def calculate_future_attendance(total_present, total_classes, end_date_str, holidays=None, weekday_shares=None):
+    """Calculates projected attendance based on various future attendance rates.
+    weekday_shares (see session_weekday_shares) restricts the future schedule to one session type."""
     holidays_set = set(holidays) if holidays else set()
     try:
         end_d = datetime.strptime(end_date_str, "%Y-%m-%d").date(); curr_d = date.today()
         if curr_d >= end_d: return {'error': 'End date must be in the future.'}
-        future_classes_total = 0; future_days_schedule = []; temp_d = curr_d
-        classes_per_weekday = {0: 7, 1: 7, 2: 7, 3: 7, 4: 7, 5: 6, 6: 0} # Mon-Sun
-        while temp_d <= end_d:
-            date_str = temp_d.strftime("%Y-%m-%d"); is_holiday = date_str in holidays_set
-            dow = temp_d.weekday(); cls_day = 0
-            if not is_holiday: cls_day = classes_per_weekday.get(dow, 0)
-            if temp_d > curr_d:
-                 future_days_schedule.append((temp_d, cls_day))
-                 if cls_day > 0: future_classes_total += cls_day
-            temp_d += timedelta(days=1)
+        future_days_schedule = generate_future_schedule((end_d - curr_d).days, holidays_set)
+        if weekday_shares: future_days_schedule = scale_schedule(future_days_schedule, weekday_shares)
+        future_classes_total = future_days_schedule.classes_between(curr_d + timedelta(days=1), end_d)
         future_total_classes = total_classes + future_classes_total
         curr_p = (total_present / total_classes * 100) if total_classes > 0 else 0.0
         classes_needed_for_85, _, _ = calculate_classes_needed_for_target(total_present, total_classes, future_days_schedule, 85.0)
         scenarios = []; percentages_to_check = [100, 95, 90, 85, 75, 50, 0]
         for future_attend_percent in percentages_to_check:
-            future_present_count = 0; days_required_for_classes = 0
-            if future_classes_total > 0:
-                future_present_count = math.floor(future_classes_total * (future_attend_percent / 100.0))
-                classes_to_attend_counter = future_present_count; unique_days_to_attend = set()
-                for day_date, classes_on_day in future_days_schedule:
-                    if classes_to_attend_counter <= 0: break
-                    if classes_on_day > 0:
-                        attended_today = min(classes_on_day, classes_to_attend_counter)
-                        if attended_today > 0: unique_days_to_attend.add(day_date); classes_to_attend_counter -= attended_today
-                days_required_for_classes = len(unique_days_to_attend)
+            future_present_count = math.floor(future_classes_total * (future_attend_percent / 100.0))
+            days_required_for_classes = future_days_schedule.days_to_accumulate(future_present_count)
             projected_total_present = total_present + future_present_count
             projected_percentage = (projected_total_present / future_total_classes * 100) if future_total_classes > 0 else 0.0
             scenarios.append({'future_attendance': future_attend_percent, 'classes_to_attend': future_present_count, 'days_to_attend': days_required_for_classes, 'projected_total': f"{projected_total_present}/{future_total_classes}", 'projected_percentage': round(projected_percentage, 2)})
@@ -874,9 +3032,10 @@ def calculate_future_attendance(total_present, total_classes, end_date_str, holi
 
 
 # === Calculation Display (Unaffected by rich, kept as is) ===
-def display_leave_allowance_results(result: Dict[str, any], total_p: int, total_c: int, future_schedule: List[Tuple[date, int]], target_percentage: float):
+def display_leave_allowance_results(result: Dict[str, any], total_p: int, total_c: int, future_schedule: Schedule, target_percentage: float, session_type: str = None):
     """Displays the results of the leave allowance calculation."""
-    print(f"\n{C_HEADER}{E_TARGET}=== Leave Allowance Calculator (Target: {target_percentage}%) ==={C_RESET}\n")
+    scope = f", {session_type} classes only" if session_type else ""
+    print(f"\n{C_HEADER}{E_TARGET}=== Leave Allowance Calculator (Target: {target_percentage}%{scope}) ==={C_RESET}\n")
     print(f"Current Attendance: {result['current_percentage']:.2f}% ({total_p}/{total_c})")
     if result['can_maintain_target']:
         if result['max_absences'] == float('inf'): print(f"\n{C_GREEN}{E_HAPPY} Can miss unlimited classes.{C_RESET}")
@@ -901,7 +3060,8 @@ def display_leave_allowance_results(result: Dict[str, any], total_p: int, total_
 def display_future_attendance_results(result):
     if 'error' in result: print(f"\n{C_ERROR}{E_ERROR} {result['error']}{C_RESET}"); return
     clear_screen()
-    print(f"\n{C_HEADER}{E_CALENDAR}=== Future Attendance Projection ==={C_RESET}\n")
+    scope = f" ({result['session_type']} classes only)" if result.get('session_type') else ""
+    print(f"\n{C_HEADER}{E_CALENDAR}=== Future Attendance Projection{scope} ==={C_RESET}\n")
     print(f"Current Attendance: {result['current_total']} ({result['current_percentage']}%)")
     print(f"Total Future Classes Until End Date: {result['future_classes']}")
     print(f"Projected Total Classes by End Date: {result['future_total_classes']}")
@@ -913,12 +3073,7 @@ def display_future_attendance_results(result):
     scen_data = []
     for s in result['scenarios']:
          proj_p = s['projected_percentage']
-         emoji = ""; rich_style = ""
-         if result['future_total_classes'] > 0:
-             if proj_p < 75: rich_style, emoji = "bold red", E_SAD
-             elif proj_p < 85: rich_style, emoji = "bold yellow", E_NEUTRAL
-             else: rich_style, emoji = "bold green", E_HAPPY
-         else: rich_style, emoji = "dim", " "
+         rich_style, emoji = band_display(proj_p, result['future_total_classes'])
          scen_data.append({
              f'{E_ROCKET}Future %': f"{s['future_attendance']}%", 'Classes Attended': str(s['classes_to_attend']), 'Est. Unique Days': str(s['days_to_attend']),
              'Proj. Total': s['projected_total'], f'{E_CHART_UP}Proj. %': f"{proj_p:.2f}%", ' ': emoji, '_style': rich_style })
@@ -960,22 +3115,28 @@ def display_future_attendance_results(result):
 
 
 # === Main Loop ===
-def run_attendance_tracker(attendance_data):
-    """Main interactive loop for displaying data and calculations."""
+def run_attendance_tracker(attendance_data, refresh=None):
+    """Main interactive loop for displaying data and calculations.
+    refresh, if given, re-fetches the data set (menu option 8); parsed subject logs are then updated incrementally."""
     if not attendance_data: print(f"{C_WARNING}{E_WARNING} No attendance data.{C_RESET}"); return
-    summary, total_p, total_c = extract_summary_data(attendance_data)
-    if not summary: print(f"{C_ERROR}{E_ERROR} Failed to extract summary.{C_RESET}"); return
+    all_terms_data = attendance_data; term_ids = get_term_ids(all_terms_data); current_term = None
+    attendance_frame_cache = None; heatmap_cache = None # Built on first use of options 7 / 10
+    model = AttendanceModel.from_data(attendance_data)
+    if model is None: print(f"{C_ERROR}{E_ERROR} Failed to extract summary.{C_RESET}"); return
+    summary = summary_rows(model); total_p, total_c = model.present, model.total # Rendered once; option 5 only redisplays
 
-    default_future_days = 90; default_holidays = set()
+    default_future_days = 90; default_holidays = set(); calendar = get_academic_calendar()
     try:
         default_schedule = generate_future_schedule(default_future_days, default_holidays)
-        print(f"\n{C_DIM}(Using {default_future_days}-day future schedule for calculations. Holidays: {len(default_holidays)}){C_RESET}")
+        calendar_note = f"Calendar: '{calendar.source}'" if calendar else f"Holidays: {len(default_holidays)}, no academic calendar loaded"
+        print(f"\n{C_DIM}(Using {default_future_days}-day future schedule for calculations. {calendar_note}){C_RESET}")
     except Exception as e: print(f"{C_ERROR}Failed to generate schedule: {e}{C_RESET}"); default_schedule = []
 
     display_summary(summary) # Initial display
+    get_detail_cache().warm(all_terms_data) # Parse subject logs while the user reads the summary
 
     if total_c > 0: # Initial Alert Check
-        curr_p = (total_p / total_c * 100); target_alert = 85.0
+        curr_p = model.percentage; target_alert = 85.0
         if curr_p < target_alert:
             cls_n, days_n, _ = calculate_classes_needed_for_target(total_p, total_c, default_schedule, target_alert)
             alert_border = f"{C_RED}{'='*20} {E_WARNING} ALERT {E_WARNING} {'='*20}{C_RESET}"; print("\n" + alert_border)
@@ -993,6 +3154,13 @@ def run_attendance_tracker(attendance_data):
         print(f"  {C_CYAN}3{C_RESET}. {E_CALENDAR} Project Future Attendance (Custom End Date)")
         print(f"  {C_CYAN}4{C_RESET}. {E_CHART_UP} Calculate Classes Needed (Custom Target %, {default_future_days}-day schedule)")
         print(f"  {C_CYAN}5{C_RESET}. {E_BOOK} View Overall Summary Again")
+        if len(term_ids) > 1: print(f"  {C_CYAN}6{C_RESET}. {E_REUSE} Switch Term (current: {current_term or 'All terms'})")
+        print(f"  {C_CYAN}7{C_RESET}. {E_CHART_DOWN} Weekly Attendance (all subjects)")
+        if refresh: print(f"  {C_CYAN}8{C_RESET}. {E_REUSE} Refresh from NIET Cloud")
+        print(f"  {C_CYAN}9{C_RESET}. {E_CHART_UP} Rolling Attendance Trends ({'/'.join(str(w) for w in TREND_WINDOWS)} days)")
+        print(f"  {C_CYAN}10{C_RESET}. {E_CALENDAR} Absence Heatmap (weekday x time slot)")
+        print(f"  {C_CYAN}11{C_RESET}. {E_BOOK} Attendance by Session Type (lecture / lab / other)")
+        print(f"  {C_CYAN}12{C_RESET}. {E_TARGET} Per-Subject Leave / Requirements (minimum % per subject)")
         print(f"  {C_CYAN}0{C_RESET}. {E_LOGOUT} Exit")
         try:
             choice = int(input(f"\n{C_PROMPT}Enter choice: {C_RESET}").strip())
@@ -1010,13 +3178,19 @@ def run_attendance_tracker(attendance_data):
                      sub_choice = int(input(f"\n{C_PROMPT}Enter subject number: {C_RESET}").strip())
                      if sub_choice in subject_map:
                          selected_subject_data = subject_map[sub_choice]
-                         details = extract_detailed_attendance(selected_subject_data)
+                         details = get_detail_cache().get(selected_subject_data)
+                         for warning in details.warnings: print(warning)
                          display_subject_details(selected_subject_data.get('subject', 'N/A'), details)
                      else: print(f"{C_WARNING}Invalid subject number.{C_RESET}")
                  except ValueError: print(f"{C_WARNING}Invalid number.{C_RESET}")
             elif choice == 2:
-                 target_leave = 85.0; result = calculate_leave_allowance(total_p, total_c, default_schedule, target_leave)
-                 display_leave_allowance_results(result, total_p, total_c, default_schedule, target_leave)
+                 stype = prompt_session_type(); calc_p, calc_c, schedule = total_p, total_c, default_schedule
+                 if stype:
+                     typed = AttendanceModel.from_data(attendance_data, session_type=stype); calc_p, calc_c = typed.present, typed.total
+                     if not calc_c: print(f"{C_WARNING}{E_WARNING} No {stype} classes recorded.{C_RESET}"); continue
+                     schedule = scale_schedule(default_schedule, session_weekday_shares(attendance_data, stype))
+                 target_leave = 85.0; result = calculate_leave_allowance(calc_p, calc_c, schedule, target_leave)
+                 display_leave_allowance_results(result, calc_p, calc_c, schedule, target_leave, stype)
             elif choice == 3:
                 while True:
                      end_date_str = input(f"{C_PROMPT}{E_CALENDAR} Enter end date (YYYY-MM-DD): {C_RESET}").strip()
@@ -1031,13 +3205,23 @@ def run_attendance_tracker(attendance_data):
                         try: datetime.strptime(h_date_str, "%Y-%m-%d"); holidays.append(h_date_str)
                         except ValueError: print(f"{C_WARNING}Invalid format.{C_RESET}")
                     print(f"{C_INFO}Using {len(holidays)} custom holidays.{C_RESET}")
-                result = calculate_future_attendance(total_p, total_c, end_date_str, holidays); display_future_attendance_results(result)
+                stype = prompt_session_type(); calc_p, calc_c, shares = total_p, total_c, None
+                if stype:
+                    typed = AttendanceModel.from_data(attendance_data, session_type=stype); calc_p, calc_c = typed.present, typed.total
+                    if not calc_c: print(f"{C_WARNING}{E_WARNING} No {stype} classes recorded.{C_RESET}"); continue
+                    shares = session_weekday_shares(attendance_data, stype)
+                result = calculate_future_attendance(calc_p, calc_c, end_date_str, holidays, shares)
+                if stype and 'error' not in result: result['session_type'] = stype
+                display_future_attendance_results(result)
                         # ... (rest of the choices) ...
 
             elif choice == 4:
                  target_perc = None # Initialize target_perc
                  while True: # Loop until valid percentage is entered
-                    target_str = input(f"{C_PROMPT}{E_TARGET} Enter Target % (e.g., 75): {C_RESET}").strip()
+                    target_str = input(f"{C_PROMPT}{E_TARGET} Enter Target % (e.g., 75; several as 75,80,90 or 70-95; 'all' for 1-100): {C_RESET}").strip()
+                    if ',' in target_str or '-' in target_str.lstrip('-') or target_str.lower() in ('all', '*'):
+                        try: target_perc = parse_targets(target_str); break
+                        except ValueError as e: print(f"{C_WARNING}Invalid targets: {e}.{C_RESET}"); continue
                     # --- FIX START ---
                     try:
                         # Step 1: Try conversion
@@ -1055,10 +3239,12 @@ def run_attendance_tracker(attendance_data):
                     # --- FIX END ---
 
                  # --- Code continues only after a valid target_perc is obtained ---
+                 if isinstance(target_perc, list):
+                     display_target_curve(solve_targets(total_p, total_c, default_schedule, target_perc), model.percentage, default_future_days); continue
                  cls_n, days_n, new_p = calculate_classes_needed_for_target(total_p, total_c, default_schedule, target_perc)
 
                  header_text = f" Reaching {target_perc}% Attendance ({default_future_days}-day schedule) "; print(f"\n{C_HEADER}---{header_text}---{C_RESET}")
-                 current_perc = (total_p / total_c * 100) if total_c > 0 else 0.0
+                 current_perc = model.percentage
                  if current_perc >= target_perc: print(f"{C_GREEN}{E_HAPPY} Current ({current_perc:.2f}%) already >= {target_perc}%.{C_RESET}")
                  elif cls_n == float('inf'): print(f"{C_ERROR}{E_ERROR} Impossible to reach {target_perc}% based on schedule.{C_RESET}")
                  elif cls_n > 0:
@@ -1071,19 +3257,405 @@ def run_attendance_tracker(attendance_data):
 
             # ... (rest of the choices and loop) ...
             elif choice == 5: display_summary(summary)
+            elif choice == 6 and len(term_ids) > 1:
+                 print(f"{C_BLUE}{E_CALENDAR} Select Term:{C_RESET}\n  {C_CYAN}0{C_RESET}. All terms (whole degree)")
+                 for i, t in enumerate(term_ids, 1): print(f"  {C_CYAN}{i}{C_RESET}. Term {t}")
+                 term_choice = int(input(f"\n{C_PROMPT}Enter term number: {C_RESET}").strip())
+                 if not 0 <= term_choice <= len(term_ids): print(f"{C_WARNING}Invalid term number.{C_RESET}"); continue
+                 current_term = term_ids[term_choice - 1] if term_choice else None
+                 attendance_data = filter_by_term(all_terms_data, current_term); attendance_frame_cache = heatmap_cache = None
+                 model = AttendanceModel.from_data(attendance_data)
+                 summary = summary_rows(model); total_p, total_c = model.present, model.total
+                 display_summary(summary)
+            elif choice == 7:
+                 if attendance_frame_cache is None: attendance_frame_cache = attendance_frame(attendance_data)
+                 display_weekly_attendance(attendance_frame_cache)
+            elif choice == 8 and refresh:
+                 new_data = refresh()
+                 if not new_data: print(f"{C_WARNING}{E_WARNING} Refresh failed. Keeping the current data.{C_RESET}"); continue
+                 all_terms_data = new_data; term_ids = get_term_ids(all_terms_data)
+                 if current_term not in term_ids: current_term = None
+                 attendance_data = filter_by_term(all_terms_data, current_term); attendance_frame_cache = heatmap_cache = None
+                 model = AttendanceModel.from_data(attendance_data)
+                 summary = summary_rows(model); total_p, total_c = model.present, model.total
+                 display_summary(summary)
+                 get_detail_cache().warm(all_terms_data) # Only subjects whose log changed are re-parsed, and only their new tail
+            elif choice == 9: display_trends(attendance_data)
+            elif choice == 10:
+                 valid_subjects = [(i, sub) for i, sub in enumerate(sub for sub in attendance_data if isinstance(sub, dict)) if sub.get('subjectCode')]
+                 print(f"{C_BLUE}{E_BOOK} Select Subject:{C_RESET}\n  {C_CYAN}0{C_RESET}. All subjects")
+                 for n, (_, sub) in enumerate(valid_subjects, 1): print(f"  {C_CYAN}{n}{C_RESET}. {sub.get('subject', 'N/A')} [{C_DIM}{sub['subjectCode']}{C_RESET}]")
+                 sub_choice = int(input(f"\n{C_PROMPT}Enter subject number: {C_RESET}").strip() or 0)
+                 if not 0 <= sub_choice <= len(valid_subjects): print(f"{C_WARNING}Invalid subject number.{C_RESET}"); continue
+                 if heatmap_cache is None: heatmap_cache = load_heatmap(attendance_data, attendance_frame_cache)
+                 display_heatmap(heatmap_cache, valid_subjects[sub_choice - 1][0] if sub_choice else None)
+            elif choice == 11: display_session_breakdown(attendance_data)
+            elif choice == 12:
+                 threshold_str = input(f"{C_PROMPT}{E_TARGET} Minimum % per subject (default {SUBJECT_MIN_PERCENTAGE:g}): {C_RESET}").strip()
+                 threshold = float(threshold_str) if threshold_str else SUBJECT_MIN_PERCENTAGE
+                 if not 0 < threshold <= 100: print(f"{C_WARNING}Minimum must be > 0 and <= 100.{C_RESET}"); continue
+                 display_subject_requirements(per_subject_requirements(model, default_schedule, threshold), threshold, default_future_days)
             else: print(f"{C_WARNING}{E_WARNING} Invalid choice.{C_RESET}")
         except ValueError: print(f"{C_WARNING}Invalid number.{C_RESET}")
         except KeyboardInterrupt: print(f"\n{C_YELLOW}{E_WARNING} Menu interrupted.{C_RESET}"); continue
         except Exception as e: print(f"\n{C_ERROR}{E_ERROR} Menu error: {e}\n{C_DIM}{traceback.format_exc()}{C_RESET}"); continue
 
 
+# === Batch Mode ===
+_batch_login_lock = threading.Lock()
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m') # Colour codes, stripped from messages shown in the batch report
+
+def load_batch_accounts(path):
+    """Reads a batch file: one `username`, `username,JSESSIONID` or `sid:JSESSIONID` per line ('#' starts a comment)."""
+    accounts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'): continue
+            if line.lower().startswith('sid:'):
+                sid = line[4:].strip()
+                if not sid: print(f"{C_WARNING}{E_WARNING} Line {line_no}: empty JSESSIONID, skipped.{C_RESET}"); continue
+                accounts.append({'account': f"sid-{sid[:8]}", 'username': None, 'jsessionid': sid})
+            elif ',' in line:
+                user, sid = [x.strip() for x in line.split(',', 1)]
+                accounts.append({'account': user or f"sid-{sid[:8]}", 'username': user or None, 'jsessionid': sid or None})
+            else: accounts.append({'account': line, 'username': line, 'jsessionid': None})
+    return accounts
+
+class _AccountDeadline:
+    """One batch account's time budget. The clock starts when a worker picks the account up and stops while the
+    account waits for the browser-login lock, so queueing never counts against it. cancel() makes the worker give
+    up (and free its thread and the login lock) at its next checkpoint."""
+    def __init__(self, seconds):
+        self.seconds = seconds; self.cancelled = threading.Event(); self._started = None; self._paused_at = None
+
+    def start(self): self._started = time.monotonic()
+
+    def remaining(self):
+        """Seconds left, or None while the clock isn't running."""
+        if self._started is None or self._paused_at is not None: return None
+        return self.seconds - (time.monotonic() - self._started)
+
+    def check(self):
+        """Raises TimeoutError once the budget is spent or the account was cancelled."""
+        remaining = self.remaining()
+        if self.cancelled.is_set() or (remaining is not None and remaining <= 0): raise TimeoutError(f"Exceeded {self.seconds}s")
+
+    def cancel(self): self.cancelled.set()
+
+    def pause(self): self._paused_at = time.monotonic()
+
+    def resume(self):
+        if self._started is not None: self._started += time.monotonic() - self._paused_at
+        self._paused_at = None
+
+    def holding(self, lock): return _DeadlineLock(lock, self)
+
+class _DeadlineLock:
+    """`with` wrapper for the login lock: pauses the deadline while waiting and backs out if the account is cancelled."""
+    def __init__(self, lock, deadline): self.lock = lock; self.deadline = deadline
+
+    def __enter__(self):
+        self.deadline.pause()
+        try:
+            while not self.lock.acquire(timeout=0.2):
+                if self.deadline.cancelled.is_set(): raise TimeoutError(f"Exceeded {self.deadline.seconds}s")
+        finally: self.deadline.resume()
+        if self.deadline.cancelled.is_set(): self.lock.release(); raise TimeoutError(f"Exceeded {self.deadline.seconds}s")
+        return self
+
+    def __exit__(self, *exc): self.lock.release()
+
+def batch_login(username, password, browser_choice='firefox', deadline=None):
+    """Gets a JSESSIONID for one batch account from the session cache or a login.
+    HTTP logins run concurrently; browser fallbacks run one at a time (heavy, and they drive the shared spinner).
+    Time spent waiting for a browser slot doesn't count against `deadline`."""
+    lock = deadline.holding(_batch_login_lock) if deadline else _batch_login_lock
+    _, jsessionid = get_session_for_user(username, password, browser_choice, quiet=True, login_lock=lock)
+    return jsessionid
+
+def _batch_process_account(entry, passwords, deadline, browser_choice, stream=False):
+    """Worker: logs in if needed, then fetches and totals one account. Raises on any failure.
+    stream=True totals subjects as they arrive instead of holding the account's whole payload."""
+    deadline.start()
+    jsessionid = entry['jsessionid']
+    if not jsessionid:
+        password = passwords.get(entry['username'])
+        jsessionid = batch_login(entry['username'], password, browser_choice, deadline=deadline)
+        if not jsessionid: raise RuntimeError("Login failed" if password else "No valid saved session and no saved password")
+    deadline.check()
+    if stream:
+        subjects = present = total = 0
+        for sub in stream_attendance_data(jsessionid, raw_file=None, timeout=deadline.remaining()):
+            deadline.check(); subjects += 1 # Counted like len(data) on the non-stream path; invalid ones are skipped as in from_data
+            if not isinstance(sub, dict): print(f"{C_WARNING}{E_WARNING} Skipping invalid entry: {sub}{C_RESET}"); continue
+            try: p = int(sub.get('presentCount', 0)); a = int(sub.get('absentCount', 0))
+            except (ValueError, TypeError) as e: print(f"{C_WARNING}{E_WARNING} Error processing subject ({sub.get('subjectCode','N/A')}): {e}. Skipping.{C_RESET}"); continue
+            present += p; total += p + a
+        return {'subjects': subjects, 'present': present, 'total': total}
+    errors = []
+    data = fetch_attendance_data(jsessionid, username=entry['username'], quiet=True, save_to_file=False, timeout=deadline.remaining(), errors=errors)
+    deadline.check()
+    if not data: raise RuntimeError(_ANSI_RE.sub('', errors[0]).strip() if errors else "Fetch failed")
+    model = AttendanceModel.from_data(data)
+    return {'subjects': len(data), 'present': model.present, 'total': model.total, 'model': model.to_dict()}
+
+async def _run_batch_async(accounts, passwords, concurrency, account_timeout, browser_choice, stream=False):
+    """Runs every account on a bounded worker pool; one account failing or timing out never affects the others."""
+    loop = asyncio.get_running_loop(); slots = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    async def run_one(entry):
+        async with slots:
+            result = {'account': entry['account'], 'status': 'ok', 'error': ''}
+            start = time.perf_counter()
+            deadline = _AccountDeadline(account_timeout)
+            try:
+                job = loop.run_in_executor(executor, _batch_process_account, entry, passwords, deadline, browser_choice, stream)
+                while not job.done(): # The clock only runs once a worker has the account and it isn't queued for a browser
+                    remaining = deadline.remaining()
+                    if remaining is not None and remaining <= 0:
+                        deadline.cancel(); job.add_done_callback(lambda f: f.cancelled() or f.exception()) # Worker backs out on its own
+                        raise TimeoutError
+                    await asyncio.wait({job}, timeout=0.2 if remaining is None else remaining)
+                result.update(job.result())
+            except (asyncio.TimeoutError, TimeoutError): result['status'] = 'timeout'; result['error'] = f"Exceeded {account_timeout}s"
+            except Exception as e: result['status'] = 'error'; result['error'] = str(e)
+            result['latency'] = time.perf_counter() - start
+            return result
+    try: return await asyncio.gather(*(run_one(entry) for entry in accounts))
+    finally: executor.shutdown(wait=False, cancel_futures=True) # Don't block the report on abandoned (timed-out) workers
+
+def run_batch(batch_file, concurrency=BATCH_MAX_CONCURRENCY, rate_per_host=BATCH_RATE_PER_HOST, account_timeout=BATCH_ACCOUNT_TIMEOUT, browser_choice='firefox', stream=False):
+    """Fetches attendance for every account in `batch_file` concurrently and prints a per-account summary."""
+    try: accounts = load_batch_accounts(batch_file)
+    except (IOError, OSError) as e: print(f"{C_ERROR}{E_ERROR} Could not read batch file '{batch_file}': {e}{C_RESET}"); return []
+    if not accounts: print(f"{C_WARNING}{E_WARNING} No accounts in '{batch_file}'.{C_RESET}"); return []
+
+    passwords = {}
+    need_login = [a['username'] for a in accounts if not a['jsessionid']]
+    if need_login:
+        key = load_key(); saved = load_credentials()
+        for user in need_login:
+            if saved.get(user) and key: passwords[user] = decrypt_password(saved[user], key)
+        missing = [u for u in need_login if not passwords.get(u)]
+        if missing: print(f"{C_WARNING}{E_WARNING} No saved password for {len(missing)} account(s); they need a valid saved session.{C_RESET}")
+
+    manager = get_http_manager()
+    if manager.pool_maxsize < concurrency: manager = configure_http_session(pool_maxsize=concurrency)
+    manager.rate_limiter = HostRateLimiter(rate_per_host)
+    print(f"{C_INFO}{E_ROCKET} Batch: {len(accounts)} accounts, concurrency {concurrency}, {rate_per_host:g} req/s per host, {account_timeout}s per account.{C_RESET}")
+    start = time.perf_counter()
+    try: results = asyncio.run(_run_batch_async(accounts, passwords, concurrency, account_timeout, browser_choice, stream))
+    finally: manager.rate_limiter = None
+    elapsed = time.perf_counter() - start
+
+    display_batch_results(results, elapsed)
+    try:
+        with open(BATCH_RESULTS_FILE, 'w', encoding='utf-8') as f: json.dump({'elapsed': elapsed, 'results': results}, f, indent=4)
+        print(f"{C_SUCCESS}{E_SAVE} Batch results saved to '{BATCH_RESULTS_FILE}'.{C_RESET}")
+    except (IOError, TypeError) as e: print(f"{C_WARNING}{E_WARNING} Could not save batch results: {e}{C_RESET}")
+    return results
+
+def display_batch_results(results, elapsed):
+    """Prints the per-account batch table followed by throughput and latency percentiles."""
+    rows = []
+    for r in results:
+        perc = (r['present'] / r['total'] * 100) if r.get('total') else 0.0
+        if r['status'] != 'ok': rich_style, emoji = "bold red", E_ERROR
+        else: rich_style, emoji = band_display(perc, r.get('total'))
+        rows.append({
+            'Account': r['account'], 'Status': r['status'] if r['status'] == 'ok' else f"{r['status']}: {r['error']}",
+            'Subjects': str(r.get('subjects', '')), 'Count': f"{r['present']}/{r['total']}" if r['status'] == 'ok' else '',
+            f'{E_CHART_UP} %': f"{perc:.2f}%" if r['status'] == 'ok' else '', f'{E_CLOCK} Time': f"{r['latency']:.2f}s", ' ': emoji, '_style': rich_style })
+
+    print(f"\n{C_HEADER}{E_STAR}=== Batch Results ==={E_STAR}{C_RESET}\n")
+    print_styled_table(rows, left_columns=('Account', 'Status'))
+
+    latencies = sorted(r['latency'] for r in results); ok_count = sum(1 for r in results if r['status'] == 'ok')
+    throughput = len(results) / elapsed if elapsed > 0 else 0.0
+    print(f"\n{C_INFO}Accounts: {C_BOLD}{ok_count}{C_RESET}{C_INFO} ok / {len(results) - ok_count} failed in {elapsed:.2f}s{C_RESET}")
+    print(f"{C_INFO}Throughput: {C_BOLD}{throughput:.2f}{C_RESET}{C_INFO} accounts/s | Latency p50: {_percentile(latencies, 50):.2f}s  p95: {_percentile(latencies, 95):.2f}s{C_RESET}")
+
+
+# === Offline Stand-in Portal ===
+MOCK_PORTAL_PORT = 8765
+MOCK_PORTAL_PASSWORD = "demo" # Any username logs in with this password
+
+def set_portal_base_url(base_url):
+    """Points login and attendance requests at another portal root (e.g. the local stand-in)."""
+    global NIET_LOGIN_URL, NIET_ATTENDANCE_URL
+    base_url = base_url.rstrip('/')
+    NIET_LOGIN_URL = f"{base_url}/login.htm"; NIET_ATTENDANCE_URL = f"{base_url}/getSubjectOnChangeWithSemId1.json"
+
+def make_mock_portal(port=MOCK_PORTAL_PORT, host='127.0.0.1'):
+    """Builds a local stand-in for the NIET Cloud login form and attendance endpoint (not started)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    sessions = {} # JSESSIONID -> {'csrf': token, 'user': username or None}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            if DEBUG_MODE: super().log_message(*args)
+
+        def _session(self):
+            for part in self.headers.get('Cookie', '').split(';'):
+                name, _, value = part.strip().partition('=')
+                if name == 'JSESSIONID':
+                    with lock: return value, sessions.get(value)
+            return None, None
+
+        def _new_session(self, user=None):
+            sid = secrets.token_hex(16).upper()
+            with lock: sessions[sid] = {'csrf': secrets.token_hex(8), 'user': user}
+            return sid
+
+        def _send(self, status, body=b'', content_type='text/html;charset=UTF-8', headers=()):
+            self.send_response(status)
+            for k, v in headers: self.send_header(k, v)
+            if body: self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body))); self.end_headers()
+            if body and self.command != 'HEAD': self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path; sid, sess = self._session()
+            if path == '/login.htm':
+                cookies = []
+                if not sess: sid = self._new_session(); cookies = [('Set-Cookie', f'JSESSIONID={sid}; Path=/; HttpOnly')]
+                with lock: csrf = sessions[sid]['csrf']
+                form = (f'<html><body><form method="post" action="j_security_check"><input type="text" name="j_username">'
+                        f'<input type="password" name="j_password"><input type="hidden" name="_csrf" value="{csrf}">'
+                        f'<button type="submit">Login</button></form></body></html>')
+                return self._send(200, form.encode('utf-8'), headers=cookies)
+            if not sess or not sess['user']: return self._send(302, headers=[('Location', '/login.htm')])
+            if path == '/Dashboard.htm':
+                return self._send(200, f"<html><body>Welcome {sess['user']} <a href='/logout'>Logout</a></body></html>".encode('utf-8'))
+            if path == '/getSubjectOnChangeWithSemId1.json':
+                seed = sum(map(ord, sess['user'])) + int(parse_qs(urlparse(self.path).query).get('termId', ['2'])[0])
+                body = json.dumps(_synthetic_attendance(subjects=8, entries_per_subject=120, seed=seed)).encode('utf-8')
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if self.headers.get('If-None-Match') == etag: return self._send(304, headers=[('ETag', etag)])
+                return self._send(200, body, 'application/json;charset=UTF-8', headers=[('ETag', etag)])
+            self._send(404, b'Not found')
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/j_security_check': return self._send(404, b'Not found')
+            form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+            field = lambda name: form.get(name, [''])[0]
+            _, sess = self._session()
+            if not sess or field('_csrf') != sess['csrf'] or not field('j_username') or field('j_password') != MOCK_PORTAL_PASSWORD:
+                return self._send(302, headers=[('Location', '/login.htm?error=1')])
+            sid = self._new_session(field('j_username')) # New id on login, like the real portal
+            self._send(302, headers=[('Location', '/Dashboard.htm'), ('Set-Cookie', f'JSESSIONID={sid}; Path=/; HttpOnly')])
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+def run_mock_portal(port=MOCK_PORTAL_PORT):
+    """Serves the stand-in portal until interrupted."""
+    server = make_mock_portal(port)
+    print(f"{C_SUCCESS}{E_COMPUTER} Stand-in portal on http://127.0.0.1:{server.server_port} (any username, password '{MOCK_PORTAL_PASSWORD}').{C_RESET}")
+    print(f"{C_DIM}Run the tracker with --portal=http://127.0.0.1:{server.server_port} to use it. Ctrl+C to stop.{C_RESET}")
+    try: server.serve_forever()
+    except KeyboardInterrupt: print(f"\n{C_INFO}{E_WAVE} Stand-in portal stopped.{C_RESET}")
+    finally: server.server_close()
+
+
 # === Main Orchestration ===
+def get_cli_option(args, name, default=None):
+    """Returns the value of `--name=value` or `--name value` from args, else default."""
+    for i, arg in enumerate(args):
+        if arg.startswith(name + '='): return arg.split('=', 1)[1]
+        if arg == name and i + 1 < len(args) and not args[i + 1].startswith('--'): return args[i + 1]
+    return default
+
+def parse_term_selection(args):
+    """Reads --terms=all / --terms=1,2,3 from the command line. None means the default single term."""
+    for arg in args:
+        if arg.startswith('--terms='):
+            value = arg.split('=', 1)[1].strip()
+            if value.lower() == 'all': return 'all'
+            term_list = [t.strip() for t in value.split(',') if t.strip()]
+            return term_list or None
+    return None
+
+def fetch_selected_terms(jsessionid, term_selection, bypass_ssl_verify=False, username=None, stream=False, force_refresh=False):
+    """Fetches the default term (streamed with --stream), or several terms concurrently when --terms was given.
+    force_refresh skips the fresh-cache shortcut (the portal is still asked conditionally)."""
+    if term_selection is None:
+        if stream: return fetch_attendance_data_streaming(jsessionid, bypass_ssl_verify, username=username)
+        return fetch_attendance_data(jsessionid, bypass_ssl_verify, username, force_refresh=force_refresh)
+    return fetch_attendance_terms(jsessionid, None if term_selection == 'all' else term_selection, bypass_ssl_verify, username, force_refresh=force_refresh)
+
 def main():
     """Main function to run the NIET Attendance Tracker."""
     # Check if running through alias
     if len(sys.argv) > 1 and sys.argv[1] == "--setup-alias":
         setup_alias()
         return
+    if '--offline-drivers' in sys.argv: set_webdriver_offline()
+    if '--snapshot' in sys.argv: set_attendance_store_format('snapshot')
+    if '--browser-daemon' in sys.argv:
+        run_browser_daemon(browser_choice=get_cli_option(sys.argv[1:], '--browser', 'firefox').lower(),
+                           drivers=int(get_cli_option(sys.argv[1:], '--drivers', BROWSER_DAEMON_DRIVERS)),
+                           max_jobs=int(get_cli_option(sys.argv[1:], '--max-jobs', BROWSER_DAEMON_MAX_JOBS))); return
+    if '--driver-registry' in sys.argv: show_driver_registry(); return
+    if '--mock-portal' in sys.argv:
+        run_mock_portal(int(get_cli_option(sys.argv[1:], '--mock-portal') or MOCK_PORTAL_PORT)); return
+    portal_url = get_cli_option(sys.argv[1:], '--portal')
+    if portal_url: set_portal_base_url(portal_url)
+    if '--benchmark-parser' in sys.argv:
+        size = get_cli_option(sys.argv[1:], '--benchmark-parser')
+        benchmark_parser(sizes=(int(size),) if size else (100_000, 1_000_000)); return
+    with contextlib.redirect_stdout(sys.stderr): set_academic_calendar(get_cli_option(sys.argv[1:], '--calendar'), quiet=True) # Reported by the tracker; errors stay off JSON stdout
+    if '--benchmark-schedule' in sys.argv:
+        benchmark_schedule(); return
+    if '--benchmark-frame' in sys.argv:
+        size = get_cli_option(sys.argv[1:], '--benchmark-frame')
+        benchmark_frame(sizes=(int(size),) if size else (100_000, 1_000_000)); return
+    if '--summary-json' in sys.argv:
+        source = get_cli_option(sys.argv[1:], '--summary-json') or default_attendance_file()
+        with contextlib.redirect_stdout(sys.stderr): model = AttendanceModel.from_data(load_attendance_data(source), get_cli_option(sys.argv[1:], '--term')) # Keep stdout pure JSON
+        if model is None: sys.exit(1)
+        out_file = get_cli_option(sys.argv[1:], '--out')
+        if out_file: _atomic_write(out_file, json.dumps(model.to_dict(), indent=2).encode('utf-8')); print(f"{C_SUCCESS}{E_SAVE} Summary written to '{out_file}'.{C_RESET}", file=sys.stderr)
+        else: print(json.dumps(model.to_dict(), indent=2))
+        return
+    if '--trends-json' in sys.argv:
+        source = get_cli_option(sys.argv[1:], '--trends-json') or default_attendance_file()
+        with contextlib.redirect_stdout(sys.stderr): # Keep stdout pure JSON
+            data = filter_by_term(load_attendance_data(source), get_cli_option(sys.argv[1:], '--term'))
+            report = json.dumps(trend_report(data), indent=2) if data else None
+        if not data: sys.exit(1)
+        out_file = get_cli_option(sys.argv[1:], '--out')
+        if out_file: _atomic_write(out_file, report.encode('utf-8')); print(f"{C_SUCCESS}{E_SAVE} Trends written to '{out_file}'.{C_RESET}", file=sys.stderr)
+        else: print(report)
+        return
+    history_as_of = get_cli_option(sys.argv[1:], '--history-as-of'); history_added = get_cli_option(sys.argv[1:], '--history-added')
+    if history_as_of or '--history-as-of' in sys.argv:
+        show_history_as_of(history_as_of or date.today().isoformat(), get_cli_option(sys.argv[1:], '--user')); return
+    if history_added or '--history-added' in sys.argv:
+        try:
+            days = float(history_added or 7)
+            if not (math.isfinite(days) and days > 0): raise ValueError("must be a positive number of days")
+        except ValueError as e: print(f"{C_ERROR}{E_ERROR} Invalid --history-added value '{history_added}': {e}{C_RESET}"); sys.exit(1)
+        show_history_added(days, get_cli_option(sys.argv[1:], '--user')); return
+    if '--benchmark-snapshot' in sys.argv:
+        benchmark_snapshot(get_cli_option(sys.argv[1:], '--benchmark-snapshot') or ATTENDANCE_FILE); return
+    if '--export-json' in sys.argv:
+        export_snapshot_json(ATTENDANCE_SNAPSHOT_FILE, get_cli_option(sys.argv[1:], '--export-json') or ATTENDANCE_FILE); return
+    batch_file = get_cli_option(sys.argv[1:], '--batch')
+    if batch_file:
+        try:
+            concurrency = int(get_cli_option(sys.argv[1:], '--concurrency', BATCH_MAX_CONCURRENCY))
+            rate_per_host = float(get_cli_option(sys.argv[1:], '--rate', BATCH_RATE_PER_HOST))
+            account_timeout = float(get_cli_option(sys.argv[1:], '--timeout', BATCH_ACCOUNT_TIMEOUT))
+            if concurrency < 1: raise ValueError("--concurrency must be at least 1")
+            if not rate_per_host > 0: raise ValueError("--rate must be greater than 0")
+            if not account_timeout > 0: raise ValueError("--timeout must be greater than 0")
+        except ValueError as e: print(f"{C_ERROR}{E_ERROR} Invalid batch option: {e}{C_RESET}"); sys.exit(1)
+        run_batch(batch_file, concurrency=concurrency, rate_per_host=rate_per_host, account_timeout=account_timeout,
+                  browser_choice=get_cli_option(sys.argv[1:], '--browser', 'firefox'), stream='--stream' in sys.argv)
+        if DEBUG_MODE: print_http_stats(); print_response_cache_stats()
+        return
     
     # Clear screen before displaying header
     clear_screen()
@@ -1140,6 +3712,7 @@ def main():
 
     encryption_key = load_key()
     attendance_data = None; jsessionid = None
+    term_selection = parse_term_selection(sys.argv[1:]); stream_mode = '--stream' in sys.argv
 
     # --- Browser Selection ---
     browser_options = ['firefox', 'edge', 'chrome']
@@ -1158,9 +3731,9 @@ def main():
     # --- Data Source Selection ---
     print(f"\n{C_BLUE}{E_POINT_RIGHT} How to get attendance data?{C_RESET}")
     options_list = [
-        (f"{E_COMPUTER}Log in via Browser ({selected_browser.capitalize()})", SELENIUM_AVAILABLE, 1),
+        (f"{E_COMPUTER}Log in ({'HTTP, ' if HTTP_LOGIN_ENABLED else ''}Browser: {selected_browser.capitalize()})", SELENIUM_AVAILABLE or HTTP_LOGIN_ENABLED, 1),
         (f"{E_LOGIN}Use existing JSESSIONID", True, 2),
-        (f"{E_BOOK}Load from '{ATTENDANCE_FILE}'", True, 3) ]
+        (f"{E_BOOK}Load from '{default_attendance_file()}'", True, 3) ]
     for i, (text, enabled, _) in enumerate(options_list, 1): print(f"  {C_CYAN}{i}{C_RESET}. {text}" if enabled else f"  {C_DIM}{i}. {text} (Disabled){C_RESET}")
     selected_option_code = None
     while selected_option_code is None:
@@ -1176,12 +3749,12 @@ def main():
 
     # --- Process Data Source Choice ---
     active_username, active_password = None, None
-    if selected_option_code == 1: # Selenium Login
-        print(f"{C_HEADER}--- {E_LOGIN} Browser Login ({selected_browser.capitalize()}) ---{C_RESET}")
+    if selected_option_code == 1: # HTTP Login, Selenium fallback
+        print(f"{C_HEADER}--- {E_LOGIN} Login ({selected_browser.capitalize()} fallback) ---{C_RESET}")
         username_to_use, password_to_use, was_saved = select_or_enter_credentials(encryption_key)
         if username_to_use and password_to_use:
             active_username, active_password = username_to_use, password_to_use
-            login_username, jsessionid = login_and_extract_selenium(NIET_LOGIN_URL, username_to_use, password_to_use, browser_choice=selected_browser)
+            login_username, jsessionid = get_session_for_user(username_to_use, password_to_use, browser_choice=selected_browser)
             if jsessionid and login_username:
                  if login_username != active_username: print(f"{C_WARNING}Username mismatch? Got '{login_username}'.{C_RESET}"); active_username = login_username
                  if CRYPTOGRAPHY_AVAILABLE:
@@ -1197,53 +3770,53 @@ def main():
                      else: print(f"{C_WARNING}Key error. Cannot save credentials.{C_RESET}")
                  else: print(f"{C_INFO}Cryptography disabled. Cannot save credentials.{C_RESET}")
                  # Fetch Data after login
-                 attendance_data = fetch_attendance_data(jsessionid, bypass_ssl_verify=False)
+                 attendance_data = fetch_selected_terms(jsessionid, term_selection, bypass_ssl_verify=False, username=active_username, stream=stream_mode)
                  if not attendance_data:
                       print(f"\n{C_WARNING}{E_WARNING} Initial fetch failed. Retrying with SSL bypass...{C_RESET}")
-                      attendance_data = fetch_attendance_data(jsessionid, bypass_ssl_verify=True)
+                      attendance_data = fetch_selected_terms(jsessionid, term_selection, bypass_ssl_verify=True, username=active_username, stream=stream_mode)
                       if not attendance_data: print(f"\n{C_WARNING}{E_WARNING} Fetch failed. Trying local file...{C_RESET}"); attendance_data = load_attendance_data()
             else: # Login failed
-                 print(f"{C_ERROR}{E_ERROR} Browser login failed.{C_RESET}")
-                 if input(f"{C_PROMPT}Try loading from '{ATTENDANCE_FILE}'? (y/n): {C_RESET}").lower() == 'y': attendance_data = load_attendance_data()
+                 print(f"{C_ERROR}{E_ERROR} Login failed.{C_RESET}")
+                 if input(f"{C_PROMPT}Try loading from '{default_attendance_file()}'? (y/n): {C_RESET}").lower() == 'y': attendance_data = load_attendance_data()
         else: print(f"{C_INFO}Login cancelled.{C_RESET}"); sys.exit(0)
     elif selected_option_code == 2: # Existing JSESSIONID
         print(f"{C_HEADER}--- {E_LOGIN} Use Existing JSESSIONID ---{C_RESET}")
         jsessionid_input = input(f"{C_PROMPT} Enter JSESSIONID: {C_RESET}").strip()
         if jsessionid_input:
             jsessionid = jsessionid_input
-            attendance_data = fetch_attendance_data(jsessionid, bypass_ssl_verify=False)
+            attendance_data = fetch_selected_terms(jsessionid, term_selection, bypass_ssl_verify=False, stream=stream_mode)
             if not attendance_data:
                  print(f"\n{C_WARNING}{E_WARNING} Fetch failed. Retrying with SSL bypass...{C_RESET}")
-                 attendance_data = fetch_attendance_data(jsessionid, bypass_ssl_verify=True)
+                 attendance_data = fetch_selected_terms(jsessionid, term_selection, bypass_ssl_verify=True, stream=stream_mode)
                  if not attendance_data: print(f"\n{C_WARNING}{E_WARNING} Fetch failed. Trying local file...{C_RESET}"); attendance_data = load_attendance_data()
         else: print(f"{C_WARNING}No JSESSIONID. Trying local file...{C_RESET}"); attendance_data = load_attendance_data()
     elif selected_option_code == 3: # Load from file
         print(f"{C_HEADER}--- {E_BOOK} Load from File ---{C_RESET}")
-        file_path = input(f"{C_PROMPT} File path (blank for '{ATTENDANCE_FILE}'): {C_RESET}").strip()
-        target_file = file_path if file_path else ATTENDANCE_FILE
+        file_path = input(f"{C_PROMPT} File path (blank for '{default_attendance_file()}'): {C_RESET}").strip()
+        target_file = file_path if file_path else default_attendance_file()
         attendance_data = load_attendance_data(target_file)
 
     # --- Run tracker ---
     if attendance_data:
-        try: run_attendance_tracker(attendance_data)
+        refresh = (lambda: fetch_selected_terms(jsessionid, term_selection, bypass_ssl_verify=False, username=active_username, stream=stream_mode, force_refresh=True)) if jsessionid else None
+        try: run_attendance_tracker(attendance_data, refresh=refresh)
         except KeyboardInterrupt: print(f"\n{C_YELLOW}{E_WAVE} Exiting program.{C_RESET}")
         except Exception as e: print(f"\n{C_ERROR}{E_ERROR} Critical error: {e}\n{C_DIM}{traceback.format_exc()}{C_RESET}"); sys.exit(1)
     else: print(f"\n{C_ERROR}{E_ERROR} Failed to obtain attendance data. Cannot proceed.{C_RESET}"); sys.exit(1)
 
+    if DEBUG_MODE: print_http_stats(); print_response_cache_stats()
     print(f"\n{C_TITLE}--- {E_WAVE} Tracker Finished ---{C_RESET}")
 
 # === GitHub Contributors ===
 def fetch_github_contributors():
     """Fetches contributor usernames from the GitHub API."""
     try:
-        # GitHub API endpoint for contributors
-        url = "https://api.github.com/repos/iamawanishmaurya/NIET-Attendance-Tracker/contributors"
         headers = {
             'Accept': 'application/vnd.github.v3+json',
             'User-Agent': 'NIET-Attendance-Tracker'
         }
         
-        response = requests.get(url, headers=headers)
+        response = get_http_manager().get(GITHUB_CONTRIBUTORS_URL, label='github', headers=headers, timeout=10)
         
         if response.status_code == 200:
             # Extract only usernames from the response
@@ -1328,6 +3901,7 @@ if __name__ == "__main__":
     # Check if running through alias
     if len(sys.argv) > 1 and sys.argv[1] == "--setup-alias":
         setup_alias()
+    elif '--summary-json' in sys.argv or '--trends-json' in sys.argv: main() # Machine output: no banners
     else:
         # Prompt user about missing optional dependencies before starting fully
         if not CRYPTOGRAPHY_AVAILABLE:
@@ -143,6 +143,9 @@ import getpass # For password input
 import urllib3 # To manage SSL warnings
 import traceback # For detailed error printing
 import platform
+import random
+import http.cookiejar
+from collections import deque
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -281,6 +284,118 @@ SELENIUM_OUTPUT_FILE = os.path.join(os.path.expanduser("~"), "AppData", "Local",
 JSESSIONID_FILE = os.path.join(os.path.expanduser("~"), "AppData", "Local", "niet_attendance", "jsessionid.txt")
 NIET_LOGIN_URL = "https://nietcloud.niet.co.in/login.htm"
 NIET_ATTENDANCE_URL = 'https://nietcloud.niet.co.in/getSubjectOnChangeWithSemId1.json'
+GITHUB_CONTRIBUTORS_URL = "https://api.github.com/repos/iamawanishmaurya/NIET-Attendance-Tracker/contributors"
+
+# --- HTTP Session Settings ---
+HTTP_POOL_CONNECTIONS = 4 # Number of per-host pools kept alive
+HTTP_POOL_MAXSIZE = 16 # Max keep-alive connections per host pool
+HTTP_MAX_RETRIES = 3 # Retries on 5xx / connection resets
+HTTP_BACKOFF_FACTOR = 0.5 # Exponential backoff base (seconds)
+HTTP_BACKOFF_JITTER = 0.3 # Random extra seconds added to each backoff
+HTTP_RETRY_STATUSES = (500, 502, 503, 504)
+
+# === HTTP Session Layer ===
+class _JitteredRetry(Retry):
+    """Retry policy that adds random jitter to urllib3's exponential backoff."""
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return backoff + random.uniform(0, HTTP_BACKOFF_JITTER) if backoff > 0 else backoff
+
+def _build_retry(max_retries=HTTP_MAX_RETRIES):
+    """Bounded retry on 5xx responses and connection resets/read errors."""
+    return _JitteredRetry(
+        total=max_retries, connect=max_retries, read=max_retries, status=max_retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR, status_forcelist=HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        raise_on_status=False # Hand back the last response so raise_for_status() reports it
+    )
+
+class HttpSessionManager:
+    """Pooled keep-alive sessions shared by every NIET Cloud and GitHub request, with per-call latency stats."""
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=HTTP_MAX_RETRIES):
+        self.pool_connections = pool_connections; self.pool_maxsize = pool_maxsize; self.max_retries = max_retries
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=_build_retry(max_retries))
+        self._session = self.new_session(keep_cookies=False)
+        self._stats = {}; self._lock = threading.Lock()
+
+    def new_session(self, keep_cookies=True):
+        """Returns a requests.Session mounted on the shared connection pool."""
+        session = requests.Session()
+        session.mount('https://', self._adapter); session.mount('http://', self._adapter)
+        if not keep_cookies: # Shared session must never carry one user's cookies into another's request
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def request(self, method, url, label='http', session=None, **kwargs):
+        """Performs a request on the pooled session and records its latency under `label`."""
+        start = time.perf_counter(); ok = False
+        try:
+            response = (session or self._session).request(method, url, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally: self._record(label, time.perf_counter() - start, ok)
+
+    def get(self, url, label='http', **kwargs): return self.request('GET', url, label=label, **kwargs)
+
+    def _record(self, label, elapsed, ok):
+        with self._lock:
+            st = self._stats.setdefault(label, {'count': 0, 'errors': 0, 'total': 0.0, 'min': float('inf'), 'max': 0.0, 'samples': deque(maxlen=1000)})
+            st['count'] += 1; st['total'] += elapsed; st['samples'].append(elapsed)
+            st['min'] = min(st['min'], elapsed); st['max'] = max(st['max'], elapsed)
+            if not ok: st['errors'] += 1
+
+    def stats(self):
+        """Returns {label: {count, errors, avg, min, max, p50, p95}} with times in seconds."""
+        with self._lock:
+            out = {}
+            for label, st in self._stats.items():
+                samples = sorted(st['samples'])
+                out[label] = {
+                    'count': st['count'], 'errors': st['errors'], 'avg': st['total'] / st['count'] if st['count'] else 0.0,
+                    'min': st['min'] if st['count'] else 0.0, 'max': st['max'],
+                    'p50': _percentile(samples, 50), 'p95': _percentile(samples, 95)
+                }
+            return out
+
+    def reset_stats(self):
+        with self._lock: self._stats.clear()
+
+    def close(self):
+        self._session.close(); self._adapter.close()
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0.0 if empty)."""
+    if not sorted_values: return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+_http_manager = None
+_http_manager_lock = threading.Lock()
+
+def get_http_manager():
+    """Returns the process-wide HttpSessionManager, creating it on first use."""
+    global _http_manager
+    with _http_manager_lock:
+        if _http_manager is None: _http_manager = HttpSessionManager()
+        return _http_manager
+
+def configure_http_session(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=HTTP_MAX_RETRIES):
+    """Rebuilds the shared session manager with new pool sizes / retry budget."""
+    global _http_manager
+    with _http_manager_lock:
+        if _http_manager is not None: _http_manager.close()
+        _http_manager = HttpSessionManager(pool_connections, pool_maxsize, max_retries)
+        return _http_manager
+
+def print_http_stats():
+    """Prints per-label request latency stats collected by the session manager."""
+    stats = get_http_manager().stats()
+    if not stats: return
+    print(f"\n{C_DIM}--- HTTP Stats ---{C_RESET}")
+    for label, st in stats.items():
+        print(f"{C_DIM}{label:<12} n={st['count']} err={st['errors']} avg={st['avg']*1000:.0f}ms p50={st['p50']*1000:.0f}ms p95={st['p95']*1000:.0f}ms max={st['max']*1000:.0f}ms{C_RESET}")
+
+
 
 def ensure_directory_exists():
     """Ensures the directory for storing files exists."""
@@ -460,8 +575,9 @@ def verify_jsessionid(jsessionid):
             'Cookie': f'JSESSIONID={jsessionid}'
         }
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        response = requests.get(
+        response = get_http_manager().get(
             NIET_ATTENDANCE_URL,
+            label='verify',
             params={'termId': 2, 'refreshData': 0},
             headers=headers,
             verify=False,
@@ -725,12 +841,7 @@ def fetch_attendance_data(jsessionid, bypass_ssl_verify=False):
         verify_ssl = False
 
     try:
-        session = requests.Session()
-        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('https://', adapter)
-
-        response = session.get(url, params=params, headers=headers, verify=verify_ssl, timeout=30)
+        response = get_http_manager().get(url, label='attendance', params=params, headers=headers, verify=verify_ssl, timeout=30)
         if DEBUG_MODE:
             stop_loading()
 
@@ -1550,6 +1661,7 @@ function niet {{
         run_attendance_tracker(attendance_data)
     else:
         print(f"{C_ERROR}Failed to fetch attendance data. Exiting.{C_RESET}")
+    if DEBUG_MODE: print_http_stats()
 
 def get_login_choice():
     """Displays login options and returns user's choice."""
@@ -1711,14 +1823,12 @@ def stop_loading(succ_msg=None, error_msg=None):
 def fetch_github_contributors():
     """Fetches contributor usernames from the GitHub API."""
     try:
-        # GitHub API endpoint for contributors
-        url = "https://api.github.com/repos/iamawanishmaurya/NIET-Attendance-Tracker/contributors"
         headers = {
             'Accept': 'application/vnd.github.v3+json',
             'User-Agent': 'NIET-Attendance-Tracker'
         }
         
-        response = requests.get(url, headers=headers)
+        response = get_http_manager().get(GITHUB_CONTRIBUTORS_URL, label='github', headers=headers, timeout=10)
         
         if response.status_code == 200:
             # Extract only usernames from the response